@@ -1,3 +1,7 @@
+from src.headless import go_headless
+
+go_headless()  # before anything imports src.conf or starts pygame
+
 import pygame
 import pytest
 
@@ -14,3 +18,9 @@ def font_init():
 def event_queue(monkeypatch):
     """auto-clear the event queue before every test"""
     monkeypatch.setattr("robingame.input.event.EventQueue.events", [])
+
+
+@pytest.fixture(autouse=True)
+def stage_cache(tmp_path, monkeypatch):
+    """keep baked stages out of the real cache directory"""
+    monkeypatch.setenv("PIXEL_PUNCHER_CACHE", str(tmp_path / "cache"))
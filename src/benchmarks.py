@@ -0,0 +1,319 @@
+"""
+Performance benchmarks. Each scenario is a scripted, seeded match run headless, so the numbers
+are comparable between runs. For every scenario this reports tick latency percentiles,
+allocations per tick, and the time spent in each hot path.
+
+Usage:
+    python -m src.benchmarks --save baseline.json
+    python -m src.benchmarks --compare baseline.json
+"""
+
+if __name__ == "__main__":
+    from src.headless import go_headless
+
+    go_headless()
+
+import argparse
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from pygame import Surface
+
+from src import characters, conf
+from src.characters import Character
+from src.hitboxes import HitHandler
+from src.inputs import RandomInput
+from src.integrator import BatchIntegrator
+from src.levels import Battlefield, Level
+from src.netcode import RollbackSession
+from src.particles import Plume
+from src.platforms import MovingPlatform, Platform
+from src.profiling import MethodPatches, timed
+from src.projectiles.base import Projectile
+from src.projectiles.hawko_laser import HawkoLaser
+from src.simulation import Player, Simulation
+
+# the hot paths that are timed separately: section name -> (class, method names)
+SECTIONS = {
+    "handle_hits": (HitHandler, ("handle_hits",)),
+    "physics": (Character, ("fall_physics", "grounded_physics", "hit_physics")),
+    "projectiles": (Projectile, ("update",)),
+    "particles": (Plume, ("update",)),
+    "draw": (Level, ("draw",)),
+}
+
+
+def scenario_duel(seed: int) -> (Simulation, callable):
+    """Two random bots on Battlefield"""
+    players = [
+        Player(characters.Hawko, RandomInput(seed=seed), x=600, y=500),
+        Player(characters.MonkeyKing, RandomInput(seed=seed + 1), x=1000, y=500),
+    ]
+    return Simulation(Battlefield(seed=seed), players), None
+
+
+def scenario_brawl(seed: int) -> (Simulation, callable):
+    """Eight random bots on Battlefield"""
+    character_classes = [characters.Hawko, characters.MonkeyKing] * 4
+    players = [
+        Player(character_class, RandomInput(seed=seed + ii), x=500 + ii * 100, y=500)
+        for ii, character_class in enumerate(character_classes)
+    ]
+    return Simulation(Battlefield(seed=seed), players), None
+
+
+def scenario_big_stage(seed: int) -> (Simulation, callable):
+    """Eight random bots on Battlefield with 60 extra small platforms"""
+    simulation, _ = scenario_brawl(seed)
+    level = simulation.level
+    for row in range(4):
+        for column in range(15):
+            x = 200 + column * 100 + row % 2 * 50
+            level.add_platform(Platform(x, 150 + row * 80, 60, 10, droppable=True))
+    return simulation, None
+
+
+def scenario_big_stage_discrete(seed: int) -> (Simulation, callable):
+    """big_stage without swept collision, to compare its cost against"""
+    simulation, _ = scenario_big_stage(seed)
+
+    def every_tick(simulation: Simulation):
+        for character in simulation.level.characters:
+            character.swept_collision = False
+
+    return simulation, every_tick
+
+
+def scenario_moving_platforms(seed: int) -> (Simulation, callable):
+    """big_stage with another 8 platforms moving around, some of them fast"""
+    simulation, _ = scenario_big_stage(seed)
+    level = simulation.level
+    for ii in range(8):
+        x = 300 + ii * 180
+        speed = 20 + ii * 10  # ticks per leg
+        path = [(x + 150, 300, speed), (x + 150, 700, speed), (x, 700, speed), (x, 300, speed)]
+        level.add_platform(MovingPlatform(x, 300, 100, 20, path=path, droppable=ii % 2 == 0))
+    return simulation, None
+
+
+def scenario_lasers(seed: int) -> (Simulation, callable):
+    """A duel where both players also fire a laser every few ticks"""
+    simulation, _ = scenario_duel(seed)
+
+    def every_tick(simulation: Simulation):
+        if simulation.tick % 4 == 0:
+            for player in simulation.players:
+                character = player.character
+                laser = HawkoLaser(
+                    x=character.x,
+                    y=character.y + 10,
+                    facing_right=character.facing_right,
+                    owner=character,
+                )
+                simulation.level.add_projectile(laser)
+
+    return simulation, every_tick
+
+
+def scenario_projectile_storm(seed: int) -> (Simulation, callable):
+    """A duel with hundreds of lasers flying across the stage"""
+    simulation, _ = scenario_duel(seed)
+
+    def every_tick(simulation: Simulation):
+        # 20 lanes, far enough apart that the lasers don't hit each other
+        if simulation.tick % 10 == 0:
+            level = simulation.level
+            owner = simulation.players[0].character
+            for lane in range(20):
+                laser = HawkoLaser(x=100, y=100 + lane * 35, facing_right=True, owner=owner)
+                level.add_projectile(laser)
+
+    return simulation, every_tick
+
+
+def scenario_projectile_storm_batched(seed: int) -> (Simulation, callable):
+    """projectile_storm with the projectiles moved by the BatchIntegrator"""
+    simulation, every_tick = scenario_projectile_storm(seed)
+    simulation.level.integrator = BatchIntegrator()
+    return simulation, every_tick
+
+
+def scenario_plumes(seed: int) -> (Simulation, callable):
+    """A duel with an explosion of particles every few ticks"""
+    simulation, _ = scenario_duel(seed)
+
+    def every_tick(simulation: Simulation):
+        if simulation.tick % 10 == 0:
+            level = simulation.level
+            angle = level.rng.randrange(360)
+            level.add_particle_effect(Plume(900, 400, angle, rng=level.rng))
+
+    return simulation, every_tick
+
+
+def scenario_screen_shake(seed: int) -> (Simulation, callable):
+    """A duel where the screen never stops shaking"""
+    simulation, _ = scenario_duel(seed)
+
+    def every_tick(simulation: Simulation):
+        simulation.level.screen_shake = 10
+
+    return simulation, every_tick
+
+
+def scenario_rollback(seed: int) -> (Simulation, callable):
+    """A duel that rewinds and re-simulates RollbackSession.max_rollback ticks every tick, i.e.
+    the worst case of netplay. Its ticks should still fit in one frame (16.7 ms)."""
+    simulation, _ = scenario_duel(seed)
+    snapshots = deque(maxlen=RollbackSession.max_rollback)
+
+    def every_tick(simulation: Simulation):
+        if len(snapshots) == snapshots.maxlen:
+            simulation.restore(snapshots[0])
+            for _ in range(RollbackSession.max_rollback):
+                simulation.step()
+        snapshots.append(simulation.snapshot())
+
+    return simulation, every_tick
+
+
+SCENARIOS = {
+    "duel": scenario_duel,
+    "brawl": scenario_brawl,
+    "big_stage": scenario_big_stage,
+    "big_stage_discrete": scenario_big_stage_discrete,
+    "moving_platforms": scenario_moving_platforms,
+    "lasers": scenario_lasers,
+    "projectile_storm": scenario_projectile_storm,
+    "projectile_storm_batched": scenario_projectile_storm_batched,
+    "plumes": scenario_plumes,
+    "screen_shake": scenario_screen_shake,
+    "rollback": scenario_rollback,
+}
+
+
+@contextmanager
+def timed_sections(totals: dict):
+    """Temporarily wrap the hot path methods so that they add their run time to `totals`."""
+
+    def record(section: str, start: float, end: float):
+        totals[section] += end - start
+
+    patches = MethodPatches()
+    for section, (cls, names) in SECTIONS.items():
+        for name in names:
+            patches.wrap(cls, name, timed(getattr(cls, name), record, section))
+    try:
+        yield
+    finally:
+        patches.undo()
+
+
+def run_scenario(scenario: callable, ticks: int, seed: int = 0, trace: bool = False) -> dict:
+    """
+    Run a scenario, drawing every tick to an offscreen surface.
+    :param trace: measure allocations instead of time. tracemalloc slows everything down a lot,
+        so this has to be a separate run.
+    """
+    simulation, every_tick = scenario(seed)
+    surface = Surface((conf.SCREEN_WIDTH, conf.SCREEN_HEIGHT))
+
+    def tick():
+        if every_tick:
+            every_tick(simulation)
+        simulation.step()
+        simulation.level.draw(surface)
+
+    if trace:
+        tracemalloc.start()
+        allocated = []
+        try:
+            for _ in range(ticks):
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+                tick()
+                # memory allocated during the tick, including what was freed again before the end
+                _, peak = tracemalloc.get_traced_memory()
+                allocated.append(peak - before)
+        finally:
+            tracemalloc.stop()
+        return dict(alloc_kb_per_tick=statistics.fmean(allocated) / 1024)
+
+    totals = defaultdict(float)
+    durations = []
+    collections = gc.get_stats()[0]["collections"]
+    with timed_sections(totals):
+        for _ in range(ticks):
+            start = time.perf_counter()
+            tick()
+            durations.append(time.perf_counter() - start)
+    collections = gc.get_stats()[0]["collections"] - collections
+
+    durations.sort()
+    ms = 1000
+    result = dict(
+        p50_ms=percentile(durations, 50) * ms,
+        p90_ms=percentile(durations, 90) * ms,
+        p99_ms=percentile(durations, 99) * ms,
+        max_ms=durations[-1] * ms,
+        gc_per_1000_ticks=collections * 1000 / ticks,
+    )
+    for section in SECTIONS:
+        result[f"{section}_ms"] = totals[section] / ticks * ms
+    return result
+
+
+def percentile(sorted_values: list, percent: float) -> float:
+    index = round((len(sorted_values) - 1) * percent / 100)
+    return sorted_values[index]
+
+
+def run_all(ticks: int, seed: int = 0, scenarios=None) -> dict:
+    results = {}
+    for name in scenarios or SCENARIOS:
+        scenario = SCENARIOS[name]
+        results[name] = run_scenario(scenario, ticks, seed)
+        results[name].update(run_scenario(scenario, ticks, seed, trace=True))
+    return results
+
+
+def compare(results: dict, baseline: dict) -> [str]:
+    """One line per metric, with the change from the baseline in percent."""
+    lines = []
+    for scenario, metrics in results.items():
+        for metric, value in metrics.items():
+            line = f"{scenario:>24} {metric:>20} {value:10.3f}"
+            old = baseline.get(scenario, {}).get(metric)
+            if old:
+                line += f" {(value - old) / old:+8.1%}"
+            lines.append(line)
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the simulation and rendering.")
+    parser.add_argument("--ticks", type=int, default=1200, help="ticks per scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS))
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of baseline results to compare against")
+    args = parser.parse_args()
+
+    results = run_all(args.ticks, args.seed, args.scenario)
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    print("\n".join(compare(results, baseline)))
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
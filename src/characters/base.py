@@ -1,3 +1,5 @@
+from typing import NamedTuple
+
 import numpy
 import pygame
 from numpy import sign
@@ -7,11 +9,24 @@ from pygame.rect import Rect
 from robingame.image import SpriteDict
 from robingame.input.gamecube import GamecubeController
 from robingame.objects import PhysicalEntity
-from src import sounds
+from src import sounds, trajectory
 from src.conf import BOUNCE_LOSS, INPUT_BUFFER
+from src.collision import Capsule
+from src.hitboxes import ActiveHitbox
 from src.platforms import Platform
 
 
+class Contact:
+    """The platforms a character is standing on, and the ones whose sides it's touching."""
+
+    __slots__ = ("key", "floors", "walls")
+
+    def __init__(self, key: tuple, floors: list, walls: list):
+        self.key = key  # what the contacts were worked out from
+        self.floors = floors
+        self.walls = walls
+
+
 class Character(PhysicalEntity):
     mass: float  # 10 is average
     damage: int
@@ -49,8 +64,24 @@ class Character(PhysicalEntity):
     hitpause_duration: int = 0
 
     touch_box_margin = 2
+    swept_collision = True  # stop fast-moving characters skipping over thin platforms
+    _contact: Contact = None
     frame_duration = 3
 
+    # attributes saved by Level.snapshot(), on top of position, tick, state and image
+    snapshot_fields = (
+        ("u", float),
+        ("v", float),
+        ("damage", float),
+        ("facing_right", bool),
+        ("fast_fall", bool),
+        ("aerial_jumps", int),
+        ("air_dodges", int),
+        ("wall_jumps", int),
+        ("hitpause_duration", int),
+        ("hitstun_duration", int),
+    )
+
     ForwardAir: "Move"
     BackAir: "Move"
     UpAir: "Move"
@@ -86,6 +117,7 @@ class Character(PhysicalEntity):
         self.aerial_jumps = self.max_aerial_jumps
         self.air_dodges = self.max_air_dodges
         self.wall_jumps = self.max_wall_jumps
+        self.moves = {}  # (move class, facing_right) -> Move bound to this character
 
     def draw(self, surface: Surface, debug: bool = False):
         super().draw(surface, debug)
@@ -97,6 +129,12 @@ class Character(PhysicalEntity):
     def facing(self):
         return "right" if self.facing_right else "left"
 
+    @property
+    def hurtbox(self) -> Capsule:
+        """Where the character can be hit: the capsule filling its rect. Characters whose
+        sprites don't fill their rect that way can override this."""
+        return Capsule.from_rect(self.rect)
+
     @property
     def touch_box(self):
         return self.rect.inflate(self.touch_box_margin, self.touch_box_margin)
@@ -116,12 +154,74 @@ class Character(PhysicalEntity):
             self.rect.right <= platform.rect.left or self.rect.left >= platform.rect.right
         )
 
+    @property
+    def contact(self) -> Contact:
+        """
+        Which platforms the character is touching. This is queried many times per tick, so it's
+        only worked out again when the character has moved (or started/stopped moving upwards),
+        when platforms have been added or removed, or when a platform it could be touching has
+        moved (see platform_moved).
+        """
+        rect = self.rect
+        level = self.level
+        key = (rect.x, rect.y, rect.width, rect.height, self.v >= 0, level, level.platform_version)
+        contact = self._contact
+        if contact is None or contact.key != key:
+            # same as standing_on_platform and touching_side_of_platform, in one pass
+            touch_box = self.touch_box
+            moving_up = self.v < 0
+            floors = []
+            walls = []
+            for platform in level.colliding_platforms(touch_box):
+                platform_rect = platform.rect
+                if rect.bottom <= platform_rect.top and not moving_up:
+                    floors.append(platform)
+                if rect.right <= platform_rect.left or rect.left >= platform_rect.right:
+                    walls.append(platform)
+            contact = self._contact = Contact(key, floors, walls)
+        return contact
+
+    def platform_moved(self, platform: Platform):
+        """Forget the contacts if the platform's move could have changed them: if it was one
+        of them, or if it's now touching where the contacts were worked out."""
+        contact = self._contact
+        if contact is None:
+            return
+        if platform in contact.floors or platform in contact.walls:
+            self._contact = None
+            return
+        x, y, width, height = contact.key[:4]
+        margin = self.touch_box_margin
+        if Rect(x, y, width, height).inflate(margin, margin).colliderect(platform.rect):
+            self._contact = None
+
+    def carry(self, dx: int, dy: int, platform: Platform):
+        """
+        Move the character along with a moving platform: one it's standing on, or one that has
+        run into it. Solid platforms in the way stop it, the same as they do when it moves by
+        itself. Droppable ones don't, and nor do the ones it's already inside.
+        """
+        rect = self.rect
+        for step_x, step_y in ((dx, 0), (0, dy)):
+            if not step_x and not step_y:
+                continue
+            old_rect = Rect(rect)
+            rect.move_ip(step_x, step_y)
+            for other in self.level.colliding_platforms(rect):
+                if other is platform or other.droppable or other.rect.colliderect(old_rect):
+                    continue
+                if step_x > 0:
+                    rect.right = min(rect.right, other.rect.left)
+                elif step_x < 0:
+                    rect.left = max(rect.left, other.rect.right)
+                elif step_y > 0:
+                    rect.bottom = min(rect.bottom, other.rect.top)
+                else:
+                    rect.top = max(rect.top, other.rect.bottom)
+
     @property
     def airborne(self):
-        for platform in self.level.platforms:
-            if self.standing_on_platform(platform):
-                return False
-        return True
+        return not self.contact.floors
 
     def state_stand(self):
         self.image = self.sprites["stand_" + self.facing].loop(self.animation_frame)
@@ -276,7 +376,7 @@ class Character(PhysicalEntity):
             self.allow_aerial_jump()
 
     def state_special_fall(self):
-        self.image = self.sprites["stomp_" + self.facing].play(2)
+        self.image = self.sprites["special_fall_" + self.facing].play(2)
         self.allow_aerial_drift()
         self.allow_wall_jump()
         self.fall_physics()
@@ -288,8 +388,10 @@ class Character(PhysicalEntity):
         self.v *= 1 - decay
         self.image = self.sprites["air_dodge_" + self.facing].play(0)
         # update horizontal position and handle platform collisions
+        old_rect = Rect(self.rect)
         self.x += self.u
-        platforms = pygame.sprite.spritecollide(self, self.level.platforms, dokill=False)
+        self.sweep_into_platform(old_rect)
+        platforms = self.level.colliding_platforms(self.rect)
         for platform in platforms:
             if not platform.droppable:
                 self.bump_horizontally(platform)
@@ -297,7 +399,8 @@ class Character(PhysicalEntity):
         # update vertical position and handle platform collisions
         old_rect = Rect(self.rect)  # remember previous position
         self.y += self.v
-        platforms = pygame.sprite.spritecollide(self, self.level.platforms, dokill=False)
+        self.sweep_into_platform(old_rect)
+        platforms = self.level.colliding_platforms(self.rect)
         for platform in platforms:
             if platform.droppable:
                 self.vertical_collide_droppable_platform(self, platform, old_rect)
@@ -481,15 +584,19 @@ class Character(PhysicalEntity):
         else:
             return self.bump_horizontally(platform)
 
+    @property
+    def dropping_through(self) -> bool:
+        """Whether the character falls through droppable platforms instead of landing on them:
+        while it's falling and holding down."""
+        return bool(self.input.DOWN) and self.state == self.state_fall
+
     def vertical_collide_platform(
         self, platform, old_rect: Rect, allow_fall_through, next_state=None
     ):
         moving_down = self.v > 0
         if moving_down:
             # if character was already inside the platform, or player is holding down
-            if (old_rect.bottom > platform.rect.top) or (
-                self.input.DOWN and self.state == self.state_fall
-            ):
+            if old_rect.bottom > platform.rect.top or self.dropping_through:
                 pass
             # if character was above the platform and not holding down
             else:
@@ -507,9 +614,7 @@ class Character(PhysicalEntity):
         moving_down = self.v > 0
         if moving_down:
             # if character was already inside the platform, or player is holding down
-            if (old_rect.bottom > platform.rect.top) or (
-                self.input.DOWN and self.state == self.state_fall
-            ):
+            if old_rect.bottom > platform.rect.top or self.dropping_through:
                 pass
             # if character was above the platform and not holding down
             else:
@@ -532,6 +637,63 @@ class Character(PhysicalEntity):
             self.rect.top = max([self.rect.top, platform.rect.bottom])
             self.v = 0
 
+    def sweep_into_platform(self, old_rect: Rect):
+        """
+        Swept collision. A fast character (e.g. after a strong hit) can move right past a thin
+        platform in one tick. If the move from old_rect to self.rect went through a platform
+        without ending up inside it, move back to where the character first touched it,
+        overlapping it by 1 pixel. The usual collision handling then resolves it, as if the
+        step had been short enough to land in the platform.
+
+        Only works for moves along one axis at a time, which is how the physics moves.
+        Characters can move up through droppable platforms, and sideways through them, and down
+        through them while dropping through, so those don't stop them.
+        """
+        if not self.swept_collision:
+            return
+        rect = self.rect
+        dx = rect.x - old_rect.x
+        dy = rect.y - old_rect.y
+        if not dx and not dy:
+            return
+        first = None
+        first_distance = None
+        for platform in self.level.colliding_platforms(old_rect.union(rect)):
+            platform_rect = platform.rect
+            if dy > 0:
+                if platform.droppable and self.dropping_through:
+                    continue
+                if not old_rect.bottom <= platform_rect.top < rect.bottom:
+                    continue
+                distance = platform_rect.top - old_rect.bottom
+            elif platform.droppable:
+                continue
+            elif dy < 0:
+                if not rect.top < platform_rect.bottom <= old_rect.top:
+                    continue
+                distance = old_rect.top - platform_rect.bottom
+            elif dx > 0:
+                if not old_rect.right <= platform_rect.left < rect.right:
+                    continue
+                distance = platform_rect.left - old_rect.right
+            else:
+                if not rect.left < platform_rect.right <= old_rect.left:
+                    continue
+                distance = old_rect.left - platform_rect.right
+            if first is None or distance < first_distance:
+                first = platform
+                first_distance = distance
+        if first is None or first.rect.colliderect(rect):
+            return  # didn't skip over anything
+        if dy > 0:
+            rect.bottom = first.rect.top + 1
+        elif dy < 0:
+            rect.top = first.rect.bottom - 1
+        elif dx > 0:
+            rect.right = first.rect.left + 1
+        else:
+            rect.left = first.rect.right - 1
+
     def fall_physics(
         self,
         horizontal_collide_droppable_platform=None,
@@ -553,8 +715,10 @@ class Character(PhysicalEntity):
             vertical_collide_solid_platform = self.vertical_collide_solid_platform
 
         # update horizontal position and handle platform collisions
+        old_rect = Rect(self.rect)
         self.x += self.u
-        platforms = pygame.sprite.spritecollide(self, self.level.platforms, dokill=False)
+        self.sweep_into_platform(old_rect)
+        platforms = self.level.colliding_platforms(self.rect)
         for platform in platforms:
             # todo: what I want here is a function called self.fall_into_platform oid
             if platform.droppable:
@@ -565,7 +729,8 @@ class Character(PhysicalEntity):
         # update vertical position and handle platform collisions
         old_rect = Rect(self.rect)  # remember previous position
         self.y += self.v
-        platforms = pygame.sprite.spritecollide(self, self.level.platforms, dokill=False)
+        self.sweep_into_platform(old_rect)
+        platforms = self.level.colliding_platforms(self.rect)
         for platform in platforms:
             if platform.droppable:
                 vertical_collide_droppable_platform(self, platform, old_rect)
@@ -587,8 +752,10 @@ class Character(PhysicalEntity):
         self.apply_air_resistance()
 
         # update horizontal position and handle platform collisions
+        old_rect = Rect(self.rect)
         self.x += self.u
-        platforms = pygame.sprite.spritecollide(self, self.level.platforms, dokill=False)
+        self.sweep_into_platform(old_rect)
+        platforms = self.level.colliding_platforms(self.rect)
         moving_right = self.u > 0
         for plat in platforms:
             if plat.droppable:
@@ -603,7 +770,8 @@ class Character(PhysicalEntity):
         # update vertical position and handle platform collisions
         old_rect = Rect(self.rect)  # remember previous position
         self.y += self.v
-        platforms = pygame.sprite.spritecollide(self, self.level.platforms, dokill=False)
+        self.sweep_into_platform(old_rect)
+        platforms = self.level.colliding_platforms(self.rect)
         moving_down = self.v > 0
         for plat in platforms:
             # droppable platforms
@@ -630,7 +798,14 @@ class Character(PhysicalEntity):
                     self.v = -self.v * (1 - BOUNCE_LOSS)
 
     def do_move(self, move):
-        self.state = move(self)
+        """Start a move. The first time the character does each move facing each way, the move
+        is bound to the character; after that the bound move is reused."""
+        key = (move, self.facing_right)
+        state = self.moves.get(key)
+        if state is None:
+            state = self.moves[key] = move(self)
+        state.start()
+        self.state = state
 
     def enter_hitpause(self):
         """Using a closure to store this state. This is a good idea because it still allows easy
@@ -680,16 +855,8 @@ class Character(PhysicalEntity):
         """What to do when self gets hit by a hitbox."""
         # here's where we calculate how far/fast the object gets knocked
         self.damage += hitbox.damage  # important for charged smashes
-        # fixed knockback is affected by nothing
-        fixed_knockback_term = hitbox.fixed_knockback
-        # base knockback and growing knockback are both affected by target mass
-        base_knockback_term = hitbox.base_knockback / self.mass
-        knockback_growth_term = hitbox.knockback_growth * self.damage / self.mass / 10
-        knockback = fixed_knockback_term + base_knockback_term + knockback_growth_term
-        u = knockback * numpy.cos(numpy.deg2rad(hitbox.knockback_angle))
-        v = -knockback * numpy.sin(numpy.deg2rad(hitbox.knockback_angle))
-        self.u = round(u)
-        self.v = round(v)
+        knockback = trajectory.knockback(hitbox, self.damage, self.mass)
+        self.u, self.v = trajectory.launch_velocity(knockback, hitbox.knockback_angle)
         self.hitpause_duration = hitbox.hitpause_duration
         self.hitstun_duration = hitbox.hitstun_duration(knockback)
         self.y -= 1
@@ -763,8 +930,7 @@ class Character(PhysicalEntity):
     def allow_platform_drop(self):
         input = self.input
         if input.DOWN.is_pressed:
-            platforms = list(filter(self.standing_on_platform, self.level.platforms))
-            if all(platform.droppable for platform in platforms):
+            if all(platform.droppable for platform in self.contact.floors):
                 self.y += 1  # need this to drop through platforms
 
     def allow_jab(self):
@@ -790,11 +956,7 @@ class Character(PhysicalEntity):
 
     def allow_wall_jump(self):
         input = self.input
-        platforms = [
-            platform
-            for platform in self.level.platforms
-            if self.touching_side_of_platform(platform)
-        ]
+        platforms = self.contact.walls
         if (input.Y.is_pressed or input.X.is_pressed) and self.wall_jumps > 0 and any(platforms):
             # if the platform is to the left, face right (jumping away from wall)
             if platforms[0].rect.centerx < self.x:
@@ -854,55 +1016,127 @@ class Character(PhysicalEntity):
         return 0
 
 
+class Frame(NamedTuple):
+    image: Surface | None
+    hitboxes: tuple  # the hitboxes active on this frame
+
+
+class Puppet:
+    """Stands in for a character while a move is compiled. It has the character class's sprites
+    and a facing."""
+
+    def __init__(self, character_class: type, facing_right: bool):
+        self.sprites = character_class.sprites
+        self.facing_right = facing_right
+
+    @property
+    def facing(self):
+        return "right" if self.facing_right else "left"
+
+
+_frame_tables = {}  # (move class, character class, facing_right) -> frame table
+
+
 class Move:
-    hitbox_mapping: dict
+    """
+    A move's frames are defined by .frames(). They are compiled once per character class and
+    facing into a frame table: a tuple of Frames, with the hitboxes already mirrored for facing
+    left. Each character then binds a table to itself the first time it does the move facing
+    that way (see Character.do_move), and reuses it every time after that. So starting a move
+    only runs .start().
+    """
+
     character: Character
     sound = sounds.swing5
     sprite_name: str = ""
-    frame_mapping: list
+    frame_mapping: (Frame, ...)
+    hitboxes: ("Hitbox", ...)
 
     def __init__(self, character: Character):
         self.character = character
-        if not character.facing_right:
-            # This needs to be a set because we want to flip each hitbox exactly once
-            hitboxes = {h for item in self.frame_mapping for h in item.get("hitboxes", [])}
-            for hitbox in hitboxes:
-                hitbox.flip_x()
+        table = self.compile(type(character), character.facing_right)
+        active = {hitbox: ActiveHitbox(hitbox, character) for hitbox in table_hitboxes(table)}
+        self.frame_mapping = tuple(
+            Frame(frame.image, tuple(active[hitbox] for hitbox in frame.hitboxes))
+            for frame in table
+        )
+        self.hitboxes = table_hitboxes(self.frame_mapping)
+
+    @classmethod
+    def compile(cls, character_class: type, facing_right: bool) -> (Frame, ...):
+        """The move's frame table for a character class and facing, compiled on first use"""
+        key = (cls, character_class, facing_right)
+        table = _frame_tables.get(key)
+        if table is None:
+            frames = cls.frames(Puppet(character_class, facing_right))
+            if facing_right:
+                table = tuple(
+                    Frame(frame.get("image"), tuple(frame.get("hitboxes", ()))) for frame in frames
+                )
+            else:
+                # the same hitboxes as facing right, mirrored; only the images are different
+                right = cls.compile(character_class, facing_right=True)
+                table = tuple(
+                    Frame(frame.get("image"), tuple(hitbox.mirrored for hitbox in hitboxes))
+                    for frame, (_, hitboxes) in zip(frames, right)
+                )
+            _frame_tables[key] = table
+        return table
+
+    @classmethod
+    def frames(cls, character: Puppet) -> [dict]:
+        """
+        The move's frames, in order: dicts with the frame's "image", and optionally the
+        "hitboxes" active during it. Hitboxes should be made facing right.
+        """
+        return []
+
+    def start(self):
+        """Called every time the move starts."""
+        # a new activation can hit everything again
+        self.character.level.hit_handler.handled.release_hitboxes(*self.hitboxes)
         self.sound.play()
 
     def __call__(self, *args, **kwargs):
         n = self.character.animation_frame
         try:
-            frame_data = self.frame_mapping[n]
+            frame = self.frame_mapping[n]
         except IndexError:
             return self.end()
 
-        self.update_image(frame_data)
-        self.update_hitboxes(frame_data)
+        self.update_image(frame)
+        self.update_hitboxes(frame)
         self.handle_physics()
 
     def handle_physics(self):
         """handle grounded physics by default"""
         self.character.grounded_physics()
 
-    def update_image(self, frame_data):
-        image = frame_data.get("image")
-        if image:
-            self.character.image = image
+    def update_image(self, frame: Frame):
+        if frame.image:
+            self.character.image = frame.image
 
-    def update_hitboxes(self, frame_data):
-        active_hitboxes = frame_data.get("hitboxes", [])
-        self.character.level.add_hitbox(*active_hitboxes)
+    def update_hitboxes(self, frame: Frame):
+        if frame.hitboxes:
+            self.character.level.add_hitbox(*frame.hitboxes)
 
     def get_next_state(self):
         """This needs to be a method because we might need to instantiate a class-based state."""
         return self.character.state_stand
 
     def end(self):
+        # the hitboxes are retired, so the hit handler can forget what they hit
+        self.character.level.hit_handler.handled.release_hitboxes(*self.hitboxes)
         self.character.state = self.get_next_state()
         return self.character.state()  # execute the state
 
 
+def table_hitboxes(table: (Frame, ...)) -> ("Hitbox", ...):
+    """All the hitboxes in a frame table, in order of first appearance. Each hitbox can appear
+    in many frames."""
+    return tuple(dict.fromkeys(hitbox for frame in table for hitbox in frame.hitboxes))
+
+
 class AerialMove(Move):
     landing_lag: int
 
@@ -949,9 +1183,7 @@ class AerialMove(Move):
         moving_down = character.v > 0
         if moving_down:
             # if character was already inside the platform, or player is holding down
-            if (old_rect.bottom > platform.rect.top) or (
-                character.input.DOWN and character.state == character.state_fall
-            ):
+            if old_rect.bottom > platform.rect.top or character.dropping_through:
                 pass
             # if character was above the platform and not holding down
             else:
@@ -4,7 +4,7 @@ import pygame
 from pygame import Color, Surface
 
 from src import sounds
-from src.characters import Character, AerialMove, Move
+from src.characters import Character, AerialMove, Move, Puppet
 from src.hitboxes import Hitbox
 from src.inputs import FightingGameInput
 from src.sprites.stickman import stickman_sprites
@@ -51,8 +51,8 @@ class Debugger(Character):
             textBitmap = font.render(textString, True, Color("black"))
             surface.blit(textBitmap, (x, y))
 
-        colliding = pygame.sprite.spritecollide(self, self.level.platforms, dokill=False)
-        touching = [plat for plat in self.level.platforms if self.touching(plat)]
+        colliding = self.level.colliding_platforms(self.rect)
+        touching = self.level.colliding_platforms(self.touch_box)
         try:
             state_name = self.state.__name__
         except AttributeError:
@@ -84,9 +84,9 @@ class Debugger(Character):
         landing_lag = 5
         sound = sounds.sword_swing
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=30,
                 width=30,
                 height=30,
@@ -98,7 +98,6 @@ class Debugger(Character):
                 sound=sounds.sword_hit,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=30,
                 width=20,
                 height=20,
@@ -116,7 +115,7 @@ class Debugger(Character):
             image_hit = images[2]
             image_endlag = images[6]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_windup},
                 {"image": image_hit, "hitboxes": [sweet_spot]},
                 {"image": image_hit, "hitboxes": [sweet_spot]},
@@ -124,14 +123,13 @@ class Debugger(Character):
                 {"image": image_hit, "hitboxes": [sour_spot]},
                 {"image": image_endlag},
             ]
-            super().__init__(character)
 
     class BackAir(AerialMove):
         landing_lag = 5
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=-30,
                 width=30,
                 height=30,
@@ -142,7 +140,6 @@ class Debugger(Character):
                 damage=10,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=-30,
                 width=20,
                 height=20,
@@ -161,7 +158,7 @@ class Debugger(Character):
             image_hit2 = images[3]
             image_endlag = images[4]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_windup},
                 {"image": image_windup2},
                 {"image": image_hit, "hitboxes": [sweet_spot]},
@@ -169,14 +166,13 @@ class Debugger(Character):
                 {"image": image_hit2, "hitboxes": [sour_spot]},
                 {"image": image_endlag},
             ]
-            super().__init__(character)
 
     class UpAir(AerialMove):
         landing_lag = 5
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 y_offset=-30,
                 width=30,
                 height=30,
@@ -187,7 +183,6 @@ class Debugger(Character):
                 damage=10,
             )
             sour_spot = Hitbox(
-                owner=character,
                 y_offset=-30,
                 width=20,
                 height=20,
@@ -204,20 +199,19 @@ class Debugger(Character):
             image_endlag = images[1]
             image_endlag2 = images[2]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_hit, "hitboxes": [sweet_spot]},
                 {"image": image_endlag, "hitboxes": [sour_spot]},
                 {"image": image_endlag, "hitboxes": [sour_spot]},
                 {"image": image_endlag2},
             ]
-            super().__init__(character)
 
     class DownAir(AerialMove):
         landing_lag = 10
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 y_offset=30,
                 width=40,
                 height=40,
@@ -229,7 +223,6 @@ class Debugger(Character):
                 sound=sounds.bighit,
             )
             sour_spot = Hitbox(
-                owner=character,
                 y_offset=0,
                 width=60,
                 height=60,
@@ -246,7 +239,7 @@ class Debugger(Character):
             image_hit = images[3]
             image_endlag = images[5]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_windup},
                 {"image": image_windup},
                 {"image": image_windup},
@@ -258,14 +251,13 @@ class Debugger(Character):
                 {"image": image_endlag},
                 {"image": image_endlag},
             ]
-            super().__init__(character)
 
     class NeutralAir(AerialMove):
         landing_lag = 5
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             initial_hit = Hitbox(
-                owner=character,
                 width=50,
                 height=50,
                 rotation=0,
@@ -274,7 +266,6 @@ class Debugger(Character):
                 damage=5,
             )
             second_hit = Hitbox(
-                owner=character,
                 width=50,
                 height=50,
                 rotation=0,
@@ -283,7 +274,6 @@ class Debugger(Character):
                 damage=5,
             )
             final_hit = Hitbox(
-                owner=character,
                 width=50,
                 height=50,
                 rotation=0,
@@ -298,7 +288,7 @@ class Debugger(Character):
             sprite2 = character.sprites[f"back_air2_{character.facing}"]
             image_hit2 = sprite2.frames[3]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_hit2, "hitboxes": [initial_hit]},
                 {"image": image},
                 {"image": image},
@@ -309,12 +299,11 @@ class Debugger(Character):
                 {"image": image},
                 {"image": image},
             ]
-            super().__init__(character)
 
     class UpTilt(Move):
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 y_offset=-30,
                 width=60,
                 height=60,
@@ -330,21 +319,20 @@ class Debugger(Character):
             image_hit = images[3]
             image_endlag = images[4]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_windup},
                 {"image": image_hit, "hitboxes": [sweet_spot]},
                 {"image": image_endlag},
                 {"image": image_endlag},
                 {"image": image_endlag},
             ]
-            super().__init__(character)
 
     class Jab(Move):
         sound = sounds.swing3
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=10,
                 y_offset=0,
                 width=60,
@@ -360,17 +348,16 @@ class Debugger(Character):
             images = sprite.frames
             image_hit = images[1]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_hit, "hitboxes": [sweet_spot]},
                 {"image": image_hit},
                 {"image": image_hit},
             ]
-            super().__init__(character)
 
     class DownSmash(Move):
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 y_offset=30,
                 width=100,
                 height=100,
@@ -382,7 +369,6 @@ class Debugger(Character):
                 sound=sounds.bighit,
             )
             sour_spot = Hitbox(
-                owner=character,
                 y_offset=30,
                 width=60,
                 height=60,
@@ -402,7 +388,7 @@ class Debugger(Character):
             image_getup3 = images[8]
             image_getup4 = images[9]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_getup4},
                 {"image": image_hit, "hitboxes": [sour_spot]},
                 {"image": image_hit2},
@@ -422,12 +408,10 @@ class Debugger(Character):
                 {"image": image_getup4},
             ]
 
-            super().__init__(character)
-
     class UpSmash(Move):
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 y_offset=-30,
                 width=60,
                 height=60,
@@ -438,7 +422,6 @@ class Debugger(Character):
                 damage=20,
             )
             sour_spot = Hitbox(
-                owner=character,
                 y_offset=-30,
                 width=100,
                 height=100,
@@ -456,7 +439,7 @@ class Debugger(Character):
             image_hit = images[3]
             image_hit2 = images[4]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_windup},
                 {"image": image_windup2},
                 {"image": image_hit, "hitboxes": [sour_spot]},
@@ -465,12 +448,11 @@ class Debugger(Character):
                 {"image": image_windup2},
                 {"image": image_windup},
             ]
-            super().__init__(character)
 
     class ForwardSmash(Move):
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=30,
                 width=60,
                 height=60,
@@ -482,7 +464,6 @@ class Debugger(Character):
                 sound=sounds.sword_hit,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=30,
                 width=100,
                 height=100,
@@ -498,7 +479,7 @@ class Debugger(Character):
             images = sprite.frames
             image_hit = images[0]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_hit, "hitboxes": [sweet_spot]},
                 {"image": image_hit, "hitboxes": [sour_spot]},
                 {"image": image_hit},
@@ -512,12 +493,11 @@ class Debugger(Character):
                 {"image": image_hit},
                 {"image": image_hit},
             ]
-            super().__init__(character)
 
     class DashAttack(Move):
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=30,
                 width=30,
                 height=30,
@@ -529,7 +509,6 @@ class Debugger(Character):
                 sound=sounds.sword_hit,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=30,
                 width=20,
                 height=20,
@@ -545,7 +524,7 @@ class Debugger(Character):
             images = sprite.frames
             image_hit = images[1]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_hit, "hitboxes": [sweet_spot]},
                 {"image": image_hit, "hitboxes": [sour_spot]},
                 {"image": image_hit},
@@ -553,12 +532,11 @@ class Debugger(Character):
                 {"image": image_hit},
                 {"image": image_hit},
             ]
-            super().__init__(character)
 
     class DownTilt(Move):
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=30,
                 y_offset=30,
                 width=20,
@@ -570,7 +548,6 @@ class Debugger(Character):
                 damage=20,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=10,
                 y_offset=30,
                 width=30,
@@ -586,18 +563,17 @@ class Debugger(Character):
             images = sprite.frames
             image_hit = images[6]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_hit, "hitboxes": [sweet_spot, sour_spot]},
                 {"image": image_hit, "hitboxes": [sweet_spot, sour_spot]},
                 {"image": image_hit},
                 {"image": image_hit},
             ]
-            super().__init__(character)
 
     class ForwardTilt(Move):
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=30,
                 y_offset=0,
                 width=20,
@@ -609,7 +585,6 @@ class Debugger(Character):
                 damage=20,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=10,
                 y_offset=0,
                 width=30,
@@ -625,28 +600,31 @@ class Debugger(Character):
             images = sprite.frames
             image_hit = images[1]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_hit, "hitboxes": [sweet_spot, sour_spot]},
                 {"image": image_hit, "hitboxes": [sweet_spot, sour_spot]},
                 {"image": image_hit},
                 {"image": image_hit},
             ]
-            super().__init__(character)
 
     class AerialNeutralB(AerialMove):
         landing_lag = 0
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sprite = character.sprites[f"run_{character.facing}"]
             images = sprite.frames
             image_hit = images[1]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_hit},
                 {"image": image_hit},
                 {"image": image_hit},
                 {"image": image_hit},
             ]
+
+        def start(self):
+            character = self.character
             character.level.add_projectile(
                 HawkoLaser(
                     x=character.x,
@@ -655,14 +633,14 @@ class Debugger(Character):
                     owner=character,
                 )
             )
-            super().__init__(character)
+            super().start()
 
     class AerialUpB(AerialMove):
         landing_lag = 0
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=30,
                 width=50,
                 height=30,
@@ -674,7 +652,6 @@ class Debugger(Character):
                 sound=sounds.sword_hit,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=10,
                 y_offset=-30,
                 width=40,
@@ -692,7 +669,7 @@ class Debugger(Character):
             image = images[2]
             image2 = character.sprites[f"crouch_{character.facing}"].frames[0]
 
-            self.frame_mapping = [
+            return [
                 {"image": image2},
                 {"image": image2},
                 {"image": image, "hitboxes": [sweet_spot]},
@@ -709,9 +686,12 @@ class Debugger(Character):
                 {"image": image},
                 {"image": image},
             ]
+
+        def start(self):
+            character = self.character
             character.u = 0
             character.v = 0
-            super().__init__(character)
+            super().start()
 
         def handle_physics(self):
             character = self.character
@@ -4,7 +4,7 @@ import pygame
 from pygame import Color, Surface
 
 from src import sounds
-from src.characters import Character, AerialMove, Move
+from src.characters import Character, AerialMove, Move, Puppet
 from src.hitboxes import Hitbox
 from src.inputs import FightingGameInput
 from src.projectiles.hawko_laser import HawkoLaser
@@ -52,8 +52,8 @@ class Hawko(Character):
             textBitmap = font.render(textString, True, Color("black"))
             surface.blit(textBitmap, (x, y))
 
-        colliding = pygame.sprite.spritecollide(self, self.level.platforms, dokill=False)
-        touching = [plat for plat in self.level.platforms if self.touching(plat)]
+        colliding = self.level.colliding_platforms(self.rect)
+        touching = self.level.colliding_platforms(self.touch_box)
         try:
             state_name = self.state.__name__
         except AttributeError:
@@ -84,9 +84,9 @@ class Hawko(Character):
     class ForwardAir(AerialMove):
         landing_lag = 11
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=20,
                 width=80,
                 height=40,
@@ -97,7 +97,6 @@ class Hawko(Character):
                 damage=9,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=20,
                 width=80,
                 height=40,
@@ -111,7 +110,7 @@ class Hawko(Character):
             sprite = character.sprites[f"fair_{character.facing}"]
             images = sprite.images
 
-            self.frame_mapping = [
+            return [
                 {"image": images[0], "hitboxes": [sour_spot]},
                 {"image": images[0], "hitboxes": [sour_spot]},
                 {"image": images[1], "hitboxes": []},
@@ -125,14 +124,13 @@ class Hawko(Character):
                 {"image": images[1], "hitboxes": []},
                 {"image": images[1], "hitboxes": []},
             ]
-            super().__init__(character)
 
     class BackAir(AerialMove):
         landing_lag = 10
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=-25,
                 y_offset=10,
                 width=60,
@@ -144,7 +142,6 @@ class Hawko(Character):
                 damage=15,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=-30,
                 y_offset=10,
                 width=40,
@@ -157,7 +154,6 @@ class Hawko(Character):
                 higher_priority_sibling=sweet_spot,
             )
             weak_front = Hitbox(
-                owner=character,
                 x_offset=30,
                 y_offset=35,
                 width=40,
@@ -172,7 +168,7 @@ class Hawko(Character):
             sprite = character.sprites[f"bair_{character.facing}"]
             images = sprite.images
 
-            self.frame_mapping = [
+            return [
                 {"image": images[0], "hitboxes": [sweet_spot, weak_front]},
                 {"image": images[0], "hitboxes": [sweet_spot, weak_front]},
                 {"image": images[0], "hitboxes": [sweet_spot, weak_front]},
@@ -182,14 +178,13 @@ class Hawko(Character):
                 {"image": images[0], "hitboxes": [sour_spot, weak_front]},
                 {"image": images[0], "hitboxes": [sour_spot, weak_front]},
             ]
-            super().__init__(character)
 
     class UpAir(AerialMove):
         landing_lag = 9
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             first_hit = Hitbox(
-                owner=character,
                 y_offset=-25,
                 width=40,
                 height=60,
@@ -201,7 +196,6 @@ class Hawko(Character):
                 sound=None,
             )
             second_hit = Hitbox(
-                owner=character,
                 y_offset=-25,
                 width=40,
                 height=60,
@@ -214,7 +208,7 @@ class Hawko(Character):
             sprite = character.sprites[f"uair_{character.facing}"]
             images = sprite.images
 
-            self.frame_mapping = [
+            return [
                 {"image": images[0], "hitboxes": []},
                 {"image": images[1], "hitboxes": [first_hit]},
                 {"image": images[0], "hitboxes": []},
@@ -222,14 +216,13 @@ class Hawko(Character):
                 {"image": images[3], "hitboxes": []},
                 {"image": images[4], "hitboxes": []},
             ]
-            super().__init__(character)
 
     class DownAir(AerialMove):
         landing_lag = 9
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=25,
                 y_offset=35,
                 width=40,
@@ -242,7 +235,6 @@ class Hawko(Character):
                 sound=sounds.bighit,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=15,
                 y_offset=15,
                 width=60,
@@ -257,7 +249,7 @@ class Hawko(Character):
             sprite = character.sprites[f"dair_{character.facing}"]
             images = sprite.images
 
-            self.frame_mapping = [
+            return [
                 {"image": images[0], "hitboxes": [sweet_spot,sour_spot]},
                 {"image": images[1], "hitboxes": [sweet_spot,sour_spot]},
                 {"image": images[2], "hitboxes": [sweet_spot,sour_spot]},
@@ -271,14 +263,13 @@ class Hawko(Character):
                 {"image": images[2], "hitboxes": []},
                 {"image": images[3], "hitboxes": []},
             ]
-            super().__init__(character)
 
     class NeutralAir(AerialMove):
         landing_lag = 7
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=25,
                 y_offset=17,
                 width=50,
@@ -290,7 +281,6 @@ class Hawko(Character):
                 damage=12,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=25,
                 y_offset=17,
                 width=50,
@@ -303,7 +293,6 @@ class Hawko(Character):
                 higher_priority_sibling=sweet_spot,
             )
             back_weak = Hitbox(
-                owner=character,
                 x_offset=-15,
                 y_offset=30,
                 width=40,
@@ -319,7 +308,7 @@ class Hawko(Character):
             images = sprite.images
             image = images[0]
 
-            self.frame_mapping = [
+            return [
                 {"image": image, "hitboxes": [sweet_spot, back_weak]},
                 {"image": image, "hitboxes": [sweet_spot, back_weak]},
                 {"image": image, "hitboxes": [sour_spot, back_weak]},
@@ -327,12 +316,11 @@ class Hawko(Character):
                 {"image": image},
                 {"image": image},
             ]
-            super().__init__(character)
 
     class UpTilt(Move):
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             low = Hitbox(
-                owner=character,
                 x_offset=-15,
                 y_offset=10,
                 width=60,
@@ -342,9 +330,9 @@ class Hawko(Character):
                 knockback_angle=95,
                 knockback_growth=8,
                 damage=9,
+                swept=True,  # so the swing covers the arc from low to high
             )
             high = Hitbox(
-                owner=character,
                 x_offset=0,
                 y_offset=-15,
                 width=50,
@@ -355,11 +343,12 @@ class Hawko(Character):
                 knockback_growth=8,
                 damage=9,
                 higher_priority_sibling=low,
+                swept=True,
             )
             sprite = character.sprites[f"utilt_{character.facing}"]
             images = sprite.images
 
-            self.frame_mapping = [
+            return [
                 {"image": images[0], "hitboxes": []},
                 {"image": images[2], "hitboxes": [low]},
                 {"image": images[4], "hitboxes": [high]},
@@ -367,14 +356,13 @@ class Hawko(Character):
                 {"image": images[6], "hitboxes": []},
                 {"image": images[7], "hitboxes": []},
             ]
-            super().__init__(character)
 
     class Jab(Move):
         sound = sounds.swing3
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=30,
                 y_offset=0,
                 width=40,
@@ -390,32 +378,25 @@ class Hawko(Character):
             images = sprite.images
             image_hit = images[0]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_hit, "hitboxes": [sweet_spot]},
                 {"image": image_hit},
                 {"image": image_hit},
             ]
-            super().__init__(character)
 
     class DownSmash(Move):
-        def __init__(self, character: Character):
-            self.frame_mapping = []
-            super().__init__(character)
+        pass
 
     class UpSmash(Move):
-        def __init__(self, character: Character):
-            self.frame_mapping = []
-            super().__init__(character)
+        pass
 
     class ForwardSmash(Move):
-        def __init__(self, character: Character):
-            self.frame_mapping = []
-            super().__init__(character)
+        pass
 
     class DashAttack(Move):
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=30,
                 y_offset=20,
                 width=60,
@@ -428,7 +409,6 @@ class Hawko(Character):
                 sound=sounds.sword_hit,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=30,
                 y_offset=20,
                 width=60,
@@ -445,7 +425,7 @@ class Hawko(Character):
             images = sprite.images
             image_hit = images[0]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_hit, "hitboxes": [sweet_spot]},
                 {"image": image_hit, "hitboxes": [sour_spot]},
                 {"image": image_hit},
@@ -453,13 +433,16 @@ class Hawko(Character):
                 {"image": image_hit},
                 {"image": image_hit},
             ]
+
+        def start(self):
+            character = self.character
             character.u = 13 if character.facing_right else -13
-            super().__init__(character)
+            super().start()
 
     class DownTilt(Move):
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=50,
                 y_offset=40,
                 width=30,
@@ -472,7 +455,6 @@ class Hawko(Character):
                 sound=sounds.sword_hit,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=10,
                 y_offset=30,
                 width=30,
@@ -488,19 +470,18 @@ class Hawko(Character):
             sprite = character.sprites[f"dtilt_{character.facing}"]
             images = sprite.images
 
-            self.frame_mapping = [
+            return [
                 {"image": images[0]},
                 {"image": images[1]},
                 {"image": images[3], "hitboxes": [sweet_spot, sour_spot]},
                 {"image": images[4], "hitboxes": [sweet_spot, sour_spot]},
                 {"image": images[5]},
             ]
-            super().__init__(character)
 
     class ForwardTilt(Move):
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=30,
                 y_offset=15,
                 width=60,
@@ -512,7 +493,6 @@ class Hawko(Character):
                 damage=9,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=30,
                 y_offset=15,
                 width=60,
@@ -527,24 +507,24 @@ class Hawko(Character):
             sprite = character.sprites[f"ftilt_{character.facing}"]
             images = sprite.images
 
-            self.frame_mapping = [
+            return [
                 {"image": images[0], "hitboxes": []},
                 {"image": images[1], "hitboxes": [sweet_spot]},
                 {"image": images[2], "hitboxes": [sour_spot]},
                 {"image": images[3], "hitboxes": []},
                 {"image": images[4], "hitboxes": []},
             ]
-            super().__init__(character)
 
     class AerialNeutralB(AerialMove):
         landing_lag = 0
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sprite = character.sprites[f"aerial_laser_{character.facing}"]
             images = sprite.images
             image_hit = images[0]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_hit},
                 {"image": image_hit},
                 {"image": image_hit},
@@ -555,8 +535,10 @@ class Hawko(Character):
                 {"image": image_hit},
                 {"image": image_hit},
             ]
+
+        def start(self):
             sounds.falco.gun.play()
-            super().__init__(character)
+            super().start()
 
         def __call__(self):
             super().__call__()
@@ -576,10 +558,6 @@ class Hawko(Character):
     class AerialUpB(AerialMove):
         landing_lag = 0
 
-        def __init__(self, character: Character):
-            self.frame_mapping = []
-            super().__init__(character)
-
         def handle_physics(self):
             character = self.character
             if character.animation_frame < 2:
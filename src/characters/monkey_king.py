@@ -2,7 +2,7 @@ import pygame
 from pygame import Color, Surface
 
 from src import sounds
-from src.characters import Character, AerialMove, Move
+from src.characters import Character, AerialMove, Move, Puppet
 from src.hitboxes import Hitbox
 from src.inputs import FightingGameInput
 from src.projectiles.hawko_laser import HawkoLaser
@@ -60,8 +60,8 @@ class MonkeyKing(Character):
             textBitmap = font.render(textString, True, Color("black"))
             surface.blit(textBitmap, (x, y))
 
-        colliding = pygame.sprite.spritecollide(self, self.level.platforms, dokill=False)
-        touching = [plat for plat in self.level.platforms if self.touching(plat)]
+        colliding = self.level.colliding_platforms(self.rect)
+        touching = self.level.colliding_platforms(self.touch_box)
         try:
             state_name = self.state.__name__
         except AttributeError:
@@ -92,9 +92,9 @@ class MonkeyKing(Character):
     class ForwardAir(AerialMove):
         landing_lag = 15
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             wap = Hitbox(
-                owner=character,
                 x_offset=15,
                 y_offset=-65,
                 width=110,
@@ -106,7 +106,6 @@ class MonkeyKing(Character):
                 damage=16,
             )
             spike = Hitbox(
-                owner=character,
                 y_offset=30,
                 x_offset=40,
                 width=80,
@@ -119,7 +118,6 @@ class MonkeyKing(Character):
                 higher_priority_sibling=wap,
             )
             wap2 = Hitbox(
-                owner=character,
                 x_offset=65,
                 y_offset=-10,
                 width=60,
@@ -134,7 +132,7 @@ class MonkeyKing(Character):
             sprite = character.sprites[f"fair_{character.facing}"]
             images = sprite.images
 
-            self.frame_mapping = [
+            return [
                 {"image": images[0], "hitboxes": []},
                 {"image": images[1], "hitboxes": []},
                 {"image": images[2], "hitboxes": []},
@@ -147,14 +145,13 @@ class MonkeyKing(Character):
                 {"image": images[7], "hitboxes": []},
                 {"image": images[8], "hitboxes": []},
             ]
-            super().__init__(character)
 
     class BackAir(AerialMove):
         landing_lag = 7
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=-50,
                 y_offset=10,
                 width=80,
@@ -166,7 +163,6 @@ class MonkeyKing(Character):
                 damage=13,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=-50,
                 y_offset=10,
                 width=60,
@@ -179,7 +175,6 @@ class MonkeyKing(Character):
                 higher_priority_sibling=sweet_spot,
             )
             weak_front = Hitbox(
-                owner=character,
                 x_offset=20,
                 y_offset=25,
                 width=30,
@@ -194,7 +189,7 @@ class MonkeyKing(Character):
             sprite = character.sprites[f"bair_{character.facing}"]
             images = sprite.images
 
-            self.frame_mapping = [
+            return [
                 {"image": images[0], "hitboxes": []},
                 {"image": images[1], "hitboxes": []},
                 {"image": images[2], "hitboxes": [sweet_spot, weak_front]},
@@ -203,14 +198,13 @@ class MonkeyKing(Character):
                 {"image": images[2], "hitboxes": [sour_spot, weak_front]},
                 {"image": images[1], "hitboxes": []},
             ]
-            super().__init__(character)
 
     class UpAir(AerialMove):
         landing_lag = 12
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             zeroth_hit = Hitbox(
-                owner=character,
                 x_offset=-45,
                 y_offset=-40,
                 width=40,
@@ -223,7 +217,6 @@ class MonkeyKing(Character):
                 sound=sounds.smack,
             )
             first_hit = Hitbox(
-                owner=character,
                 x_offset=5,
                 y_offset=-55,
                 width=100,
@@ -237,7 +230,6 @@ class MonkeyKing(Character):
                 higher_priority_sibling=zeroth_hit,
             )
             second_hit = Hitbox(
-                owner=character,
                 x_offset=40,
                 y_offset=-10,
                 width=60,
@@ -253,7 +245,7 @@ class MonkeyKing(Character):
             sprite = character.sprites[f"uair_{character.facing}"]
             images = sprite.images
 
-            self.frame_mapping = [
+            return [
                 {"image": images[0], "hitboxes": []},
                 {"image": images[1], "hitboxes": []},
                 {"image": images[1], "hitboxes": [zeroth_hit]},
@@ -263,14 +255,13 @@ class MonkeyKing(Character):
                 {"image": images[3], "hitboxes": []},
                 {"image": images[3], "hitboxes": []},
             ]
-            super().__init__(character)
 
     class DownAir(AerialMove):
         landing_lag = 15
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=10,
                 y_offset=30,
                 width=60,
@@ -283,7 +274,6 @@ class MonkeyKing(Character):
                 sound=sounds.bighit,
             )
             sweet_spot2 = Hitbox(
-                owner=character,
                 x_offset=5,
                 y_offset=40,
                 width=60,
@@ -297,7 +287,6 @@ class MonkeyKing(Character):
                 higher_priority_sibling=sweet_spot,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=5,
                 y_offset=40,
                 width=40,
@@ -313,7 +302,7 @@ class MonkeyKing(Character):
             sprite = character.sprites[f"dair_{character.facing}"]
             images = sprite.images
 
-            self.frame_mapping = [
+            return [
                 {"image": images[0], "hitboxes": []},
                 {"image": images[1], "hitboxes": []},
                 {"image": images[1], "hitboxes": []},
@@ -329,14 +318,13 @@ class MonkeyKing(Character):
                 {"image": images[3], "hitboxes": []},
                 {"image": images[3], "hitboxes": []},
             ]
-            super().__init__(character)
 
     class NeutralAir(AerialMove):
         landing_lag = 10
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             front1 = Hitbox(
-                owner=character,
                 x_offset=30,
                 y_offset=0,
                 width=90,
@@ -348,7 +336,6 @@ class MonkeyKing(Character):
                 damage=12,
             )
             back1 = Hitbox(
-                owner=character,
                 x_offset=-45,
                 y_offset=-35,
                 width=50,
@@ -361,7 +348,6 @@ class MonkeyKing(Character):
                 higher_priority_sibling=front1,
             )
             front2 = Hitbox(
-                owner=character,
                 x_offset=50,
                 y_offset=-5,
                 width=70,
@@ -374,7 +360,6 @@ class MonkeyKing(Character):
                 # higher_priority_sibling=back1,
             )
             back2 = Hitbox(
-                owner=character,
                 x_offset=-45,
                 y_offset=-35,
                 width=50,
@@ -389,7 +374,7 @@ class MonkeyKing(Character):
             sprite = character.sprites[f"nair_{character.facing}"]
             images = sprite.images
 
-            self.frame_mapping = [
+            return [
                 dict(image=images[0], hitboxes=[]),
                 dict(image=images[1], hitboxes=[front1, back1]),
                 dict(image=images[2], hitboxes=[]),
@@ -397,12 +382,11 @@ class MonkeyKing(Character):
                 dict(image=images[4]),
                 dict(image=images[5], hitboxes=[front2, back2]),
             ]
-            super().__init__(character)
 
     class UpTilt(Move):
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             hit1 = Hitbox(
-                owner=character,
                 x_offset=45,
                 y_offset=-20,
                 width=80,
@@ -414,7 +398,6 @@ class MonkeyKing(Character):
                 damage=11,
             )
             hit2 = Hitbox(
-                owner=character,
                 x_offset=-20,
                 y_offset=-30,
                 width=130,
@@ -427,7 +410,6 @@ class MonkeyKing(Character):
                 higher_priority_sibling=hit1,
             )
             hit3 = Hitbox(
-                owner=character,
                 x_offset=-70,
                 y_offset=0,
                 width=40,
@@ -442,21 +424,20 @@ class MonkeyKing(Character):
             sprite = character.sprites[f"utilt_{character.facing}"]
             images = sprite.images
 
-            self.frame_mapping = [
+            return [
                 {"image": images[0], "hitboxes": []},
                 {"image": images[1], "hitboxes": [hit1]},
                 {"image": images[2], "hitboxes": [hit2, hit3]},
                 {"image": images[2], "hitboxes": [hit2, hit3]},
                 {"image": images[3], "hitboxes": []},
             ]
-            super().__init__(character)
 
     class Jab(Move):
         sound = sounds.swing3
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=65,
                 y_offset=15,
                 width=40,
@@ -471,34 +452,27 @@ class MonkeyKing(Character):
             sprite = character.sprites[f"jab_{character.facing}"]
             images = sprite.images
 
-            self.frame_mapping = [
+            return [
                 {"image": images[0], "hitboxes": [sweet_spot]},
                 {"image": images[1]},
                 {"image": images[1]},
                 {"image": images[1]},
                 {"image": images[1]},
             ]
-            super().__init__(character)
 
     class DownSmash(Move):
-        def __init__(self, character: Character):
-            self.frame_mapping = []
-            super().__init__(character)
+        pass
 
     class UpSmash(Move):
-        def __init__(self, character: Character):
-            self.frame_mapping = []
-            super().__init__(character)
+        pass
 
     class ForwardSmash(Move):
-        def __init__(self, character: Character):
-            self.frame_mapping = []
-            super().__init__(character)
+        pass
 
     class DashAttack(Move):
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=30,
                 y_offset=20,
                 width=60,
@@ -511,7 +485,6 @@ class MonkeyKing(Character):
                 sound=sounds.sword_hit,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=30,
                 y_offset=20,
                 width=60,
@@ -528,7 +501,7 @@ class MonkeyKing(Character):
             images = sprite.images
             image_hit = images[0]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_hit, "hitboxes": [sweet_spot]},
                 {"image": image_hit, "hitboxes": [sour_spot]},
                 {"image": image_hit},
@@ -536,13 +509,16 @@ class MonkeyKing(Character):
                 {"image": image_hit},
                 {"image": image_hit},
             ]
+
+        def start(self):
+            character = self.character
             character.u = 13 if character.facing_right else -13
-            super().__init__(character)
+            super().start()
 
     class DownTilt(Move):
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=65,
                 y_offset=27,
                 width=50,
@@ -555,7 +531,6 @@ class MonkeyKing(Character):
                 sound=sounds.smack,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=10,
                 y_offset=30,
                 width=60,
@@ -571,7 +546,7 @@ class MonkeyKing(Character):
             sprite = character.sprites[f"dtilt_{character.facing}"]
             images = sprite.images
 
-            self.frame_mapping = [
+            return [
                 dict(image=images[0]),
                 dict(image=images[1]),
                 dict(image=images[2], hitboxes=[sweet_spot, sour_spot]),
@@ -579,15 +554,14 @@ class MonkeyKing(Character):
                 dict(image=images[4]),
                 dict(image=images[4]),
             ]
-            super().__init__(character)
 
         def get_next_state(self):
             return self.character.state_crouch
 
     class ForwardTilt(Move):
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sweet_spot = Hitbox(
-                owner=character,
                 x_offset=35,
                 y_offset=10,
                 width=130,
@@ -599,7 +573,6 @@ class MonkeyKing(Character):
                 damage=10,
             )
             sour_spot = Hitbox(
-                owner=character,
                 x_offset=-15,
                 y_offset=-40,
                 width=120,
@@ -614,7 +587,7 @@ class MonkeyKing(Character):
             sprite = character.sprites[f"ftilt_{character.facing}"]
             images = sprite.images
 
-            self.frame_mapping = [
+            return [
                 {"image": images[0], "hitboxes": []},
                 {"image": images[1], "hitboxes": []},
                 {"image": images[2], "hitboxes": [sweet_spot]},
@@ -622,17 +595,17 @@ class MonkeyKing(Character):
                 {"image": images[4], "hitboxes": []},
                 {"image": images[4], "hitboxes": []},
             ]
-            super().__init__(character)
 
     class AerialNeutralB(AerialMove):
         landing_lag = 0
 
-        def __init__(self, character: Character):
+        @classmethod
+        def frames(cls, character: Puppet) -> [dict]:
             sprite = character.sprites[f"aerial_laser_{character.facing}"]
             images = sprite.images
             image_hit = images[0]
 
-            self.frame_mapping = [
+            return [
                 {"image": image_hit},
                 {"image": image_hit},
                 {"image": image_hit},
@@ -643,8 +616,10 @@ class MonkeyKing(Character):
                 {"image": image_hit},
                 {"image": image_hit},
             ]
+
+        def start(self):
             sounds.falco.gun.play()
-            super().__init__(character)
+            super().start()
 
         def __call__(self):
             super().__call__()
@@ -664,10 +639,6 @@ class MonkeyKing(Character):
     class AerialUpB(AerialMove):
         landing_lag = 0
 
-        def __init__(self, character: Character):
-            self.frame_mapping = []
-            super().__init__(character)
-
         def handle_physics(self):
             character = self.character
             if character.animation_frame < 2:
@@ -0,0 +1,283 @@
+import math
+from bisect import insort
+from collections import defaultdict
+from typing import NamedTuple
+
+import numpy
+from pygame.rect import Rect
+
+
+class SpatialHash:
+    """
+    Uniform grid broadphase. Each item is stored in every grid cell its rect overlaps, so a query
+    only has to look at the items in the cells overlapping the query rect, instead of scanning
+    every item.
+
+    Items come back in the order they were inserted. This means swapping a linear scan (e.g.
+    pygame.sprite.spritecollide) for a SpatialHash doesn't change the order in which collisions
+    are handled.
+    """
+
+    def __init__(self, cell_size: int = 128):
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)  # (column, row) -> [items]
+        self.rects = {}  # item -> its rect
+        self.ranges = {}  # item -> the cell range it's stored under
+        self.order = {}  # item -> insertion index
+        self.queries = {}  # cell range -> items in those cells
+        self._count = 0
+
+    def __len__(self):
+        return len(self.rects)
+
+    def __contains__(self, item):
+        return item in self.rects
+
+    def clear(self):
+        self.cells.clear()
+        self.rects.clear()
+        self.ranges.clear()
+        self.order.clear()
+        self.queries.clear()
+        self._count = 0
+
+    def cell_range(self, rect: Rect) -> (int, int, int, int):
+        """The first and last (column, row) overlapped by the rect."""
+        size = self.cell_size
+        # zero-size rects still occupy the cell they're in
+        right = max(rect.right - 1, rect.left)
+        bottom = max(rect.bottom - 1, rect.top)
+        return rect.left // size, rect.top // size, right // size, bottom // size
+
+    def cell_coords(self, rect: Rect):
+        """All the (column, row) cells overlapped by the rect."""
+        return self._cells_in(self.cell_range(rect))
+
+    @staticmethod
+    def _cells_in(cell_range: tuple):
+        left, top, right, bottom = cell_range
+        for column in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                yield column, row
+
+    def insert(self, item, rect: Rect):
+        self.rects[item] = rect
+        self.ranges[item] = self.cell_range(rect)
+        self.order[item] = self._count
+        self._count += 1
+        self.queries.clear()
+        for cell in self.cell_coords(rect):
+            self.cells[cell].append(item)
+
+    def move(self, item, rect: Rect):
+        """
+        Give an item that's already in the index a new rect. Only the cells the item leaves or
+        enters are touched, and it keeps its place in the insertion order, so moving a few items
+        each tick is much cheaper than rebuilding the index.
+
+        The rect can be the one the item was inserted with, moved in place: the cells the item
+        is stored under are remembered separately.
+        """
+        old_range = self.ranges[item]
+        new_range = self.cell_range(rect)
+        self.rects[item] = rect
+        self.ranges[item] = new_range
+        if new_range == old_range:
+            return  # same cells, so the cached queries still hold
+        cells = self.cells
+        old_cells = set(self._cells_in(old_range))
+        new_cells = set(self._cells_in(new_range))
+        for cell in old_cells - new_cells:
+            items = cells[cell]
+            items.remove(item)
+            if not items:
+                del cells[cell]
+        for cell in new_cells - old_cells:
+            insort(cells[cell], item, key=self.order.__getitem__)
+        self.queries.clear()
+
+    def bake(self) -> dict:
+        """
+        The grid, with items replaced by their insertion index, in a form that can be saved as
+        JSON. Passing it to .unbake() with the same items fills an index without working out
+        which cells each item covers again.
+        """
+        order = self.order
+        return dict(
+            cell_size=self.cell_size,
+            cells=[
+                [column, row, [order[item] for item in items]]
+                for (column, row), items in self.cells.items()
+            ],
+        )
+
+    def unbake(self, items: list, rects: list, baked: dict):
+        """
+        Fill the index from .bake() output.
+        :param items: the items, in the order they were inserted into the baked index
+        :param rects: each item's rect
+        """
+        self.clear()
+        self.cell_size = baked["cell_size"]
+        for item, rect in zip(items, rects):
+            self.rects[item] = rect
+            self.ranges[item] = self.cell_range(rect)
+            self.order[item] = self._count
+            self._count += 1
+        cells = self.cells
+        for column, row, numbers in baked["cells"]:
+            cells[column, row] = [items[number] for number in numbers]
+
+    def _candidates(self, cell_range: tuple) -> tuple:
+        """
+        Items in the block of cells, in insertion order. The result is remembered until the
+        next insert, so repeated queries against an index that doesn't change (e.g. the level's
+        platforms) skip straight to the narrowphase.
+        """
+        found = self.queries.get(cell_range)
+        if found is None:
+            left, top, right, bottom = cell_range
+            cells = self.cells
+            occupied = [
+                items
+                for column in range(left, right + 1)
+                for row in range(top, bottom + 1)
+                if (items := cells.get((column, row)))
+            ]
+            if len(occupied) == 1:
+                found = tuple(occupied[0])  # each cell's items are already in insertion order
+            else:
+                found = tuple(sorted(set().union(*occupied), key=self.order.__getitem__))
+            self.queries[cell_range] = found
+        return found
+
+    def candidates(self, rect: Rect) -> list:
+        """Items sharing at least one grid cell with the rect. These might not actually overlap
+        the rect; that's for the narrowphase to decide."""
+        return list(self._candidates(self.cell_range(rect)))
+
+    def collide(self, rect: Rect) -> list:
+        """Items whose rect overlaps the given rect."""
+        rects = self.rects
+        candidates = self._candidates(self.cell_range(rect))
+        return [item for item in candidates if rects[item].colliderect(rect)]
+
+
+class Capsule(NamedTuple):
+    """
+    A line segment with a radius: all the points within `radius` of the segment from
+    (x - dx, y - dy) to (x + dx, y + dy). Used as the true shape of hitboxes and hurtboxes;
+    their rects are only the broadphase.
+    """
+
+    x: float
+    y: float
+    dx: float
+    dy: float
+    radius: float
+
+    @classmethod
+    def fit(cls, width: float, height: float, rotation: float = 0, x=0, y=0) -> "Capsule":
+        """
+        The capsule filling a width x height box (so a circle, if the box is square), rotated
+        anticlockwise by `rotation` degrees about the center of the box, at x, y.
+        """
+        radius = min(width, height) / 2
+        half_length = max(width, height) / 2 - radius
+        angle = math.radians(rotation if width >= height else rotation + 90)
+        # y is down the screen, so anticlockwise is towards -y
+        return cls(x, y, half_length * math.cos(angle), -half_length * math.sin(angle), radius)
+
+    @classmethod
+    def from_rect(cls, rect: Rect) -> "Capsule":
+        return cls.fit(rect.width, rect.height, x=rect.centerx, y=rect.centery)
+
+    def moved_to(self, x: float, y: float) -> "Capsule":
+        return Capsule(x, y, self.dx, self.dy, self.radius)
+
+    def bounding_rect(self) -> Rect:
+        """The smallest rect the capsule fits in"""
+        half_width = abs(self.dx) + self.radius
+        half_height = abs(self.dy) + self.radius
+        left = math.floor(self.x - half_width)
+        top = math.floor(self.y - half_height)
+        right = math.ceil(self.x + half_width)
+        bottom = math.ceil(self.y + half_height)
+        return Rect(left, top, right - left, bottom - top)
+
+
+def capsules_overlap(
+    a: numpy.ndarray, b: numpy.ndarray, sweeps: numpy.ndarray = None
+) -> numpy.ndarray:
+    """
+    Narrowphase for many pairs of capsules at once.
+    :param a: one capsule (x, y, dx, dy, radius) per row
+    :param b: the capsules to test them against, one per row
+    :param sweeps: how far each of a's capsules has moved since the last tick (x, y per row),
+        if they're swept. A swept capsule covers everything it passed over on the way, so
+        fast-moving capsules can't skip past things.
+    :return: whether each pair overlaps. Capsules that only touch don't, same as with Rects.
+    """
+    p0 = a[:, :2] - a[:, 2:4]
+    d1 = 2 * a[:, 2:4]
+    q0 = b[:, :2] - b[:, 2:4]
+    d2 = 2 * b[:, 2:4]
+    gaps = _segment_distance_squared(p0, d1, q0, d2)
+    if sweeps is not None:
+        moved = numpy.flatnonzero(sweeps.any(axis=1))
+        if moved.size:
+            gaps[moved] = _swept_distance_squared(
+                p0[moved], d1[moved], sweeps[moved], q0[moved], d2[moved], gaps[moved]
+            )
+    reach = a[:, 4] + b[:, 4]
+    return gaps < reach * reach
+
+
+def _segment_distance_squared(p0, d1, q0, d2) -> numpy.ndarray:
+    """Squared distance between the segments p0 + s * d1 and q0 + t * d2 (0 <= s, t <= 1)"""
+    # the closest points between the segments (Ericson, Real-Time Collision Detection, 5.1.9)
+    r = p0 - q0
+    aa = numpy.einsum("ij,ij->i", d1, d1)
+    bb = numpy.einsum("ij,ij->i", d1, d2)
+    cc = numpy.einsum("ij,ij->i", d1, r)
+    ee = numpy.einsum("ij,ij->i", d2, d2)
+    ff = numpy.einsum("ij,ij->i", d2, r)
+    # parallel segments (including points) have no single closest pair; start from s = 0
+    s = numpy.clip(_divide(bb * ff - cc * ee, aa * ee - bb * bb), 0, 1)
+    s = numpy.where(ee == 0, numpy.clip(_divide(-cc, aa), 0, 1), s)
+    t = _divide(bb * s + ff, ee)
+    # if the closest point is off the end of the second segment, clamp it and try again
+    s = numpy.where(t < 0, numpy.clip(_divide(-cc, aa), 0, 1), s)
+    s = numpy.where(t > 1, numpy.clip(_divide(bb - cc, aa), 0, 1), s)
+    t = numpy.clip(t, 0, 1)
+    gap = p0 + d1 * s[:, None] - q0 - d2 * t[:, None]
+    return numpy.einsum("ij,ij->i", gap, gap)
+
+
+def _swept_distance_squared(p0, d1, sweep, q0, d2, gaps) -> numpy.ndarray:
+    """
+    Squared distance between the segments q0 + t * d2 and the parallelogram swept out by the
+    segments p0 + s * d1 moving here by `sweep`.
+    :param gaps: the squared distances to the segments where they are now
+    """
+    start = p0 - sweep
+    # the parallelogram's other three sides: where the segment was, and the paths of its ends
+    for origin, direction in ((start, d1), (start, sweep), (start + d1, sweep)):
+        gaps = numpy.minimum(gaps, _segment_distance_squared(origin, direction, q0, d2))
+    # a segment inside the parallelogram doesn't touch its sides: check one of its ends
+    w = q0 - start
+    det = _cross(d1, sweep)
+    alpha = _divide(_cross(w, sweep), det)
+    beta = _divide(_cross(d1, w), det)
+    inside = (det != 0) & (alpha >= 0) & (alpha <= 1) & (beta >= 0) & (beta <= 1)
+    return numpy.where(inside, 0, gaps)
+
+
+def _cross(u: numpy.ndarray, v: numpy.ndarray) -> numpy.ndarray:
+    return u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]
+
+
+def _divide(numerator: numpy.ndarray, denominator: numpy.ndarray) -> numpy.ndarray:
+    """numerator / denominator, or 0 where the denominator is 0"""
+    out = numpy.zeros_like(numerator)
+    return numpy.divide(numerator, denominator, out=out, where=denominator != 0)
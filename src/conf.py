@@ -1,3 +1,5 @@
+import os
+
 FPS = 60
 SCREEN_WIDTH = 1800
 SCREEN_HEIGHT = 900
@@ -10,3 +12,10 @@ SPRITE_SIZE = (32, 32)
 SCALE_SPRITES = 3  # how much to scale up sprites
 
 INPUT_BUFFER = 6
+
+# skip the window, drawing and audio. Set this before importing anything else from src.
+HEADLESS = bool(os.environ.get("PIXEL_PUNCHER_HEADLESS"))
+
+# redraw only the parts of the window that changed each frame (see src.rendering). Faster where
+# filling and flipping the whole window is the bottleneck.
+DIRTY_RECTS = bool(os.environ.get("PIXEL_PUNCHER_DIRTY_RECTS"))
@@ -1,8 +1,18 @@
-from robingame.input import GamecubeController
+import argparse
+
+import pygame
+from pygame import Rect
+from robingame.input import EventQueue, GamecubeController
 from robingame.objects import Game
 
 from src import conf
 from src.inputs import Keyboard0, Keyboard1
+from src.levels import Level
+from src.profiling import profiler
+from src.rendering import DirtyRectRenderer
+
+# robingame's controller visualizer draws itself on a panel this size, at its (x, y)
+GUI_PANEL_SIZE = (160, 120)
 
 
 class PixelPuncher(Game):
@@ -15,7 +25,10 @@ class PixelPuncher(Game):
     font_size = 50
     parental_name = "game"
 
-    def __init__(self):
+    def __init__(self, netplay: dict = None):
+        """
+        :param netplay: arguments for a NetplayMatch to play, instead of the sandbox
+        """
         super().__init__()
 
         # input devices
@@ -31,15 +44,88 @@ class PixelPuncher(Game):
             self.controller0,
             self.controller1,
         ]
-        from src.scenes import SandBox
+        from src.scenes import NetplayMatch, SandBox
 
-        self.add_scene(SandBox())
+        self.add_scene(NetplayMatch(**netplay) if netplay else SandBox())
+        self.renderer = DirtyRectRenderer() if conf.DIRTY_RECTS else None
 
     def read_inputs(self):
         super().read_inputs()
         for device in self.input_devices:
             device.read_new_inputs()
+        for event in EventQueue.events:
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F2:
+                profiler.toggle()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.export_chrome_trace("trace.json")
+
+    def _update(self):
+        profiler.end_frame()
+        super()._update()
+
+    def _draw(self, surface, debug=False):
+        scene = self.dirty_rect_scene()
+        if not scene:
+            if self.renderer:
+                self.renderer.full_redraw = True
+            super()._draw(surface, debug)
+            return
+        rects = self.renderer.draw(scene.level, surface, debug)
+        overlays = []
+        for element in scene.gui_elements:
+            element.draw(surface, debug)
+            overlays.append(Rect((element.x, element.y), GUI_PANEL_SIZE))
+        if profiler.enabled:
+            rect = profiler.draw(surface, self.font)
+            if rect:
+                overlays.append(rect)
+        self.renderer.add_overlays(overlays)
+        self.fps_tracker.draw(surface, debug)  # only in debug mode, which redraws everything
+        pygame.display.update(rects + overlays)
+
+    def draw(self, surface, debug=False):
+        super().draw(surface, debug)
+        if profiler.enabled:
+            profiler.draw(surface, self.font)
+
+    def dirty_rect_scene(self):
+        """The scene to draw with the DirtyRectRenderer: only if it's switched on (see
+        conf.DIRTY_RECTS) and the only scene is a level with its GUI. Anything else (e.g. the
+        menus) is drawn in full."""
+        if not self.renderer:
+            return None
+        scenes = self.scenes.sprites()
+        if len(scenes) != 1 or not isinstance(getattr(scenes[0], "level", None), Level):
+            return None
+        return scenes[0]
+
+
+def main():
+    from src.netcode import LoopbackTransport
+
+    parser = argparse.ArgumentParser(description="Play Pixel Puncher.")
+    parser.add_argument(
+        "--netplay",
+        nargs=2,
+        type=int,
+        metavar=("PORT", "PEER_PORT"),
+        help="play against another copy of the game on this machine, over rollback netcode",
+    )
+    parser.add_argument("--player", type=int, choices=(0, 1), default=0, help="for netplay")
+    parser.add_argument("--latency", type=float, default=0, help="extra one-way, in seconds")
+    parser.add_argument("--packet-loss", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=0, help="must be the same for both peers")
+    args = parser.parse_args()
+
+    netplay = None
+    if args.netplay:
+        port, peer_port = args.netplay
+        transport = LoopbackTransport(
+            port, peer_port, latency=args.latency, packet_loss=args.packet_loss
+        )
+        netplay = dict(transport=transport, local_player=args.player, seed=args.seed)
+    PixelPuncher(netplay=netplay).main()
 
 
 if __name__ == "__main__":
-    PixelPuncher().main()
+    main()
@@ -0,0 +1,21 @@
+"""
+Running without a window, drawing or audio, for the command line tools (simulations,
+benchmarks, replays, netcode) and the tests.
+"""
+
+import os
+
+
+def go_headless():
+    """
+    Use SDL's dummy video and audio drivers, and set src.conf.HEADLESS. Settings already in the
+    environment win.
+
+    Call it from an entry point (a `__main__` block, or conftest.py) before pygame or anything
+    else from src is imported, because the drivers and conf.HEADLESS are read at import time.
+    Never call it from module scope: importing a tool's module must not change how the rest of
+    the process runs.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("PIXEL_PUNCHER_HEADLESS", "1")
@@ -1,28 +1,30 @@
-from collections import deque
+from collections import defaultdict
 
+import numpy
 import pygame
 from pygame.rect import Rect
 
 from robingame.objects import PhysicalEntity
 from robingame.utils import draw_arrow
 from src import sounds
+from src.collision import Capsule, SpatialHash, capsules_overlap
 from src.conf import HITSTUN_CONSTANT, HITPAUSE_CONSTANT
 from src.projectiles import Projectile
 
 
-class Hitbox(PhysicalEntity):
+class Hitbox:
     """
-    A hitbox always has an owner. It follows its owner's x/y position. The x/y_offset attributes
-    allow us to position the hitbox relative to its owner.
+    What a hitbox does: its shape, damage and knockback, and where it is relative to whoever
+    uses it. Hitboxes are definitions, shared by every character doing the same move (or every
+    projectile of a kind), so treat them as immutable once they're set up. An ActiveHitbox puts
+    one into play for a particular owner.
     """
 
     debug_color = (60, 0, 0)
     sound = sounds.hit
-    owner: PhysicalEntity
 
     def __init__(
         self,
-        owner: PhysicalEntity,
         width: int,
         height: int,
         x_offset: int = 0,
@@ -33,47 +35,68 @@ class Hitbox(PhysicalEntity):
         knockback_growth: float = 0,
         knockback_angle: float = 0,
         damage: float = 0,
-        higher_priority_sibling: PhysicalEntity = None,
-        lower_priority_sibling: PhysicalEntity = None,
+        higher_priority_sibling: "Hitbox" = None,
+        lower_priority_sibling: "Hitbox" = None,
         sound=None,
+        swept: bool = False,
     ):
-        super().__init__()
+        """
+        :param swept: whether the hitbox also covers everything it passed over since the last
+            tick, so that it can't skip past targets when it moves fast
+        """
         self.x_offset = x_offset
         self.y_offset = y_offset
-        self.owner = owner
         self.width = width
         self.height = height
-        self.rect = Rect(0, 0, self.width, self.height)
         self.rotation = rotation
         self.damage = damage
         self.base_knockback = base_knockback
         self.fixed_knockback = fixed_knockback
         self.knockback_angle = knockback_angle
         self.knockback_growth = knockback_growth
+        self.swept = swept
+        self._higher_priority_sibling = None
+        self._lower_priority_sibling = None
+        self._mirrored = None
+        self._shape = None
+        self._bounds = None
+        self.priority_group = PriorityGroup([self])
         self.higher_priority_sibling = higher_priority_sibling
         self.lower_priority_sibling = lower_priority_sibling
         if sound:
             self.sound = sound
 
-        self.image = self.create_image()
+    @property
+    def shape(self) -> Capsule:
+        """The capsule filling the hitbox's width x height, rotated, and centered on 0, 0"""
+        if self._shape is None:
+            self._shape = Capsule.fit(self.width, self.height, self.rotation)
+        return self._shape
 
-    def create_image(self):
-        image = pygame.Surface((self.width, self.height))
-        pygame.draw.ellipse(image, self.debug_color, (0, 0, self.width, self.height))
-        image.set_colorkey((0, 0, 0))
-        image = pygame.transform.rotate(image, self.rotation)
-        return image
+    @property
+    def bounds(self) -> Rect:
+        """The shape's bounding rect"""
+        if self._bounds is None:
+            self._bounds = self.shape.bounding_rect()
+        return self._bounds
+
+    @property
+    def image(self) -> pygame.Surface:
+        """Only made when the hitbox is first drawn in debug mode"""
+        return debug_image(self.width, self.height, self.rotation, self.debug_color)
 
     def __repr__(self):
         return f"Hitbox with id {id(self)}"
 
-    def handle_hit(self, object):
-        """Object is the entity hit by this hitbox. I've passed it here so that hitboxes can do
-        context specific stuff e.g. trigger the object's "electrocute" animation if the hitbox is
-        electric"""
-        self.level.screen_shake += 10
-        self.sound.play()
-        self.owner.handle_land_hit(hitbox=self)
+    def __copy__(self):
+        """A copy is a separate hitbox, so it needs its own priority group. Otherwise it would
+        count as having hit everything the original hit."""
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        clone._mirrored = None
+        members = [clone if hitbox is self else hitbox for hitbox in self.priority_group.members]
+        clone.priority_group = PriorityGroup(members)
+        return clone
 
     @property
     def hitpause_duration(self):
@@ -85,36 +108,12 @@ class Hitbox(PhysicalEntity):
         return round(knockback * HITSTUN_CONSTANT)
 
     @property
-    def rect(self):
-        """If the hitbox has an owner, it will follow its owner's x and y (offset by x_offset
-        and y_offset)."""
-        self.align_to_owner()
-        return self._rect
-
-    @rect.setter
-    def rect(self, new_rect):
-        self._rect = new_rect
-        self.align_to_owner()
-
-    def align_to_owner(self):
-        self._rect.center = (
-            self.owner.x + self.x_offset,
-            self.owner.y + self.y_offset,
-        )
-
-    def draw(self, surface, debug=False):
-        if debug:
-            image_rect = self.image.get_rect()
-            image_rect.center = self.rect.center
-            surface.blit(self.image, image_rect, special_flags=pygame.BLEND_RGB_ADD)
-            if self.knockback_angle is not None:
-                draw_arrow(surface, self.rect.center, self.knockback_angle, (255, 0, 0), 100)
-
-    def flip_x(self):
-        self.knockback_angle = 180 - self.knockback_angle
-        self.rotation = 180 - self.rotation
-        self.x_offset = -self.x_offset
-        self.image = self.create_image()
+    def mirrored(self) -> "Hitbox":
+        """The same hitbox facing the other way, made the first time it's asked for. Its
+        siblings are mirrored along with it."""
+        if self._mirrored is None:
+            _mirror(self)
+        return self._mirrored
 
     @property
     def lower_priority_sibling(self):
@@ -125,6 +124,7 @@ class Hitbox(PhysicalEntity):
         self._lower_priority_sibling = hitbox
         if hitbox:
             hitbox._higher_priority_sibling = self
+        PriorityGroup.from_chain(self)
 
     @property
     def higher_priority_sibling(self):
@@ -135,28 +135,289 @@ class Hitbox(PhysicalEntity):
         self._higher_priority_sibling = hitbox
         if hitbox:
             hitbox._lower_priority_sibling = self
+        PriorityGroup.from_chain(self)
+
+    @property
+    def priority(self) -> int:
+        """Rank within the priority group. 0 is the highest priority."""
+        return self.priority_group.ranks[self]
 
     @property
     def lower_priority_siblings(self) -> {"Hitbox"}:
-        sibling = self.lower_priority_sibling
-        return {sibling} | sibling.lower_priority_siblings if sibling else set()
+        return set(self.priority_group.members[self.priority + 1 :])
 
     @property
     def higher_priority_siblings(self) -> {"Hitbox"}:
-        sibling = self.higher_priority_sibling
-        return {sibling} | sibling.higher_priority_siblings if sibling else set()
+        return set(self.priority_group.members[: self.priority])
 
     @property
     def siblings(self):
-        return self.higher_priority_siblings | self.lower_priority_siblings
+        return set(self.priority_group.members) - {self}
+
+
+_debug_images = {}  # (width, height, rotation, color) -> Surface
+
+
+def debug_image(width: int, height: int, rotation: float, color) -> pygame.Surface:
+    """A rotated capsule (see Hitbox.shape), for drawing hitboxes in debug mode. Hitboxes of
+    the same shape and color share one image, made the first time it's needed."""
+    key = (width, height, rotation, tuple(color))
+    image = _debug_images.get(key)
+    if image is None:
+        image = pygame.Surface((width, height))
+        radius = min(width, height) // 2
+        pygame.draw.rect(image, color, (0, 0, width, height), border_radius=radius)
+        image.set_colorkey((0, 0, 0))
+        image = _debug_images[key] = pygame.transform.rotate(image, rotation)
+    return image
+
+
+def _mirror(hitbox: Hitbox):
+    """Make the mirrored versions of a hitbox and of everything in its priority groups, linked
+    up into the same sibling chains and groups as the originals."""
+    groups = set()
+    pending = [hitbox.priority_group]
+    while pending:
+        group = pending.pop()
+        if group not in groups:
+            groups.add(group)
+            pending.extend(member.priority_group for member in group.members)
+    mirrors = {}
+    for original in {member for group in groups for member in group.members}:
+        mirror = original.__class__.__new__(original.__class__)
+        mirror.__dict__.update(original.__dict__)
+        mirror.knockback_angle = 180 - original.knockback_angle
+        mirror.rotation = 180 - original.rotation
+        mirror.x_offset = -original.x_offset
+        mirror._shape = None
+        mirror._bounds = None
+        mirror._mirrored = original
+        original._mirrored = mirror
+        mirrors[original] = mirror
+    for mirror in mirrors.values():
+        mirror._higher_priority_sibling = mirrors.get(mirror._higher_priority_sibling)
+        mirror._lower_priority_sibling = mirrors.get(mirror._lower_priority_sibling)
+    for group in groups:
+        mirrored_group = PriorityGroup(mirrors[member] for member in group.members)
+        for member in group.members:
+            if member.priority_group is group:
+                mirrors[member].priority_group = mirrored_group
+
+
+class ActiveHitbox:
+    """
+    A Hitbox in play. It follows its owner's x/y position, offset by x/y_offset (the hitbox's
+    own offsets, unless others are given). Everything else is looked up on the hitbox.
+
+    There are lots of these (one per hitbox of every move each character has done, and one per
+    hitbox of every projectile), so they only hold what differs between uses of a hitbox.
+    """
+
+    __slots__ = ("hitbox", "owner", "x_offset", "y_offset")
+
+    def __init__(self, hitbox: Hitbox, owner: PhysicalEntity, x_offset=None, y_offset=None):
+        self.hitbox = hitbox
+        self.owner = owner
+        self.x_offset = hitbox.x_offset if x_offset is None else x_offset
+        self.y_offset = hitbox.y_offset if y_offset is None else y_offset
+
+    def __getattr__(self, name):
+        if name == "hitbox":
+            raise AttributeError(name)  # not set yet, e.g. while being copied
+        return getattr(self.hitbox, name)
+
+    def __repr__(self):
+        return f"ActiveHitbox({self.hitbox!r}, owner={self.owner!r})"
+
+    @property
+    def position(self) -> (int, int):
+        owner = self.owner
+        return owner.x + self.x_offset, owner.y + self.y_offset
+
+    @property
+    def shape(self) -> Capsule:
+        return self.hitbox.shape.moved_to(*self.position)
+
+    @property
+    def rect(self) -> Rect:
+        """Bounds the hitbox's shape. For the broadphase."""
+        return self.hitbox.bounds.move(self.position)
+
+    def handle_hit(self, object):
+        """Object is the entity hit by this hitbox. I've passed it here so that hitboxes can do
+        context specific stuff e.g. trigger the object's "electrocute" animation if the hitbox is
+        electric"""
+        self.owner.level.screen_shake += 10
+        self.hitbox.sound.play()
+        self.owner.handle_land_hit(hitbox=self)
+
+    def draw(self, surface, debug=False):
+        if debug:
+            center = self.position
+            image = self.hitbox.image
+            surface.blit(image, image.get_rect(center=center), special_flags=pygame.BLEND_RGB_ADD)
+            if self.hitbox.knockback_angle is not None:
+                draw_arrow(surface, center, self.hitbox.knockback_angle, (255, 0, 0), 100)
+
+
+class PriorityGroup:
+    """
+    A frozen chain of sibling hitboxes, ordered from highest to lowest priority. Only one member
+    of the group may hit a given target, so the hit handler tracks hits per group. Each member's
+    rank is precomputed so that priority comparisons are constant-time.
+
+    Groups are rebuilt (not mutated) whenever a hitbox's siblings are changed.
+    """
+
+    def __init__(self, members: ["Hitbox"]):
+        self.members = tuple(members)
+        self.ranks = {hitbox: rank for rank, hitbox in enumerate(self.members)}
+
+    def __repr__(self):
+        return f"PriorityGroup({list(self.members)})"
+
+    def __len__(self):
+        return len(self.members)
+
+    @classmethod
+    def from_chain(cls, hitbox: "Hitbox") -> "PriorityGroup":
+        """Build a group from the sibling chain the hitbox belongs to and assign it to all the
+        members."""
+        head = hitbox
+        while head.higher_priority_sibling:
+            head = head.higher_priority_sibling
+        members = []
+        while head:
+            members.append(head)
+            head = head.lower_priority_sibling
+        group = cls(members)
+        for member in members:
+            member.priority_group = group
+        return group
+
+
+class HitRegistry:
+    """
+    Remembers which targets each hitbox has already affected, so that a hitbox instance never
+    hits the same target twice. Hits are stored per owner and PriorityGroup, so marking a hitbox
+    and all its siblings as handled is a single entry. Lookups are O(1).
+
+    Entries are released when their hitboxes are retired---when the Move that created them ends
+    or starts again, or when their owner dies---so memory is bounded by the live hitboxes. As a
+    safety net, entries also expire after `expiry` ticks, in case a Move is interrupted without
+    ending (e.g. the attacker gets hit out of it).
+    """
+
+    expiry = 600  # ticks
+
+    def __init__(self):
+        self.tick = 0
+        self.entries = {}  # (owner, priority group, target) -> tick of the hit. Oldest first.
+        self.targets = defaultdict(set)  # (owner, priority group) -> targets it has handled
+        # entity -> (owner, priority group)s it owns or was handled by
+        self.groups = defaultdict(set)
+
+    def __contains__(self, key):
+        hitbox, target = key
+        return (hitbox.owner, hitbox.priority_group, target) in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, hitbox: ActiveHitbox, target):
+        """Mark the hitbox, and all its siblings, as having handled the target."""
+        owner = hitbox.owner
+        group = hitbox.priority_group
+        if (owner, group, target) not in self.entries:
+            self._add(owner, group, target, self.tick)
+
+    def _add(self, owner, group: PriorityGroup, target, tick: int):
+        self.entries[(owner, group, target)] = tick
+        self.targets[(owner, group)].add(target)
+        self.groups[owner].add((owner, group))
+        self.groups[target].add((owner, group))
+
+    def snapshot(self) -> tuple:
+        return self.tick, tuple(self.entries.items())
+
+    def restore(self, snapshot: tuple):
+        tick, entries = snapshot
+        self.tick = tick
+        self.entries.clear()
+        self.targets.clear()
+        self.groups.clear()
+        for (owner, group, target), hit_tick in entries:
+            self._add(owner, group, target, hit_tick)
+
+    def advance(self):
+        """Move to the next tick and drop any entries that have expired."""
+        self.tick += 1
+        entries = self.entries
+        oldest_allowed = self.tick - self.expiry
+        while entries:
+            key = next(iter(entries))
+            if entries[key] >= oldest_allowed:
+                break
+            self.discard(*key)
+
+    def discard(self, owner, group: PriorityGroup, target):
+        if self.entries.pop((owner, group, target), None) is None:
+            return
+        key = (owner, group)
+        targets = self.targets[key]
+        targets.discard(target)
+        if not targets:
+            del self.targets[key]
+            self._forget(owner, key)
+        if target is not owner:
+            self._forget(target, key)
+
+    def _forget(self, entity, key):
+        groups = self.groups.get(entity)
+        if groups is not None:
+            groups.discard(key)
+            if not groups:
+                del self.groups[entity]
+
+    def release_hitboxes(self, *hitboxes: ActiveHitbox):
+        """Forget everything the hitboxes have hit. Call this when they are retired."""
+        for owner, group in {(hitbox.owner, hitbox.priority_group) for hitbox in hitboxes}:
+            self.release_group(owner, group)
+
+    def release_group(self, owner, group: PriorityGroup):
+        for target in list(self.targets.get((owner, group), ())):
+            self.discard(owner, group, target)
+
+    def release(self, entity):
+        """Forget the hits involving an entity, either as a hitbox owner or as a target."""
+        for owner, group in list(self.groups.get(entity, ())):
+            if owner is entity:
+                self.release_group(owner, group)
+            else:
+                self.discard(owner, group, entity)
+
+    def release_dead(self):
+        """Release the entities that have been removed from the game."""
+        for entity in [entity for entity in self.groups if not entity.alive()]:
+            self.release(entity)
 
 
 class HitHandler:
     def __init__(self):
-        # queue for storing
-        self.handled = deque(maxlen=200)
+        self.handled = HitRegistry()
+        # broadphase for the hitboxes active this tick
+        self.hitbox_grid = SpatialHash()
+        # swept hitbox -> its position when hits were last handled. A new dict every tick.
+        self.positions = {}
+
+    def snapshot(self) -> tuple:
+        return self.handled.snapshot(), self.positions
 
-    def handle_hits(self, hitboxes: [Hitbox], objects: [PhysicalEntity]):
+    def restore(self, snapshot: tuple):
+        hits, self.positions = snapshot
+        self.handled.restore(hits)
+
+    def handle_hits(self, hitboxes: [ActiveHitbox], objects: [PhysicalEntity]):
         """
         Manage the effects of hitboxes hitting other entities.
 
@@ -165,31 +426,143 @@ class HitHandler:
         responsibility is to ensure no object instance is hit more than once by the same hitbox
         instance.
         """
-
-        for object in objects:
-            colliding_hitboxes = pygame.sprite.spritecollide(object, hitboxes, dokill=False)
+        self.handled.advance()
+        colliding = self.collide(hitboxes, objects)
+        for object, colliding_hitboxes in colliding:
+            # the highest priority (lowest rank) colliding member of each owner's priority groups
+            top_priority = {}
             for hitbox in colliding_hitboxes:
-                hitbox: Hitbox
-                # hitboxes should never hit their owner
-                if hitbox.owner == object:
-                    continue
-
-                if isinstance(hitbox.owner, Projectile) and hitbox.owner.owner == object:
-                    continue
+                group = hitbox.priority_group
+                if len(group) > 1:
+                    key = (hitbox.owner, group)
+                    rank = group.ranks[hitbox.hitbox]
+                    if rank < top_priority.get(key, rank + 1):
+                        top_priority[key] = rank
 
+            for hitbox in colliding_hitboxes:
+                hitbox: ActiveHitbox
                 # if this hitbox has already affected the object, don't repeat the interaction
                 if (hitbox, object) in self.handled:
                     continue
 
                 # if the hitbox has higher-priority siblings that are also colliding, skip and
                 # let the higher-priority hitbox collide instead
-                if any(s in colliding_hitboxes for s in hitbox.higher_priority_siblings):
+                group = hitbox.priority_group
+                rank = top_priority.get((hitbox.owner, group))
+                if rank is not None and rank < group.ranks[hitbox.hitbox]:
                     continue
 
                 object.handle_get_hit(hitbox)
                 hitbox.handle_hit(object)
-                self.handled.append((hitbox, object))
-                # if the hitbox has lower priority sibling hitboxes, add those to the handled
-                # list so that they don't also hit the object
-                for sibling in hitbox.siblings:
-                    self.handled.append((sibling, object))
+                # this also marks the hitbox's siblings as handled, so that they don't also hit
+                # the object
+                self.handled.add(hitbox, object)
+
+    def collide(self, hitboxes: [ActiveHitbox], objects: [PhysicalEntity]) -> list:
+        """
+        Which hitboxes' shapes overlap each object's hurtbox. Hitboxes never hit their owner,
+        or the owner of their projectile, so those aren't counted.
+        :return: [(object, [hitboxes in the order given])] for the objects hit by any
+        """
+        # Broadphase: the hitboxes' bounding rects, in a grid rebuilt once per tick. A swept
+        # hitbox goes in once, with the rect covering where it was last tick and where it is now.
+        grid = self.hitbox_grid
+        grid.clear()
+        sweeps = self.sweeps(hitboxes)
+        for hitbox in hitboxes:
+            rect = hitbox.rect
+            sweep = sweeps.get(hitbox)
+            if sweep:
+                rect = rect.union(rect.move(-sweep[0], -sweep[1]))
+            grid.insert(hitbox, rect)
+        if not grid:
+            return []
+        candidates = []
+        for object in objects:
+            found = [
+                hitbox
+                for hitbox in grid.collide(object.rect)
+                if hitbox.owner != object
+                and not (isinstance(hitbox.owner, Projectile) and hitbox.owner.owner == object)
+            ]
+            if found:
+                candidates.append((object, found))
+        if not candidates:
+            return []
+
+        # Narrowphase: the true shapes of every candidate pair, in one go
+        hit_shapes = []
+        hurt_shapes = []
+        hit_sweeps = []
+        for object, found in candidates:
+            hurt_shape = hurtbox(object)
+            for hitbox in found:
+                x, y = hitbox.position
+                _, _, dx, dy, radius = hitbox.hitbox.shape
+                hit_shapes.append((x, y, dx, dy, radius))
+                hurt_shapes.append(hurt_shape)
+                if sweeps:
+                    hit_sweeps.append(sweeps.get(hitbox, (0, 0)))
+        overlapping = iter(
+            capsules_overlap(
+                numpy.array(hit_shapes, dtype=float),
+                numpy.array(hurt_shapes, dtype=float),
+                numpy.array(hit_sweeps, dtype=float) if sweeps else None,
+            ).tolist()
+        )
+        colliding = []
+        for object, found in candidates:
+            hits = [hitbox for hitbox in found if next(overlapping)]
+            if hits:
+                colliding.append((object, hits))
+        return colliding
+
+    def sweeps(self, hitboxes: [ActiveHitbox]) -> dict:
+        """
+        How far each swept hitbox has moved since hits were last handled, and remember where
+        they are now for next time.
+
+        A swing is usually a different hitbox on each frame of a move, so when a swept hitbox
+        has just become active, it's swept from where a member of the same priority group
+        (with the same owner) was last tick, if that member has just gone away. E.g. UpTilt's
+        `high` hitbox is swept from where `low` was on the frame before. The sweep always has
+        the current hitbox's shape.
+        :return: {hitbox: (dx, dy)} for the swept hitboxes that have moved
+        """
+        previous = self.positions
+        positions = self.positions = {}
+        starts = {}  # hitbox that's just become active -> where its predecessor was
+        arrived = []  # swept hitboxes that weren't active last tick
+        for hitbox in hitboxes:
+            if hitbox.swept:
+                positions[hitbox] = hitbox.position
+                if hitbox not in previous:
+                    arrived.append(hitbox)
+        if arrived:
+            # the hitboxes that went away, by owner and priority group, highest priority first
+            departed = defaultdict(list)
+            for hitbox in previous:
+                if hitbox not in positions:
+                    departed[hitbox.owner, hitbox.priority_group].append(hitbox)
+            for hitbox in sorted(arrived, key=_priority):
+                members = departed.get((hitbox.owner, hitbox.priority_group))
+                if members:
+                    members.sort(key=_priority)
+                    starts[hitbox] = previous[members.pop(0)]
+        sweeps = {}
+        for hitbox, (x, y) in positions.items():
+            last = previous.get(hitbox) or starts.get(hitbox)
+            if last is not None and last != (x, y):
+                sweeps[hitbox] = (x - last[0], y - last[1])
+        return sweeps
+
+
+def _priority(hitbox: ActiveHitbox) -> int:
+    return hitbox.priority
+
+
+def hurtbox(entity: PhysicalEntity) -> Capsule:
+    """Where an entity can be hit: its own hurtbox if it has one (see Character.hurtbox),
+    otherwise the capsule filling its rect."""
+    shape = getattr(entity, "hurtbox", None)
+    return Capsule.from_rect(entity.rect) if shape is None else shape
@@ -1,7 +1,65 @@
+import random
+import struct
+
 import pygame
 
+from robingame.input import GamecubeController, InputQueue
+from robingame.input import gamecube
+from robingame.input.gamecube import ButtonInput
 from robingame.input.keyboard import KeyboardInputQueue
 
+# number of values in a GamecubeController.get_values() tuple
+N_CHANNELS = gamecube.D_DOWN + 1
+NEUTRAL = (0,) * N_CHANNELS
+
+# on/off channels, packed into a bitfield
+DIGITAL_CHANNELS = (
+    gamecube.A,
+    gamecube.B,
+    gamecube.X,
+    gamecube.Y,
+    gamecube.Z,
+    gamecube.L,
+    gamecube.R,
+    gamecube.START,
+    gamecube.D_LEFT,
+    gamecube.D_RIGHT,
+    gamecube.D_UP,
+    gamecube.D_DOWN,
+)
+# 0-1 channels (sticks and triggers), quantized to one byte each
+ANALOG_CHANNELS = tuple(channel for channel in range(N_CHANNELS) if channel not in DIGITAL_CHANNELS)
+ANALOG_STEPS = 255
+PACKED_INPUT = struct.Struct(f"<H{len(ANALOG_CHANNELS)}B")
+
+
+def pack_input(values: tuple) -> bytes:
+    """Pack one tick of controller values into a few bytes, e.g. for sending over the network
+    or saving in a replay."""
+    buttons = 0
+    for bit, channel in enumerate(DIGITAL_CHANNELS):
+        if values[channel]:
+            buttons |= 1 << bit
+    axes = (round(min(max(values[channel], 0), 1) * ANALOG_STEPS) for channel in ANALOG_CHANNELS)
+    return PACKED_INPUT.pack(buttons, *axes)
+
+
+def unpack_input(data: bytes) -> tuple:
+    """Inverse of pack_input"""
+    buttons, *axes = PACKED_INPUT.unpack(data)
+    values = [0] * N_CHANNELS
+    for bit, channel in enumerate(DIGITAL_CHANNELS):
+        values[channel] = (buttons >> bit) & 1
+    for channel, axis in zip(ANALOG_CHANNELS, axes):
+        values[channel] = axis / ANALOG_STEPS
+    return tuple(values)
+
+
+def quantize_input(values: tuple) -> tuple:
+    """Round controller values to what survives pack_input. The simulation must only ever see
+    quantized inputs if it's going to be reproduced from packed inputs later."""
+    return unpack_input(pack_input(values))
+
 
 class FightingGameInput:
     # these are the inputs expected by this game.
@@ -71,3 +129,79 @@ class Keyboard1(Keyboard0):
 
 
 # todo: maybe put the calculations for "is someone pressing down on the c stick, and not right" here
+
+
+class ScriptedInput(GamecubeController):
+    """
+    A GamecubeController that isn't attached to a joystick. Instead of being read from hardware,
+    its values are set by code---e.g. bots, replays, or inputs received over the network. It
+    exposes the same A/B/LEFT/C_UP etc. channels as a real controller, so characters can't tell
+    the difference.
+    """
+
+    def __init__(self, queue_length=60):
+        InputQueue.__init__(self, queue_length)
+        self.controller_id = None
+        self.values = NEUTRAL
+
+        # same as GamecubeController.__init__: bind the input channels to this instance
+        button_inputs = {
+            name: attr
+            for _class in self.__class__.__mro__
+            for name, attr in _class.__dict__.items()
+            if issubclass(_class, GamecubeController) and isinstance(attr, ButtonInput)
+        }
+        for name, attr in button_inputs.items():
+            inp = attr.__class__(attr.id, parent=self)
+            setattr(self, name, inp)
+
+    def set_values(self, values: tuple):
+        """Set the values that will be read on the next .read_new_inputs()"""
+        self.values = tuple(values)
+
+    def get_new_values(self):
+        return self.values
+
+
+class RandomInput(ScriptedInput):
+    """Bot that mashes random buttons and stick directions. Good for stress-testing and
+    balance simulations."""
+
+    buttons = (gamecube.A, gamecube.B, gamecube.X, gamecube.Y, gamecube.L, gamecube.R)
+    directions = (
+        (),
+        (gamecube.LEFT,),
+        (gamecube.RIGHT,),
+        (gamecube.UP,),
+        (gamecube.DOWN,),
+        (gamecube.UP, gamecube.LEFT),
+        (gamecube.UP, gamecube.RIGHT),
+        (gamecube.DOWN, gamecube.LEFT),
+        (gamecube.DOWN, gamecube.RIGHT),
+        (gamecube.C_LEFT,),
+        (gamecube.C_RIGHT,),
+        (gamecube.C_UP,),
+        (gamecube.C_DOWN,),
+    )
+    button_chance = 0.15  # chance of holding each button
+    min_hold = 2  # ticks to hold each combination of inputs for
+    max_hold = 20
+
+    def __init__(self, seed=None, queue_length=60):
+        super().__init__(queue_length)
+        self.rng = random.Random(seed)
+        self.hold = 0
+
+    def get_new_values(self):
+        if self.hold <= 0:
+            rng = self.rng
+            values = [0] * N_CHANNELS
+            for channel in rng.choice(self.directions):
+                values[channel] = 1
+            for button in self.buttons:
+                if rng.random() < self.button_chance:
+                    values[button] = 1
+            self.values = tuple(values)
+            self.hold = rng.randint(self.min_hold, self.max_hold)
+        self.hold -= 1
+        return self.values
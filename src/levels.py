@@ -1,4 +1,7 @@
+import hashlib
 import random
+from array import array
+from itertools import chain
 
 import pygame
 from pygame import Color, Surface
@@ -7,10 +10,20 @@ from pygame.rect import Rect
 from robingame.objects import Group, Entity
 from robingame.objects import PhysicalEntity
 from src import sounds
-from src.conf import SCREEN_WIDTH, SCREEN_HEIGHT
+from src.collision import SpatialHash
 from src.hitboxes import HitHandler
 from src.particles import Plume
-from src.platforms import Platform
+from src.platforms import MovingPlatform, Platform
+from src.snapshots import (
+    Snapshot,
+    SnapshotRandom,
+    pack_entity,
+    unpack_entity,
+    pack_inputs,
+    unpack_inputs,
+)
+
+BACKGROUND_COLOR = (150, 150, 150)
 
 
 class BlastZone(PhysicalEntity):
@@ -22,21 +35,57 @@ class BlastZone(PhysicalEntity):
         self.rect.center = (x, y)
 
 
+class PlatformGroup(Group):
+    """
+    A level's platforms. Adding or removing a platform (including killing it) changes the
+    level's platform_version, so that the collision index and the characters' contacts are
+    worked out again.
+    """
+
+    def __init__(self, level: "Level"):
+        super().__init__()
+        self.level = level
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.level.platform_version += 1
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.level.platform_version += 1
+
+
+class Scenery(PhysicalEntity):
+    """A pre-rendered image that's drawn, but doesn't collide with anything."""
+
+    def __init__(self, image: Surface, x=0, y=0):
+        super().__init__()
+        self.image = image
+        self.rect = image.get_rect(topleft=(x, y))
+
+
 class Level(Entity):
     """A Scene representing a level of a game."""
 
     parental_name = "level"
     screen_shake: int
     blast_zone: BlastZone
+    rng: random.Random  # all gameplay randomness should come from here
 
-    def __init__(self):
+    def __init__(self, seed=None):
         super().__init__()
+        self.seed = random.randrange(2**32) if seed is None else seed
+        self.rng = SnapshotRandom(self.seed)
+        # screen shake is purely visual, so it gets its own RNG. That way drawing (or not
+        # drawing, in headless mode) can't affect the simulation.
+        self.shake_rng = random.Random(self.seed)
         self.background = Group()
-        self.platforms = Group()
+        self.platform_version = 0  # changes whenever platforms are added or removed
+        self.platforms = PlatformGroup(self)
         self.characters = Group()
         self.projectiles = Group()
         self.particle_effects = Group()
-        self.hitboxes = Group()
+        self.hitboxes = []  # ActiveHitboxes, added each tick by whatever they belong to
         self.invisible_elements = Group()
         self.child_groups = [
             self.background,
@@ -44,12 +93,19 @@ class Level(Entity):
             self.characters,
             self.projectiles,
             self.particle_effects,
-            self.hitboxes,
             self.invisible_elements,
         ]
         self.state = self.main
         self.hit_handler = HitHandler()
         self.screen_shake = 0
+        self.integrator = None  # optional BatchIntegrator for the projectiles
+        self.spawn_points = []  # (x, y, facing_right)
+        self.ledges = []  # (x, y, facing_right): where a character would hang from a ledge
+        self._platform_index = SpatialHash()
+        self._platform_index_version = None
+        self._static_layer = None
+        self._static_key = None  # what the static layer was rendered from
+        self.static_rect = None  # where the static layer goes, in level coordinates
 
     def add_background(self, *objects):
         self.add_to_group(*objects, group=self.background)
@@ -57,14 +113,55 @@ class Level(Entity):
     def add_platform(self, *objects):
         self.add_to_group(*objects, group=self.platforms)
 
+    def platform_moved(self, platform: Platform):
+        """Update the collision index after a platform has moved. Only that platform is
+        re-indexed, and only the characters it could have touched forget their contacts; the
+        rest stay as they are."""
+        if self._platform_index_version == self.platform_version:
+            self._platform_index.move(platform, platform.rect)
+        for character in self.characters:
+            character.platform_moved(platform)
+
+    @property
+    def platform_index(self) -> SpatialHash:
+        """
+        The platforms, baked into a spatial index so that movement collisions only have to
+        check the platforms nearby. It's only rebuilt when platforms are added or removed.
+
+        The index holds the platforms' own rects, but it only files a platform under new grid
+        cells when told to. So a platform in a level must only be moved by changing its rect
+        and then calling platform_moved (as MovingPlatform.move_to does); otherwise collisions
+        and the characters' contacts can miss it at its new position.
+        """
+        if self._platform_index_version != self.platform_version:
+            index = self._platform_index
+            index.clear()
+            for platform in self.platforms:
+                index.insert(platform, platform.rect)
+            self._platform_index_version = self.platform_version
+        return self._platform_index
+
+    def load_platform_index(self, baked: dict):
+        """Use a platform index baked ahead of time (see src.stages) instead of building one.
+        It must have been baked from the same platforms, added in the same order."""
+        platforms = self.platforms.sprites()
+        rects = [platform.rect for platform in platforms]
+        self._platform_index.unbake(platforms, rects, baked)
+        self._platform_index_version = self.platform_version
+
+    def colliding_platforms(self, rect: Rect) -> [Platform]:
+        """Platforms overlapping the rect, in the same order as pygame.sprite.spritecollide
+        would give them."""
+        return self.platform_index.collide(rect)
+
     def add_character(self, *objects):
         self.add_to_group(*objects, group=self.characters)
 
     def add_projectile(self, *objects):
         self.add_to_group(*objects, group=self.projectiles)
 
-    def add_hitbox(self, *objects):
-        self.add_to_group(*objects, group=self.hitboxes)
+    def add_hitbox(self, *hitboxes):
+        self.hitboxes.extend(hitboxes)
 
     def add_particle_effect(self, *objects):
         self.add_to_group(*objects, group=self.particle_effects)
@@ -73,25 +170,74 @@ class Level(Entity):
         self.add_to_group(*objects, group=self.invisible_elements)
 
     def main(self):
+        if self.integrator:
+            self.integrator.begin_tick()
         self.hit_handler.handle_hits(self.hitboxes, [*self.characters, *self.projectiles])
         self.handle_blast_zone_collisions()
-        self.hitboxes.kill()
+        self.hit_handler.handled.release_dead()
+        self.hitboxes.clear()
         if self.screen_shake:
             self.screen_shake -= 1
 
     def draw(self, surface: Surface, debug=False):
+        # overwrites previous stuff on screen
+        surface.blit(self.static_layer(surface), self.static_rect)
+        self.draw_scene(surface, debug)
         if self.screen_shake:
-            temp_surf = Surface(surface.get_size())
-            temp_surf.fill((150, 150, 150))  # overwrite previous stuff on screen
+            # shift the finished frame in place, instead of drawing it into a spare surface
             magnitude = 10
-            rect = temp_surf.get_rect()
-            rect.centerx += random.randrange(-magnitude, magnitude)
-            rect.centery += random.randrange(-magnitude, magnitude)
-            super().draw(temp_surf, debug)
-            surface.blit(temp_surf, rect)
-        else:
-            surface.fill((150, 150, 150))  # overwrite previous stuff on screen
+            dx = self.shake_rng.randrange(-magnitude, magnitude)
+            dy = self.shake_rng.randrange(-magnitude, magnitude)
+            surface.scroll(dx, dy)
+            # scrolling leaves the strips it uncovers as they were
+            width, height = surface.get_size()
+            surface.fill(BACKGROUND_COLOR, (0 if dx > 0 else width + dx, 0, abs(dx), height))
+            surface.fill(BACKGROUND_COLOR, (0, 0 if dy > 0 else height + dy, width, abs(dy)))
+
+    def draw_scene(self, surface: Surface, debug=False):
+        """Draw what isn't in the static layer. In debug mode, draw everything, so that static
+        things get their outlines too."""
+        if debug:
             super().draw(surface, debug)
+            for hitbox in self.hitboxes:
+                hitbox.draw(surface, debug)
+            return
+        for group in self.child_groups:
+            if group is self.platforms:
+                for platform in group:
+                    if isinstance(platform, MovingPlatform):
+                        platform.draw(surface)
+            elif group is not self.background:
+                group.draw(surface)
+
+    def static_layer(self, surface: Surface) -> Surface:
+        """
+        The parts of the stage that never change---the background and the platforms that don't
+        move---rendered onto the background color, so that each frame starts with one blit
+        instead of a fill and redrawing them all. It's in the surface's pixel format, so that
+        blit doesn't convert anything. It's only rendered again if the stage changes.
+
+        The layer covers the surface and the whole background, and goes at .static_rect in
+        level coordinates, so it still lines up if the view is moved.
+        """
+        platforms = tuple(
+            platform for platform in self.platforms if not isinstance(platform, MovingPlatform)
+        )
+        background = tuple(self.background)
+        key = (surface.get_size(), surface.get_bitsize(), background, platforms)
+        if key != self._static_key:
+            rect = surface.get_rect().unionall([scenery.rect for scenery in background])
+            layer = Surface(rect.size).convert(surface)
+            layer.fill(BACKGROUND_COLOR)
+            # drawn in level coordinates, then moved to the layer's own
+            offset = (-rect.x, -rect.y)
+            for entity in chain(background, platforms):
+                if entity.image:
+                    layer.blit(entity.image, entity.image_rect.move(offset))
+            self._static_layer = layer
+            self._static_key = key
+            self.static_rect = rect
+        return self._static_layer
 
     def handle_blast_zone_collisions(self):
         for object in self.characters:
@@ -100,7 +246,7 @@ class Level(Entity):
                 # todo: logic for keeping track of stocks
                 self.screen_shake = 20
                 angle = self.calculate_plume_angle(object)
-                self.add_particle_effect(Plume(object.x, object.y, angle))
+                self.add_particle_effect(Plume(object.x, object.y, angle, rng=self.rng))
                 sounds.death_plume.play()
                 sounds.crowd_ohh.play()
 
@@ -120,40 +266,106 @@ class Level(Entity):
             angle = 270
         return angle
 
+    def snapshot(self) -> Snapshot:
+        """Capture the state of the match, so that it can be restored later with .restore()"""
+        record = array("d", (self.tick, self.screen_shake))
+        objects = []
+        characters = tuple(self.characters)
+        projectiles = tuple(self.projectiles)
+        for entity in chain(characters, projectiles):
+            pack_entity(entity, record, objects)
+        members = (characters, projectiles, tuple(self.hitboxes), tuple(self.particle_effects))
+        return Snapshot(
+            record=record,
+            objects=tuple(objects),
+            members=members,
+            hits=self.hit_handler.snapshot(),
+            rng_state=self.rng.getstate(),
+            inputs=pack_inputs(characters),
+        )
 
-class Battlefield(Level):
-    def __init__(self):
-        super().__init__()
-
-        ground = Platform(0, 0, 800, 1000)
-        ground.x = SCREEN_WIDTH // 2
-        ground.rect.top = SCREEN_HEIGHT - 300
+    def restore(self, snapshot: Snapshot):
+        """Rewind the match to a snapshot taken by .snapshot()"""
+        record = snapshot.record
+        self.tick = int(record[0])
+        self.screen_shake = int(record[1])
+        characters, projectiles, hitboxes, particle_effects = snapshot.members
+        groups = (self.characters, self.projectiles, self.particle_effects)
+        for group, members in zip(groups, (characters, projectiles, particle_effects)):
+            # entities may have been added or killed since the snapshot
+            if group.sprites() != list(members):
+                group.empty()
+                self.add_to_group(*members, group=group)
+        self.hitboxes[:] = hitboxes
+        record_index, object_index = 2, 0
+        for entity in chain(characters, projectiles):
+            record_index, object_index = unpack_entity(
+                entity, record, record_index, snapshot.objects, object_index
+            )
+        self.hit_handler.restore(snapshot.hits)
+        self.rng.setstate(snapshot.rng_state)
+        unpack_inputs(snapshot.inputs)
+        for platform in self.platforms:
+            if isinstance(platform, MovingPlatform):
+                platform.move_to(*platform.position_at(self.tick), carry=False)
 
-        wall = Platform(0, 0, 20, 300)
-        wall.x = SCREEN_WIDTH // 2
-        wall.rect.bottom = SCREEN_HEIGHT - 150
+    def state_hash(self) -> str:
+        """
+        Hash of everything that affects how the game will play out. Two runs with the same seed
+        and the same inputs must produce identical hashes every tick; if they don't, something
+        non-deterministic has crept into the simulation.
+        """
+        characters = [
+            (
+                type(character).__name__,
+                character.rect.topleft,
+                float(character.u),
+                float(character.v),
+                float(character.damage),
+                character.facing_right,
+                character.fast_fall,
+                character.aerial_jumps,
+                character.air_dodges,
+                character.wall_jumps,
+                character.hitpause_duration,
+                character.hitstun_duration,
+                state_name(character.state),
+                character.tick,
+            )
+            for character in self.characters
+        ]
+        projectiles = [
+            (
+                type(projectile).__name__,
+                projectile.rect.topleft,
+                float(projectile.u),
+                float(projectile.v),
+                projectile.tick,
+            )
+            for projectile in self.projectiles
+        ]
+        state = (
+            self.tick,
+            characters,
+            projectiles,
+            len(self.hit_handler.handled),
+            hash(self.rng.getstate()[1]),  # just the ints; hash(None) varies between runs
+        )
+        return hashlib.blake2b(repr(state).encode(), digest_size=16).hexdigest()
 
-        left_platform = Platform(0, 0, 100, 20, droppable=True)
-        left_platform.x = ground.x - 200
-        left_platform.y = ground.rect.top - 100
 
-        right_platform = Platform(0, 0, 100, 20, droppable=True)
-        right_platform.x = ground.x + 200
-        right_platform.y = ground.rect.top - 100
+def state_name(state) -> str:
+    """Name of an entity's state, whether it's a method, closure, or class-based state."""
+    try:
+        return state.__name__
+    except AttributeError:
+        return state.__class__.__name__
 
-        top_platform = Platform(0, 0, 100, 20, droppable=True)
-        top_platform.x = ground.x
-        top_platform.y = ground.rect.top - 200
 
-        self.add_platform(
-            ground,
-            left_platform,
-            right_platform,
-            top_platform,
-            # wall
-        )
+class Battlefield(Level):
+    def __init__(self, seed=None):
+        super().__init__(seed)
+        # imported here because src.stages builds on this module
+        from src.stages import load_stage
 
-        self.blast_zone = BlastZone(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
-        self.blast_zone.x = SCREEN_WIDTH // 2
-        self.blast_zone.y = SCREEN_HEIGHT // 2
-        self.add_invisible_element(self.blast_zone)
+        load_stage("battlefield").build(self)
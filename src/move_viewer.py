@@ -25,10 +25,9 @@ class MoveViewer(Game):
     def __init__(self):
         super().__init__()
         self.frame = 0
-        self.hitboxes = Group()
+        self.hitboxes = []
         self.characters = Group()
         self.child_groups += [
-            self.hitboxes,
             self.characters,
         ]
         self.setup()
@@ -36,7 +35,8 @@ class MoveViewer(Game):
     def draw(self, surface, debug):
         super().draw(surface, debug)
         fonts.cellphone_black.render(surface, f"{self.frame=}", x=0, y=0, scale=3)
-        self.hitboxes.draw(surface, debug=True)
+        for hitbox in self.hitboxes:
+            hitbox.draw(surface, debug=True)
 
     def update(self):
         # super().update()
@@ -57,7 +57,7 @@ class MoveViewer(Game):
 
     def setup(self):
         self.characters.kill()
-        self.hitboxes.kill()
+        self.hitboxes.clear()
         self.character = self.character_class(
             x=self.window_width // 2,
             y=self.window_height // 2,
@@ -81,7 +81,7 @@ class MoveViewer(Game):
         print
 
     def add_hitbox(self, *hitboxes):
-        self.add_to_group(*hitboxes, group=self.hitboxes)
+        self.hitboxes.extend(hitboxes)
 
 
 if __name__ == "__main__":
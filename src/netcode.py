@@ -0,0 +1,285 @@
+"""
+Rollback netcode.
+
+Usage (two simulated peers talking over loopback UDP):
+    python -m src.netcode --latency 0.1 --packet-loss 0.05
+
+To play, start two copies of the game, pointed at each other:
+    python -m src.game --netplay 7000 7001 --player 0
+    python -m src.game --netplay 7001 7000 --player 1
+"""
+
+if __name__ == "__main__":
+    from src.headless import go_headless
+
+    go_headless()
+
+import argparse
+import random
+import socket
+import struct
+import time
+from collections import deque
+
+from src.inputs import NEUTRAL, PACKED_INPUT, pack_input, unpack_input, quantize_input
+from src.inputs import ScriptedInput
+from src.simulation import Simulation, bot_match
+from src.sounds import Sound
+
+
+class LoopbackTransport:
+    """
+    UDP transport between two peers on the same machine. Outgoing packets can be delayed and
+    dropped on purpose, to test how the game copes with a bad connection.
+    """
+
+    max_packet_size = 2048
+
+    def __init__(
+        self,
+        port: int,
+        peer_port: int,
+        latency: float = 0,
+        packet_loss: float = 0,
+        seed=None,
+        clock=time.perf_counter,
+    ):
+        """
+        :param latency: seconds to hold each outgoing packet for before sending it
+        :param packet_loss: probability (0-1) of dropping each outgoing packet
+        :param clock: time source, in seconds
+        """
+        self.peer = ("127.0.0.1", peer_port)
+        self.latency = latency
+        self.packet_loss = packet_loss
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.outbox = deque()  # (send time, payload)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(("127.0.0.1", port))
+        self.socket.setblocking(False)
+
+    @property
+    def port(self) -> int:
+        return self.socket.getsockname()[1]
+
+    def send(self, payload: bytes):
+        if self.rng.random() < self.packet_loss:
+            return
+        self.outbox.append((self.clock() + self.latency, payload))
+        self.flush()
+
+    def flush(self):
+        """Send the packets that have been held back for long enough."""
+        now = self.clock()
+        while self.outbox and self.outbox[0][0] <= now:
+            _, payload = self.outbox.popleft()
+            self.socket.sendto(payload, self.peer)
+
+    def receive(self) -> [bytes]:
+        self.flush()
+        packets = []
+        while True:
+            try:
+                payload, _ = self.socket.recvfrom(self.max_packet_size)
+            except (BlockingIOError, ConnectionResetError):
+                return packets
+            packets.append(payload)
+
+    def close(self):
+        self.socket.close()
+
+
+def loopback_pair(**kwargs) -> (LoopbackTransport, LoopbackTransport):
+    """Two transports connected to each other, on ports chosen by the OS."""
+    first = LoopbackTransport(port=0, peer_port=0, **kwargs)
+    second = LoopbackTransport(port=0, peer_port=first.port, **kwargs)
+    first.peer = ("127.0.0.1", second.port)
+    return first, second
+
+
+# packet: tick of the last remote input received, tick of the first input, number of inputs.
+# Then that many packed inputs.
+HEADER = struct.Struct("<iiB")
+
+
+class RollbackSession:
+    """
+    GGPO-style rollback for a two-player Simulation.
+
+    The local player's inputs are applied immediately. The remote player's inputs are predicted
+    by repeating the last one received. The game state is saved every tick. When a remote input
+    arrives that doesn't match the prediction, the session rewinds to that tick and
+    re-simulates up to the present in one go, before the next frame is drawn. So the local
+    player never waits for the network, unless the remote player falls more than
+    `max_rollback` ticks behind.
+    """
+
+    max_rollback = 8  # ticks
+    max_inputs_per_packet = 64
+
+    def __init__(self, simulation: Simulation, local_player: int, transport: LoopbackTransport):
+        self.simulation = simulation
+        self.transport = transport
+        self.local = simulation.players[local_player]
+        (self.remote,) = [p for ii, p in enumerate(simulation.players) if ii != local_player]
+        self.local_inputs = {}  # tick -> values
+        self.remote_inputs = {}  # tick -> values
+        self.predictions = {}  # tick -> predicted remote values that haven't been confirmed
+        self.confirmed_tick = -1  # all the remote inputs up to here have arrived
+        self.peer_ack = -1  # the peer has received all our inputs up to here
+        self.snapshots = {}  # tick -> Simulation snapshot from the start of that tick
+        self.rollback_tick = None  # earliest tick that was simulated with a wrong prediction
+
+        # stats
+        self.rollbacks = 0
+        self.resimulated_ticks = 0
+        self.longest_rollback = 0  # seconds
+        self.stalls = 0
+
+    @property
+    def tick(self) -> int:
+        return self.simulation.tick
+
+    def advance(self, local_values: tuple) -> bool:
+        """
+        Run one tick with the local player's input, first correcting any mispredictions.
+        Returns False if the session had to wait for the remote player instead.
+        """
+        self.receive()
+        if self.rollback_tick is not None:
+            self.rollback()
+        tick = self.tick
+        if tick - self.confirmed_tick > self.max_rollback:
+            self.stalls += 1
+            self.send()
+            return False
+        self.local_inputs[tick] = quantize_input(local_values)
+        self.send()
+        self.simulate(tick)
+        return True
+
+    def simulate(self, tick: int):
+        self.snapshots[tick] = self.simulation.snapshot()
+        remote_values = self.remote_inputs.get(tick)
+        if remote_values is None:
+            remote_values = self.remote_inputs.get(self.confirmed_tick, NEUTRAL)
+            self.predictions[tick] = remote_values
+        self.local.input.set_values(self.local_inputs[tick])
+        self.remote.input.set_values(remote_values)
+        self.simulation.step()
+
+    def rollback(self):
+        """Rewind to the first mispredicted tick and re-simulate up to the present."""
+        start = time.perf_counter()
+        end_tick = self.tick
+        muted = Sound.muted
+        Sound.muted = True
+        try:
+            self.simulation.restore(self.snapshots[self.rollback_tick])
+            for tick in range(self.rollback_tick, end_tick):
+                self.simulate(tick)
+        finally:
+            Sound.muted = muted
+        self.rollbacks += 1
+        self.resimulated_ticks += end_tick - self.rollback_tick
+        self.longest_rollback = max(self.longest_rollback, time.perf_counter() - start)
+        self.rollback_tick = None
+
+    def send(self):
+        first = self.peer_ack + 1
+        last = min(self.tick, first + self.max_inputs_per_packet - 1)
+        inputs = [
+            self.local_inputs[tick] for tick in range(first, last + 1) if tick in self.local_inputs
+        ]
+        payload = HEADER.pack(self.confirmed_tick, first, len(inputs))
+        payload += b"".join(pack_input(values) for values in inputs)
+        self.transport.send(payload)
+
+    def receive(self):
+        size = PACKED_INPUT.size
+        for payload in self.transport.receive():
+            ack, first, count = HEADER.unpack_from(payload)
+            self.peer_ack = max(self.peer_ack, ack)
+            for ii in range(count):
+                tick = first + ii
+                if tick <= self.confirmed_tick or tick in self.remote_inputs:
+                    continue
+                offset = HEADER.size + ii * size
+                values = unpack_input(payload[offset : offset + size])
+                self.remote_inputs[tick] = values
+                predicted = self.predictions.pop(tick, None)
+                if predicted is not None and predicted != values:
+                    if self.rollback_tick is None or tick < self.rollback_tick:
+                        self.rollback_tick = tick
+        while self.confirmed_tick + 1 in self.remote_inputs:
+            self.confirmed_tick += 1
+        self.forget_old_ticks()
+
+    def forget_old_ticks(self):
+        """We'll never roll back to before the last confirmed tick, so we can forget the
+        snapshots and inputs from before then."""
+        oldest_needed = self.confirmed_tick + 1
+        if self.rollback_tick is not None:
+            oldest_needed = min(oldest_needed, self.rollback_tick)
+        for tick in [tick for tick in self.snapshots if tick < oldest_needed]:
+            del self.snapshots[tick]
+        # keep the last confirmed remote input; it's the prediction for the following ticks
+        oldest_needed = min(oldest_needed, self.confirmed_tick)
+        for tick in [tick for tick in self.remote_inputs if tick < oldest_needed]:
+            del self.remote_inputs[tick]
+        for tick in [tick for tick in self.local_inputs if tick < oldest_needed]:
+            if tick <= self.peer_ack:
+                del self.local_inputs[tick]
+
+
+def netplay_match(seed: int = 0, **kwargs) -> Simulation:
+    """Hawko vs MonkeyKing on Battlefield, with the inputs left for a RollbackSession to set.
+    Both peers must use the same seed."""
+    simulation = bot_match(seed=seed, **kwargs)
+    for player in simulation.players:
+        player.input = player.character.input = ScriptedInput()
+    return simulation
+
+
+def main():
+    from src.inputs import RandomInput
+
+    parser = argparse.ArgumentParser(description="Two rollback peers over loopback UDP.")
+    parser.add_argument("--latency", type=float, default=0.1, help="one-way, in seconds")
+    parser.add_argument("--packet-loss", type=float, default=0.05)
+    parser.add_argument("--ticks", type=int, default=3600)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # tie the network clock to the game clock so the run is reproducible
+    ticks = [0]
+    clock = lambda: ticks[0] / 60
+    transports = loopback_pair(latency=args.latency, packet_loss=args.packet_loss, clock=clock)
+    sessions = []
+    bots = []
+    for player, transport in enumerate(transports):
+        sessions.append(RollbackSession(netplay_match(seed=args.seed), player, transport))
+        bots.append(RandomInput(seed=args.seed * 10 + player))
+
+    local_values = [bot.get_new_values() for bot in bots]
+    start = time.perf_counter()
+    for ticks[0] in range(args.ticks):
+        for player, (session, bot) in enumerate(zip(sessions, bots)):
+            if session.advance(local_values[player]):
+                local_values[player] = bot.get_new_values()
+    elapsed = time.perf_counter() - start
+
+    for player, session in enumerate(sessions):
+        print(
+            f"player {player}: reached tick {session.tick}, {session.rollbacks} rollbacks, "
+            f"{session.resimulated_ticks} ticks re-simulated, {session.stalls} stalls, "
+            f"longest rollback {session.longest_rollback * 1000:.1f}ms"
+        )
+    print(f"{args.ticks} frames in {elapsed:.2f}s")
+    for transport in transports:
+        transport.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,16 @@
+import random
+
 import numpy
 
 from robingame.objects import Entity, Group, Particle
-from robingame.utils import random_float, random_int
 
 
 class Plume(Entity):
-    def __init__(self, x, y, angle_deg):
+    def __init__(self, x, y, angle_deg, rng: random.Random = None):
         super().__init__()
+        rng = rng or random  # fall back on the module-level RNG
+        random_float = rng.uniform
+        random_int = rng.randint
         self.state = self.state_main
         self.x = x
         self.y = y
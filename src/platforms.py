@@ -16,3 +16,81 @@ class Platform(PhysicalEntity):
         self.color = Color("green") if droppable else self.color
         self.image = Surface((width, height))
         self.image.fill(self.color)
+
+
+class MovingPlatform(Platform):
+    """
+    A platform that follows a scripted path, carrying the characters standing on it.
+
+    The path is a list of (x, y, ticks) legs: the platform moves in a straight line to (x, y)
+    over that many ticks, then starts on the next leg. After the last leg it starts the path
+    again, so the last leg should end where the platform started. A leg to the point the
+    platform is already at makes it wait there.
+
+    The position is worked out from the level's tick instead of being accumulated, so the
+    platform is always in the same place at the same tick, even after restoring a snapshot.
+    """
+
+    color = Color("steelblue")
+
+    def __init__(self, x, y, width, height, path: [(int, int, int)], droppable=False):
+        super().__init__(x, y, width, height, droppable)
+        self.start = (x, y)
+        self.path = path
+        self.period = sum(ticks for *_, ticks in path)
+        self.state = self.state_follow_path
+
+    def position_at(self, tick: int) -> (int, int):
+        """Where the platform's center is at the start of the level's tick"""
+        tick %= self.period
+        x0, y0 = self.start
+        for x1, y1, ticks in self.path:
+            if tick < ticks:
+                fraction = tick / ticks
+                return round(x0 + (x1 - x0) * fraction), round(y0 + (y1 - y0) * fraction)
+            tick -= ticks
+            x0, y0 = x1, y1
+        return x0, y0
+
+    def state_follow_path(self):
+        # platforms update before characters, so this is where the platform is for the rest
+        # of the level's tick
+        self.move_to(*self.position_at(self.level.tick + 1))
+
+    def move_to(self, x: int, y: int, carry=True):
+        """
+        :param carry: move the characters standing on the platform by the same amount, and push
+            the ones it runs into out of its way (unless it's droppable, because characters can
+            be inside those). Moving them in the same step as the platform means they never end
+            up hovering above it (and falling) or sunk into it, however fast it goes.
+        """
+        dx = x - self.rect.centerx
+        dy = y - self.rect.centery
+        if not dx and not dy:
+            return
+        level = self.level
+        old_rect = Rect(self.rect)
+        riders = [c for c in level.characters if self in c.contact.floors] if carry else []
+        self.rect.move_ip(dx, dy)
+        level.platform_moved(self)
+        for character in riders:
+            character.carry(dx, dy, self)
+        if carry and not self.droppable:
+            for character in level.characters:
+                rect = character.rect
+                if rect.colliderect(self.rect) and not rect.colliderect(old_rect):
+                    character.carry(*self.push(rect, dx, dy), self)
+
+    def push(self, rect: Rect, dx: int, dy: int) -> (int, int):
+        """How far to move `rect`, which the platform has just moved into by (dx, dy), to get
+        it out again: along whichever way the platform was moving needs the shortest push."""
+        pushes = []
+        if dx > 0:
+            pushes.append((self.rect.right - rect.left, 0))
+        elif dx < 0:
+            pushes.append((self.rect.left - rect.right, 0))
+        if dy > 0:
+            pushes.append((0, self.rect.bottom - rect.top))
+        elif dy < 0:
+            pushes.append((0, self.rect.top - rect.bottom))
+        return min(pushes, key=lambda push: abs(push[0] + push[1]))
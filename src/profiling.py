@@ -0,0 +1,202 @@
+"""
+Frame profiler. In game, F2 toggles an overlay of where each frame's time goes, and F3 saves a
+Chrome trace of the recent frames (open it in chrome://tracing or https://ui.perfetto.dev).
+"""
+
+import json
+import time
+import weakref
+from collections import defaultdict, deque
+
+import pygame
+from pygame import Color, Rect, Surface
+
+from robingame.objects import Group
+
+
+class MethodPatches:
+    """Methods replaced on their classes (e.g. with timed versions of themselves), and how to
+    put the originals back."""
+
+    def __init__(self):
+        self.patches = []  # (class, method name, original class attribute)
+
+    def wrap(self, cls, name, wrapper):
+        self.patches.append((cls, name, cls.__dict__.get(name)))
+        setattr(cls, name, wrapper)
+
+    def undo(self):
+        for cls, name, original in reversed(self.patches):
+            if original is None:
+                delattr(cls, name)
+            else:
+                setattr(cls, name, original)
+        self.patches.clear()
+
+
+def timed(method, record, name, suffix=""):
+    """
+    Wrap a method so it records how long it takes.
+    :param record: called with (section name, start, end) after each timed call
+    :param name: section name, or a function of the method's `self` that returns one. If that
+        returns None, the call isn't timed.
+    :param suffix: added to the section name
+    """
+    perf_counter = time.perf_counter
+    get_name = name if callable(name) else lambda _: name
+
+    def timed_method(obj, *args, **kwargs):
+        section = get_name(obj)
+        if section is None:
+            return method(obj, *args, **kwargs)
+        start = perf_counter()
+        try:
+            return method(obj, *args, **kwargs)
+        finally:
+            record(section + suffix, start, perf_counter())
+
+    return timed_method
+
+
+class Profiler:
+    """
+    Times Level.main, HitHandler.handle_hits, each character's state, character physics,
+    Level.draw, and the update and draw of each of the level's groups.
+
+    Timing works by wrapping those methods when the profiler is enabled, and unwrapping them
+    when it's disabled. So when it's off, the game runs exactly the same code as without it.
+    """
+
+    window = 60  # frames to average over
+    max_events = 200_000  # trace events to keep for export
+
+    def __init__(self):
+        self.enabled = False
+        self.frame_totals = defaultdict(float)  # section -> seconds spent in the current frame
+        self.history = {}  # section -> deque of seconds per frame
+        self.events = deque(maxlen=self.max_events)  # (section, start, end)
+        self.group_names = weakref.WeakKeyDictionary()  # Group -> section name
+        self.patches = MethodPatches()
+
+    def enable(self):
+        if self.enabled:
+            return
+        # imported here because importing characters loads sprites, which needs a display
+        from src.characters import Character
+        from src.hitboxes import HitHandler
+        from src.levels import Level
+
+        self.enabled = True
+        self._wrap(Level, "update", lambda level: self._profiled_level_update(level))
+        self._wrap(Level, "draw", self._timed(Level.draw, "Level.draw"))
+        self._wrap(HitHandler, "handle_hits", self._timed(HitHandler.handle_hits, "handle_hits"))
+        self._wrap(Character, "update", self._timed(Character.update, _character_state_name))
+        for physics in ("fall_physics", "hit_physics", "grounded_physics"):
+            self._wrap(Character, physics, self._timed(getattr(Character, physics), "physics"))
+        self._wrap(Group, "update", self._timed(Group.update, self.group_names.get, ".update"))
+        self._wrap(Group, "draw", self._timed(Group.draw, self.group_names.get, ".draw"))
+
+    def disable(self):
+        self.patches.undo()
+        self.enabled = False
+
+    def toggle(self):
+        self.disable() if self.enabled else self.enable()
+
+    def _wrap(self, cls, name, wrapper):
+        self.patches.wrap(cls, name, wrapper)
+
+    def _timed(self, method, name, suffix=""):
+        return timed(method, self.record, name, suffix)
+
+    def _profiled_level_update(self, level: "Level"):
+        """Same as Entity.update, but times the state (Level.main) separately from the groups.
+        Level.main can't be wrapped on the class, because the level holds it as a bound
+        method."""
+        self.name_groups(level)
+        start = time.perf_counter()
+        level.state()
+        self.record("Level.main", start, time.perf_counter())
+        for group in level.child_groups:
+            group.update()
+        level.tick += 1
+
+    def name_groups(self, level: "Level"):
+        """Give the level's child groups readable names, e.g. "Battlefield.characters". Other
+        groups aren't timed individually."""
+        for attribute, value in vars(level).items():
+            if isinstance(value, Group) and value not in self.group_names:
+                self.group_names[value] = f"{type(level).__name__}.{attribute}"
+
+    def record(self, section: str, start: float, end: float):
+        self.frame_totals[section] += end - start
+        self.events.append((section, start, end))
+
+    def end_frame(self):
+        """Add this frame's totals to the rolling averages."""
+        if not self.enabled:
+            return
+        totals = self.frame_totals
+        for section in totals.keys() - self.history.keys():
+            self.history[section] = deque(maxlen=self.window)
+        for section, history in self.history.items():
+            history.append(totals.get(section, 0))
+        totals.clear()
+
+    def averages(self) -> {str: float}:
+        """Mean seconds per frame spent in each section, slowest first."""
+        averages = {
+            section: sum(history) / len(history)
+            for section, history in self.history.items()
+            if history
+        }
+        return dict(sorted(averages.items(), key=lambda item: item[1], reverse=True))
+
+    def draw(self, surface: Surface, font: pygame.font.Font) -> Rect | None:
+        """Draw the averages in the top left corner.
+        :return: the area drawn over, if any"""
+        lines = [
+            f"{section}: {seconds * 1000:.2f}ms" for section, seconds in self.averages().items()
+        ]
+        if not lines:
+            return None
+        images = [font.render(line, True, Color("white")) for line in lines]
+        width = max(image.get_width() for image in images)
+        height = sum(image.get_height() for image in images)
+        background = Surface((width + 20, height + 20))
+        background.set_alpha(180)
+        rect = surface.blit(background, (0, 0))
+        y = 10
+        for image in images:
+            surface.blit(image, (10, y))
+            y += image.get_height()
+        return rect
+
+    def chrome_trace(self) -> dict:
+        """The recorded events in Chrome's trace event format"""
+        microseconds = 1_000_000
+        return {
+            "traceEvents": [
+                {
+                    "name": section,
+                    "ph": "X",  # complete event: has a start and a duration
+                    "ts": start * microseconds,
+                    "dur": (end - start) * microseconds,
+                    "pid": 0,
+                    "tid": 0,
+                }
+                for section, start, end in self.events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def export_chrome_trace(self, filename: str):
+        with open(filename, "w") as file:
+            json.dump(self.chrome_trace(), file)
+
+
+def _character_state_name(character: "Character") -> str:
+    return f"{type(character).__name__}.state"
+
+
+profiler = Profiler()
@@ -1,3 +1,5 @@
+import math
+
 from pygame.rect import Rect
 
 from robingame.objects import PhysicalEntity
@@ -9,6 +11,15 @@ class Projectile(PhysicalEntity):
     active_hitboxes: list  # subclasses should add/remove hitboxes from this list
     width: int
     height: int
+    gravity: float = 0
+    air_resistance: float = 0
+    fall_speed: float = math.inf
+
+    # attributes saved by Level.snapshot(), on top of position, tick, state and image
+    snapshot_fields = (
+        ("u", float),
+        ("v", float),
+    )
 
     def __init__(self, x, y, u, v, owner):
         super().__init__()
@@ -20,14 +31,31 @@ class Projectile(PhysicalEntity):
         self.owner = owner
         self.state = self.state_main
 
+    @property
+    def rng(self):
+        """Projectiles with random behaviour (spread, etc.) must use the level's seeded RNG so
+        that matches stay deterministic."""
+        return self.level.rng
+
     def state_main(self):
-        # move
-        self.x += self.u
-        self.y += self.v
+        integrator = self.level.integrator
+        if integrator:
+            integrator.step_pending(self.level.projectiles)
+        else:
+            self.move()
 
         # add hitboxes every tick
         self.level.add_hitbox(*self.active_hitboxes)
 
+    def move(self):
+        """Same maths as BatchIntegrator.step, for one projectile."""
+        if self.gravity:
+            self.v += max(0, min(self.gravity, self.fall_speed - self.v))
+        if self.air_resistance:
+            self.u = math.copysign(max(abs(self.u) - self.air_resistance, 0), self.u)
+        self.x += self.u
+        self.y += self.v
+
     def enter_hitpause(self):
         pass
 
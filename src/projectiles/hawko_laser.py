@@ -1,7 +1,7 @@
 from pygame import Color, Surface
 
 from src import sounds
-from src.hitboxes import Hitbox
+from src.hitboxes import ActiveHitbox, Hitbox
 from src.projectiles.base import Projectile
 
 
@@ -9,6 +9,20 @@ class HawkoLaser(Projectile):
     width = 150
     height = 10
     speed = 20
+    # one definition per segment, so each segment is an attack of its own and can hit
+    hitboxes = tuple(
+        Hitbox(
+            x_offset=x_offset,
+            width=30,
+            height=30,
+            base_knockback=20,
+            knockback_angle=30,
+            damage=3,
+            sound=sounds.tap4,
+            swept=True,  # fast enough to skip past small targets between ticks
+        )
+        for x_offset in (-75, 0, 75)
+    )
 
     def __init__(self, x, y, facing_right, owner):
         u = self.speed if facing_right else -self.speed
@@ -16,21 +30,9 @@ class HawkoLaser(Projectile):
         self.image = Surface((150, 10))
         self.image.fill(Color("red"))
         self.active_hitboxes = [
-            Hitbox(
-                owner=self,
-                x_offset=x_offset,
-                width=30,
-                height=30,
-                base_knockback=20,
-                knockback_angle=30,
-                damage=3,
-                sound=sounds.tap4,
-            )
-            for x_offset in [-75, 0, 75]
+            ActiveHitbox(hitbox if facing_right else hitbox.mirrored, owner=self)
+            for hitbox in self.hitboxes
         ]
-        if not facing_right:
-            for hitbox in self.active_hitboxes:
-                hitbox.flip_x()
 
     def handle_get_hit(self, hitbox):
         pass  # falco lasers can't be hit
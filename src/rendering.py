@@ -0,0 +1,88 @@
+from pygame import Surface
+from pygame.rect import Rect
+
+from robingame.objects import Entity, Particle
+from src.levels import Level
+from src.platforms import MovingPlatform
+
+
+class DirtyRectRenderer:
+    """
+    Draws a level by only redrawing the parts of the screen that changed, for machines where
+    filling and flipping the whole window every frame is the bottleneck. Off by default; use it
+    in place of Level.draw:
+
+        rects = renderer.draw(level, window)
+        pygame.display.update(rects)
+
+    The static parts of the stage are rendered once, into the level's static layer (see
+    Level.static_layer). Each frame, the areas the moving things (moving platforms, characters,
+    projectiles and particle effects) covered last frame are restored from that layer, then the
+    moving things are drawn over it again. Only those areas, last frame's and this frame's, are
+    returned.
+
+    Frames that change the whole screen are drawn in full by Level.draw, and return the whole
+    screen: the first frame, screen shake (and the frame after it), and debug mode (which draws
+    outside the entities' images).
+    """
+
+    def __init__(self):
+        self.static = None  # the static layer the screen was last drawn from
+        self.previous = []  # what the moving things covered last frame
+        self.full_redraw = True  # whether the screen needs drawing from scratch
+
+    def draw(self, level: Level, surface: Surface, debug=False) -> [Rect]:
+        """Draw the level onto the surface, which must hold last frame's drawing.
+        :return: the areas of the surface that changed"""
+        static = level.static_layer(surface)
+        screen = surface.get_rect()
+        if static is not self.static:
+            self.static = static
+            self.full_redraw = True  # the stage has changed
+        if debug or level.screen_shake or self.full_redraw:
+            level.draw(surface, debug)
+            # after a shaken or debug frame, the next frame has to clear the whole screen too
+            self.full_redraw = bool(debug or level.screen_shake)
+            self.previous = self.moving_rects(level, screen)
+            return [screen]
+
+        origin = level.static_rect.topleft
+        for rect in self.previous:
+            surface.blit(static, rect, rect.move(-origin[0], -origin[1]))
+        level.draw_scene(surface)
+        current = self.moving_rects(level, screen)
+        dirty = self.previous + current
+        self.previous = current
+        return dirty
+
+    def add_overlays(self, rects: [Rect]):
+        """Areas drawn over after the level (e.g. the GUI). Like the moving things, they're
+        restored from the static layer at the start of the next frame."""
+        self.previous.extend(rects)
+
+    def moving_rects(self, level: Level, screen: Rect) -> [Rect]:
+        """The on-screen areas the moving things are drawn over"""
+        entities = [
+            platform for platform in level.platforms if isinstance(platform, MovingPlatform)
+        ]
+        entities.extend(level.characters)
+        entities.extend(level.projectiles)
+        entities.extend(level.particle_effects)
+        rects = []
+        for entity in entities:
+            drawn_rects(entity, rects)
+        return [rect.clip(screen) for rect in rects if rect.colliderect(screen)]
+
+
+def drawn_rects(entity: Entity, rects: [Rect]):
+    """Add the areas the entity and its children are drawn over (outside debug mode) to
+    `rects`."""
+    if isinstance(entity, Particle):
+        # particles are drawn as circles, and have a zero-size rect
+        radius = int(round(entity.radius))
+        rects.append(Rect(0, 0, radius * 2, radius * 2).move(entity.x - radius, entity.y - radius))
+    elif getattr(entity, "image", None):
+        rects.append(entity.image_rect)
+    for group in entity.child_groups:
+        for child in group:
+            drawn_rects(child, rects)
@@ -0,0 +1,314 @@
+"""
+Match replays. A replay only stores the level seed and each player's inputs; the match is
+reproduced by re-simulating it. So a 5 minute match takes a few kilobytes.
+
+Replays double as regression tests for the physics: they also store a hash of the game state
+every few seconds, and `verify` reports the first tick where the re-simulated match differs.
+
+Usage:
+    python -m src.replays record match.replay --ticks 18000
+    python -m src.replays verify match.replay
+    python -m src.replays view match.replay
+"""
+
+import os
+import sys
+
+if __name__ == "__main__" and sys.argv[1:2] != ["view"]:
+    # recording and verifying don't need a window or audio, but viewing does
+    from src.headless import go_headless
+
+    go_headless()
+
+import argparse
+import json
+import struct
+import time
+import zlib
+
+from src import characters, levels
+from src.inputs import PACKED_INPUT, ScriptedInput, pack_input, quantize_input, unpack_input
+from src.simulation import Player, Simulation, bot_match
+from src.sounds import Sound
+
+MAGIC = b"PPRP"
+VERSION = 1
+HEADER = struct.Struct("<4sB")  # magic, version
+LENGTH = struct.Struct("<I")
+RUN = struct.Struct("<H")  # number of ticks an input was held for; followed by the packed input
+
+
+def encode_inputs(inputs: [bytes]) -> bytes:
+    """Run-length encode one player's packed inputs. Buttons are usually held for several
+    ticks, so this shrinks them a lot, even before compression."""
+    runs = bytearray()
+    previous = None
+    count = 0
+    for packed in inputs:
+        if packed == previous and count < 0xFFFF:
+            count += 1
+            continue
+        if previous is not None:
+            runs += RUN.pack(count) + previous
+        previous = packed
+        count = 1
+    if previous is not None:
+        runs += RUN.pack(count) + previous
+    return bytes(runs)
+
+
+def decode_inputs(data: bytes) -> [bytes]:
+    """Inverse of encode_inputs"""
+    inputs = []
+    run_size = RUN.size + PACKED_INPUT.size
+    for offset in range(0, len(data), run_size):
+        (count,) = RUN.unpack_from(data, offset)
+        inputs.extend([data[offset + RUN.size : offset + run_size]] * count)
+    return inputs
+
+
+class Replay:
+    """Everything needed to reproduce a match."""
+
+    def __init__(
+        self,
+        level: str,
+        seed: int,
+        players: [tuple],
+        inputs: [[bytes]],
+        checkpoints: dict,
+    ):
+        """
+        :param level: name of the Level subclass
+        :param players: (character class name, x, y, facing_right) for each player
+        :param inputs: each player's packed input for each tick
+        :param checkpoints: tick -> state hash at the end of that tick
+        """
+        self.level = level
+        self.seed = seed
+        self.players = players
+        self.inputs = inputs
+        self.checkpoints = checkpoints
+
+    @property
+    def ticks(self) -> int:
+        return len(self.inputs[0]) if self.inputs else 0
+
+    def __bytes__(self):
+        metadata = json.dumps(
+            dict(
+                level=self.level,
+                seed=self.seed,
+                players=self.players,
+                checkpoints=[[tick, hash] for tick, hash in self.checkpoints.items()],
+            )
+        ).encode()
+        body = LENGTH.pack(len(metadata)) + metadata
+        for inputs in self.inputs:
+            runs = encode_inputs(inputs)
+            body += LENGTH.pack(len(runs)) + runs
+        return HEADER.pack(MAGIC, VERSION) + zlib.compress(body, 9)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Replay":
+        magic, version = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a replay file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported replay version: {version}")
+        body = zlib.decompress(data[HEADER.size :])
+        (length,) = LENGTH.unpack_from(body)
+        offset = LENGTH.size + length
+        metadata = json.loads(body[LENGTH.size : offset])
+        inputs = []
+        while offset < len(body):
+            (length,) = LENGTH.unpack_from(body, offset)
+            offset += LENGTH.size
+            inputs.append(decode_inputs(body[offset : offset + length]))
+            offset += length
+        return cls(
+            level=metadata["level"],
+            seed=metadata["seed"],
+            players=[tuple(player) for player in metadata["players"]],
+            inputs=inputs,
+            checkpoints={tick: hash for tick, hash in metadata["checkpoints"]},
+        )
+
+    def save(self, filename: str):
+        with open(filename, "wb") as file:
+            file.write(bytes(self))
+
+    @classmethod
+    def load(cls, filename: str) -> "Replay":
+        with open(filename, "rb") as file:
+            return cls.from_bytes(file.read())
+
+    def simulation(self) -> Simulation:
+        """A fresh Simulation of the start of the match, with scripted inputs to replay into."""
+        level_class = getattr(levels, self.level)
+        players = [
+            Player(getattr(characters, name), ScriptedInput(), x, y, facing_right)
+            for name, x, y, facing_right in self.players
+        ]
+        return Simulation(level_class(seed=self.seed), players)
+
+
+class ReplayRecorder:
+    """Records a Simulation's inputs as it runs."""
+
+    checkpoint_interval = 300  # ticks
+
+    def __init__(self, simulation: Simulation):
+        if simulation.tick:
+            raise ValueError("Replays have to be recorded from the start of the match")
+        self.simulation = simulation
+        self.inputs = [[] for _ in simulation.players]
+        self.checkpoints = {}
+
+    def step(self):
+        simulation = self.simulation
+        simulation.read_inputs()
+        for player, inputs in zip(simulation.players, self.inputs):
+            # the simulation has to see exactly what the replay will feed it later
+            values = quantize_input(player.input[-1])
+            player.input[-1] = values
+            inputs.append(pack_input(values))
+        simulation.update()
+        if simulation.tick % self.checkpoint_interval == 0:
+            self.checkpoints[simulation.tick] = simulation.level.state_hash()
+
+    def run(self, ticks: int):
+        for _ in range(ticks):
+            self.step()
+
+    @property
+    def replay(self) -> Replay:
+        simulation = self.simulation
+        return Replay(
+            level=type(simulation.level).__name__,
+            seed=simulation.level.seed,
+            players=[
+                (player.character_class.__name__, player.x, player.y, player.facing_right)
+                for player in simulation.players
+            ],
+            inputs=[list(inputs) for inputs in self.inputs],
+            checkpoints=dict(self.checkpoints),
+        )
+
+
+class ReplayPlayer:
+    """
+    Plays back a Replay. A snapshot is kept every `keyframe_interval` ticks, so seeking only
+    has to re-simulate from the nearest keyframe, instead of from the start of the match.
+    """
+
+    keyframe_interval = 300  # ticks
+
+    def __init__(self, replay: Replay):
+        self.replay = replay
+        self.simulation = replay.simulation()
+        self.keyframes = {}  # tick -> Simulation snapshot from the start of that tick
+
+    @property
+    def tick(self) -> int:
+        return self.simulation.tick
+
+    @property
+    def finished(self) -> bool:
+        return self.tick >= self.replay.ticks
+
+    def step(self):
+        tick = self.tick
+        if tick % self.keyframe_interval == 0 and tick not in self.keyframes:
+            self.keyframes[tick] = self.simulation.snapshot()
+        for player, inputs in zip(self.simulation.players, self.replay.inputs):
+            player.input.set_values(unpack_input(inputs[tick]))
+        self.simulation.step()
+
+    def seek(self, tick: int):
+        """Jump to the start of any tick, re-simulating as fast as possible."""
+        tick = max(0, min(tick, self.replay.ticks))
+        keyframe = max((key for key in self.keyframes if key <= tick), default=None)
+        if keyframe is not None and (tick < self.tick or keyframe > self.tick):
+            self.simulation.restore(self.keyframes[keyframe])
+        muted = Sound.muted
+        Sound.muted = True
+        try:
+            while self.tick < tick:
+                self.step()
+        finally:
+            Sound.muted = muted
+
+    def verify(self) -> int | None:
+        """Re-simulate the whole match. Returns the first checkpoint tick where the game state
+        doesn't match the recording, or None if they all match."""
+        self.seek(0)
+        while not self.finished:
+            self.step()
+            expected = self.replay.checkpoints.get(self.tick)
+            if expected is not None and self.simulation.level.state_hash() != expected:
+                return self.tick
+        return None
+
+
+def view(replay: Replay):
+    """Watch a replay in real time. Left/right arrows skip 5 seconds; space pauses."""
+    import pygame
+
+    from src import conf
+
+    window = pygame.display.set_mode((conf.SCREEN_WIDTH, conf.SCREEN_HEIGHT))
+    clock = pygame.time.Clock()
+    player = ReplayPlayer(replay)
+    Sound.muted = False
+    paused = False
+    skip = 5 * conf.FPS
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    return
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                if event.key == pygame.K_LEFT:
+                    player.seek(player.tick - skip)
+                if event.key == pygame.K_RIGHT:
+                    player.seek(player.tick + skip)
+        if not paused and not player.finished:
+            player.step()
+        player.simulation.level.draw(window)
+        pygame.display.flip()
+        clock.tick(conf.FPS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record, check and watch replays.")
+    parser.add_argument("command", choices=["record", "verify", "view"])
+    parser.add_argument("filename")
+    parser.add_argument("--ticks", type=int, default=3600, help="length of a recorded match")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        recorder = ReplayRecorder(bot_match(seed=args.seed))
+        recorder.run(args.ticks)
+        recorder.replay.save(args.filename)
+        print(f"recorded {args.ticks} ticks in {os.path.getsize(args.filename)} bytes")
+    elif args.command == "verify":
+        replay = Replay.load(args.filename)
+        start = time.perf_counter()
+        desync = ReplayPlayer(replay).verify()
+        elapsed = time.perf_counter() - start
+        if desync is None:
+            print(f"{replay.ticks} ticks match the recording ({elapsed:.2f}s)")
+        else:
+            print(f"game state differs from the recording by tick {desync}")
+            sys.exit(1)
+    else:
+        view(Replay.load(args.filename))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ from robingame.objects import Entity, Group
 
 from src import characters
 from src.levels import Battlefield
+from src.sounds import Sound
 
 char2 = characters.MonkeyKing
 char1 = characters.Hawko
@@ -55,3 +56,44 @@ class SandBox(Entity):
 
     def update(self):
         super().update()
+
+
+class NetplayMatch(Entity):
+    """
+    A match against another copy of the game, over rollback netcode (see src.netcode). The
+    simulation is stepped by the RollbackSession, not by the usual entity update, so that it
+    can be rewound and re-simulated before the frame is drawn.
+    """
+
+    game: "PixelPuncher"  # parent scene
+
+    def __init__(self, transport: "LoopbackTransport", local_player: int, seed=0, input=None):
+        """
+        :param input: where the local player's inputs come from; the game's first controller,
+            if not given
+        """
+        from src.netcode import RollbackSession, netplay_match
+
+        super().__init__()
+        muted = Sound.muted
+        simulation = netplay_match(seed=seed)
+        Sound.muted = muted  # simulations mute the sound, because they're usually headless
+        self.session = RollbackSession(simulation, local_player, transport)
+        self.level = simulation.level
+        self.input = input
+        self.gui_elements = Group()
+        self.child_groups = [self.gui_elements]
+        self.state = self.state_main
+
+    def state_main(self):
+        if self.input is None:
+            self.input = self.game.controller0
+        self.session.advance(self.input.get_down())
+
+    def draw(self, surface, debug=False):
+        self.level.draw(surface, debug)
+        super().draw(surface, debug)
+
+    def kill(self):
+        self.session.transport.close()
+        super().kill()
@@ -0,0 +1,146 @@
+"""
+Headless simulation: runs matches without a window, drawing or audio, as fast as the CPU allows.
+Useful for bot-vs-bot balance testing.
+
+Usage:
+    python -m src.simulation --matches 10 --ticks 3600
+"""
+
+if __name__ == "__main__":
+    from src.headless import go_headless
+
+    go_headless()
+
+import argparse
+import time
+
+from src import characters
+from src.characters import Character
+from src.inputs import RandomInput, ScriptedInput
+from src.levels import Battlefield, Level
+from src.sounds import Sound
+
+
+class Player:
+    """A character slot in a simulation. When the character is KO'd, a new one is spawned."""
+
+    def __init__(
+        self,
+        character_class: type[Character],
+        input: ScriptedInput,
+        x: int,
+        y: int,
+        facing_right: bool = True,
+    ):
+        self.character_class = character_class
+        self.input = input
+        self.x = x
+        self.y = y
+        self.facing_right = facing_right
+        self.character = None
+        self.deaths = 0
+
+    def spawn(self, level: Level):
+        self.character = self.character_class(
+            self.x, self.y, input=self.input, facing_right=self.facing_right
+        )
+        level.add_character(self.character)
+
+
+class Simulation:
+    """
+    Runs Level.main, the character states and the HitHandler without any drawing or audio, and
+    without waiting for the frame clock.
+
+    The simulation advances in fixed steps, and all its randomness comes from the level's seeded
+    RNG. So the same level seed and the same inputs always produce the same match, tick for
+    tick. Set `record_hashes` to keep the world-state hash of every tick, to check this.
+    """
+
+    def __init__(self, level: Level, players: [Player], record_hashes: bool = False):
+        Sound.muted = True
+        self.level = level
+        self.players = players
+        self.tick = 0
+        self.record_hashes = record_hashes
+        self.hashes = []
+        for player in self.players:
+            player.spawn(self.level)
+
+    def step(self):
+        """Advance the simulation by one tick."""
+        self.read_inputs()
+        self.update()
+
+    def read_inputs(self):
+        for player in self.players:
+            player.input.read_new_inputs()
+
+    def update(self):
+        """Advance the simulation by one tick, using the inputs that have already been read."""
+        self.level.update()
+        for player in self.players:
+            if not player.character.alive():
+                player.deaths += 1
+                player.spawn(self.level)
+        self.tick += 1
+        if self.record_hashes:
+            self.hashes.append(self.level.state_hash())
+
+    def snapshot(self) -> tuple:
+        players = tuple((player.character, player.deaths) for player in self.players)
+        return self.tick, self.level.snapshot(), players
+
+    def restore(self, snapshot: tuple):
+        self.tick, level_snapshot, players = snapshot
+        self.level.restore(level_snapshot)
+        del self.hashes[self.tick :]
+        for player, (character, deaths) in zip(self.players, players):
+            player.character = character
+            player.deaths = deaths
+
+    def run(self, ticks: int) -> float:
+        """Run for a number of ticks. Returns the ticks per second achieved."""
+        start = time.perf_counter()
+        for _ in range(ticks):
+            self.step()
+        elapsed = time.perf_counter() - start
+        return ticks / elapsed if elapsed else float("inf")
+
+
+def bot_match(seed: int = 0, **kwargs) -> Simulation:
+    """Hawko vs MonkeyKing on Battlefield, both controlled by random bots."""
+    level = Battlefield(seed=seed)
+    character_classes = [characters.Hawko, characters.MonkeyKing]
+    players = [
+        Player(character_class, RandomInput(seed=seed + ii), *spawn_point)
+        for ii, (character_class, spawn_point) in enumerate(
+            zip(character_classes, level.spawn_points)
+        )
+    ]
+    return Simulation(level, players, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless bot-vs-bot matches.")
+    parser.add_argument("--matches", type=int, default=1)
+    parser.add_argument("--ticks", type=int, default=3600, help="ticks per match")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    total_ticks = 0
+    start = time.perf_counter()
+    for match in range(args.matches):
+        simulation = bot_match(seed=args.seed + match)
+        ticks_per_second = simulation.run(args.ticks)
+        total_ticks += args.ticks
+        deaths = ", ".join(
+            f"{player.character_class.__name__}: {player.deaths}" for player in simulation.players
+        )
+        print(f"match {match}: {ticks_per_second:.0f} ticks/s; deaths: {deaths}")
+    elapsed = time.perf_counter() - start
+    print(f"{total_ticks} ticks in {elapsed:.2f}s ({total_ticks / elapsed:.0f} ticks/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import random
+from array import array
+
+from robingame.input import InputQueue
+from robingame.objects import PhysicalEntity
+
+
+class Snapshot:
+    """
+    Compact record of a Level at the end of a tick. Used for rollback and AI search, so taking
+    and restoring one needs to be cheap.
+
+    Numeric state (positions, velocities, damage, counters...) is packed into one flat array of
+    doubles; `bytes(snapshot)` gives its raw contents. Things that can't be packed into numbers
+    are kept by reference: entity states (which are bound methods, closures like hitpause, or
+    Move instances), images, which entities are in the level, and the RNG state. That's safe
+    because those objects are never mutated in place---entities swap them for new ones instead.
+    """
+
+    __slots__ = ("record", "objects", "members", "hits", "rng_state", "inputs")
+
+    def __init__(self, record: array, objects: tuple, members: tuple, hits, rng_state, inputs):
+        self.record = record
+        self.objects = objects
+        self.members = members
+        self.hits = hits
+        self.rng_state = rng_state
+        self.inputs = inputs
+
+    def __bytes__(self):
+        return self.record.tobytes()
+
+    @property
+    def tick(self) -> int:
+        return int(self.record[0])
+
+
+class SnapshotRandom(random.Random):
+    """
+    random.Random whose state is cheap to save and restore when it hasn't been used. Its full
+    state is a 625-item tuple, which takes longer to copy than the rest of a snapshot put
+    together, and gameplay RNG is only drawn from occasionally. So the state is only fetched
+    again after a draw.
+    """
+
+    def __init__(self, seed=None):
+        self._state = None
+        super().__init__(seed)
+
+    def seed(self, *args, **kwargs):
+        self._state = None
+        super().seed(*args, **kwargs)
+
+    def random(self):
+        self._state = None
+        return super().random()
+
+    def getrandbits(self, k):
+        self._state = None
+        return super().getrandbits(k)
+
+    def getstate(self):
+        if self._state is None:
+            self._state = super().getstate()
+        return self._state
+
+    def setstate(self, state):
+        if state is not self._state:
+            super().setstate(state)
+            self._state = state
+
+
+def pack_entity(entity: PhysicalEntity, record: array, objects: list):
+    """
+    Append the entity's state to the snapshot record. Each entity class lists the attributes
+    it needs saving in `snapshot_fields`; position, tick, state and image are always saved.
+    """
+    rect = entity.rect
+    record.append(rect.x)
+    record.append(rect.y)
+    record.append(entity.tick)
+    record.extend([getattr(entity, name) for name, _ in entity.snapshot_fields])
+    objects.append(entity.state)
+    objects.append(entity.image)
+
+
+def unpack_entity(
+    entity: PhysicalEntity,
+    record: array,
+    record_index: int,
+    objects: tuple,
+    object_index: int,
+) -> (int, int):
+    """Inverse of pack_entity. Returns the indices of the next entity's data."""
+    entity.rect.x = int(record[record_index])
+    entity.rect.y = int(record[record_index + 1])
+    entity.state = objects[object_index]  # this resets the tick, so set the tick after
+    entity.tick = int(record[record_index + 2])
+    entity.image = objects[object_index + 1]
+    record_index += 3
+    for name, type_ in entity.snapshot_fields:
+        setattr(entity, name, type_(record[record_index]))
+        record_index += 1
+    return record_index, object_index + 2
+
+
+def pack_inputs(entities) -> tuple:
+    """The recent input history of each input device, because input buffering looks back
+    several ticks."""
+    inputs = {}
+    for entity in entities:
+        input = getattr(entity, "input", None)
+        if isinstance(input, InputQueue) and id(input) not in inputs:
+            inputs[id(input)] = (input, tuple(input))
+    return tuple(inputs.values())
+
+
+def unpack_inputs(inputs: tuple):
+    for input, history in inputs:
+        input.clear()
+        input.extend(history)
@@ -1,14 +1,19 @@
 import pygame
 
-from .utils import load_sound
+from src import conf
+from .utils import load_sound, Sound
 
 
 def _(name):
     return load_sound(f"general/{name}")
 
 
-pygame.mixer.pre_init(32000, -16, 2, 512)
-pygame.mixer.init()
+if not conf.HEADLESS:
+    pygame.mixer.pre_init(32000, -16, 2, 512)
+    try:
+        pygame.mixer.init()
+    except pygame.error:
+        pass  # no audio device; all sounds will be silent
 
 hit = _("hit")
 hit2 = _("hit2")
@@ -6,9 +6,28 @@ import pygame
 folder = Path(__file__).parent / "files"
 
 
+class Sound:
+    """
+    Wrapper around pygame.mixer.Sound. If the mixer isn't initialised (there's no audio device,
+    or the game is running headless) the sound silently does nothing.
+
+    Setting `Sound.muted = True` silences all sounds, e.g. while re-simulating frames.
+    """
+
+    muted = False
+
+    def __init__(self, file):
+        self.file = file
+        self.sound = pygame.mixer.Sound(file) if pygame.mixer.get_init() else None
+
+    def play(self, *args, **kwargs):
+        if self.sound and not Sound.muted:
+            return self.sound.play(*args, **kwargs)
+
+
 def load_sound(name):
     files = glob.glob((folder / f"{name}.*").as_posix())
     assert len(files) > 0, f"Couldn't find sound called '{name}'"
     assert len(files) < 2, f"There's more than one sound called '{name}'"
     file = files[0]
-    return pygame.mixer.Sound(file)
+    return Sound(file)
@@ -24,5 +24,6 @@ stickman_sprites = SpriteDict(
         weird_hit="stick_weird_hit.png",
         taunt="stick_taunt.png",
         stomp="stick_stomp.png",
+        special_fall="stick_stomp.png",
     ),
 )
@@ -0,0 +1,189 @@
+"""
+Stages as data. A stage file is JSON listing the stage's platforms, blast zone, spawn points,
+ledges and background layers (see battlefield.json and towers.json), so new stages don't need
+any code.
+
+Loading a stage bakes it: the background layers are rendered into one image, and the platforms
+are sorted into the cells of the level's collision index. The baked stage is cached on disk (in
+$PIXEL_PUNCHER_CACHE/stages, or ~/.cache/pixel-puncher/stages), keyed by a hash of the stage
+file and any images it uses, so a stage is only baked again when it changes, and the bakes of
+its earlier versions are deleted. Loading from the cache costs the same however many layers and
+platforms the stage has.
+
+Stage file keys:
+    size: [width, height] of the background
+    blast_zone: {x, y, width, height}, centered on x, y
+    spawn_points: [{x, y, facing_right}]
+    ledges: [{x, y, facing_right}]
+    platforms: [{x, y, width, height, droppable (optional), path (optional)}]. Platforms with
+        a path are MovingPlatforms; see that class for the path format.
+    background: layers drawn in order, each one of
+        {color: [r, g, b]}: fill the whole background
+        {color: [r, g, b], rect: [left, top, width, height]}: fill a rectangle
+        {image, x, y}: an image file, relative to the stage file, with its top left at x, y
+"""
+
+import hashlib
+import json
+import os
+import struct
+import zlib
+from pathlib import Path
+
+import pygame
+from pygame import Color, Surface
+
+from src.levels import BlastZone, Level, Scenery
+from src.platforms import MovingPlatform, Platform
+
+STAGE_DIR = Path(__file__).parent
+
+MAGIC = b"PPST"
+VERSION = 2  # bump this whenever baking changes, so old cache files are ignored
+HEADER = struct.Struct("<4sB")  # magic, version
+LENGTH = struct.Struct("<I")
+SIZE = struct.Struct("<II")  # width, height of the background
+BACKGROUND_COLOR = (150, 150, 150)  # same as Level.draw clears the screen to
+
+_baked = {}  # digest -> BakedStage, so a stage is only read from disk once per process
+
+
+class BakedStage:
+    """A stage, ready to build levels from."""
+
+    def __init__(self, data: dict, platform_index: dict, background: Surface | None):
+        """
+        :param data: the stage file's contents
+        :param platform_index: the platforms' SpatialHash.bake()
+        :param background: all the background layers, rendered
+        """
+        self.data = data
+        self.platform_index = platform_index
+        self.background = background
+
+    @property
+    def name(self) -> str:
+        return self.data["name"]
+
+    def build(self, level: Level):
+        """Add the stage to an empty level."""
+        data = self.data
+        level.add_platform(*(make_platform(spec) for spec in data["platforms"]))
+        level.load_platform_index(self.platform_index)
+        if self.background is not None:
+            level.add_background(Scenery(self.background))
+        zone = data["blast_zone"]
+        level.blast_zone = BlastZone(zone["x"], zone["y"], zone["width"], zone["height"])
+        level.add_invisible_element(level.blast_zone)
+        level.spawn_points = [
+            (point["x"], point["y"], point["facing_right"]) for point in data["spawn_points"]
+        ]
+        level.ledges = [(ledge["x"], ledge["y"], ledge["facing_right"]) for ledge in data["ledges"]]
+
+    def level(self, seed=None) -> Level:
+        level = Level(seed)
+        self.build(level)
+        return level
+
+    def __bytes__(self):
+        metadata = json.dumps(dict(data=self.data, platform_index=self.platform_index)).encode()
+        metadata = zlib.compress(metadata)
+        data = HEADER.pack(MAGIC, VERSION) + LENGTH.pack(len(metadata)) + metadata
+        if self.background is not None:
+            data += SIZE.pack(*self.background.get_size())
+            # backgrounds are mostly flat colors, so even the fastest compression shrinks them
+            # a lot
+            data += zlib.compress(pygame.image.tobytes(self.background, "RGB"), 1)
+        return data
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BakedStage":
+        magic, version = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a baked stage")
+        if version != VERSION:
+            raise ValueError(f"Unsupported baked stage version: {version}")
+        (length,) = LENGTH.unpack_from(data, HEADER.size)
+        offset = HEADER.size + LENGTH.size
+        metadata = json.loads(zlib.decompress(data[offset : offset + length]))
+        offset += length
+        background = None
+        if offset < len(data):
+            size = SIZE.unpack_from(data, offset)
+            pixels = zlib.decompress(data[offset + SIZE.size :])
+            background = pygame.image.frombytes(pixels, size, "RGB")
+        return cls(metadata["data"], metadata["platform_index"], background)
+
+
+def make_platform(spec: dict) -> Platform:
+    args = (spec["x"], spec["y"], spec["width"], spec["height"])
+    droppable = spec.get("droppable", False)
+    if "path" in spec:
+        return MovingPlatform(*args, path=[tuple(leg) for leg in spec["path"]], droppable=droppable)
+    return Platform(*args, droppable=droppable)
+
+
+def stage_path(stage: str | Path) -> Path:
+    """Stage name (e.g. "battlefield") or path to a stage file -> path to the stage file"""
+    path = Path(stage)
+    return path if path.suffix else STAGE_DIR / f"{stage}.json"
+
+
+def bake(data: dict, directory: Path) -> BakedStage:
+    """
+    Do the expensive parts of loading a stage.
+    :param directory: where the stage's image files are
+    """
+    level = Level(seed=0)
+    level.add_platform(*(make_platform(spec) for spec in data["platforms"]))
+    platform_index = level.platform_index.bake()
+    background = None
+    if data["background"]:
+        background = Surface(data["size"])
+        background.fill(BACKGROUND_COLOR)
+        for layer in data["background"]:
+            if "image" in layer:
+                image = pygame.image.load(directory / layer["image"])
+                background.blit(image, (layer["x"], layer["y"]))
+            else:
+                background.fill(Color(*layer["color"]), layer.get("rect"))
+    return BakedStage(data, platform_index, background)
+
+
+def default_cache_dir() -> Path:
+    """Where baked stages are kept. Read from the environment each time, so that it can be
+    pointed somewhere else (e.g. by tests) after this module is imported."""
+    root = os.environ.get("PIXEL_PUNCHER_CACHE", Path.home() / ".cache" / "pixel-puncher")
+    return Path(root) / "stages"
+
+
+def load_stage(stage: str | Path, cache_dir: Path = None) -> BakedStage:
+    """Load a stage file, baking it if it hasn't been baked since it last changed."""
+    path = stage_path(stage)
+    cache_dir = Path(cache_dir or default_cache_dir())
+    source = path.read_bytes()
+    data = json.loads(source)
+    digest = hashlib.blake2b(source, digest_size=16)
+    for layer in data["background"]:
+        if "image" in layer:
+            digest.update((path.parent / layer["image"]).read_bytes())
+    key = digest.hexdigest()
+    if key in _baked:
+        return _baked[key]
+
+    cache_file = cache_dir / f"{path.stem}-{key}.stage"
+    try:
+        stage = BakedStage.from_bytes(cache_file.read_bytes())
+    except (OSError, ValueError, zlib.error, struct.error):
+        stage = bake(data, path.parent)
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            cache_file.write_bytes(bytes(stage))
+            # bakes of earlier versions of the stage won't be loaded again
+            for stale in cache_dir.glob(f"{path.stem}-*.stage"):
+                if stale != cache_file:
+                    stale.unlink(missing_ok=True)
+        except OSError:
+            pass  # e.g. a read-only home directory; the stage just gets baked every run
+    _baked[key] = stage
+    return stage
@@ -0,0 +1,29 @@
+import pytest
+
+from src.benchmarks import SCENARIOS, SECTIONS, compare, run_scenario, timed_sections
+
+
+@pytest.mark.parametrize("name", SCENARIOS)
+def test_scenarios_run(name):
+    result = run_scenario(SCENARIOS[name], ticks=20)
+    assert 0 < result["p50_ms"] <= result["p99_ms"] <= result["max_ms"]
+    for section in SECTIONS:
+        assert result[f"{section}_ms"] >= 0
+    assert "alloc_kb_per_tick" in run_scenario(SCENARIOS[name], ticks=5, trace=True)
+
+
+def test_timed_sections_are_removed_afterwards():
+    originals = {
+        (cls, name): cls.__dict__.get(name) for cls, names in SECTIONS.values() for name in names
+    }
+    totals = {section: 0 for section in SECTIONS}
+    with timed_sections(totals):
+        for cls, name in originals:
+            assert cls.__dict__.get(name) is not originals[cls, name]
+    for cls, name in originals:
+        assert cls.__dict__.get(name) is originals[cls, name]
+
+
+def test_compare():
+    lines = compare({"duel": {"p50_ms": 2.0}}, {"duel": {"p50_ms": 1.0}})
+    assert lines == [f"{'duel':>24} {'p50_ms':>20} {2:10.3f} {1:+8.1%}"]
@@ -0,0 +1,220 @@
+import math
+import random
+
+import numpy
+import pytest
+from pygame.rect import Rect
+
+from src.collision import Capsule, SpatialHash, capsules_overlap
+
+
+def test_spatial_hash_collide():
+    grid = SpatialHash(cell_size=10)
+    a = "a"
+    b = "b"
+    grid.insert(a, Rect(0, 0, 5, 5))
+    grid.insert(b, Rect(25, 25, 30, 30))
+    assert len(grid) == 2
+    assert a in grid
+
+    assert grid.collide(Rect(0, 0, 1, 1)) == [a]
+    assert grid.collide(Rect(50, 50, 10, 10)) == [b]
+    assert grid.collide(Rect(0, 0, 100, 100)) == [a, b]
+    assert grid.collide(Rect(-100, -100, 10, 10)) == []
+    # same cell as a, but not overlapping
+    assert grid.candidates(Rect(6, 6, 2, 2)) == [a]
+    assert grid.collide(Rect(6, 6, 2, 2)) == []
+
+    grid.clear()
+    assert len(grid) == 0
+    assert grid.collide(Rect(0, 0, 100, 100)) == []
+
+
+def test_spatial_hash_preserves_insertion_order():
+    grid = SpatialHash(cell_size=10)
+    items = list(range(20))
+    for item in reversed(items):
+        grid.insert(item, Rect(item * 5, 0, 10, 10))
+    assert grid.collide(Rect(0, 0, 200, 10)) == list(reversed(items))
+
+
+@pytest.mark.parametrize("cell_size", [1, 7, 64, 1000])
+def test_spatial_hash_matches_linear_scan(cell_size):
+    rng = random.Random(cell_size)
+    rects = [
+        Rect(rng.randint(-500, 500), rng.randint(-500, 500), rng.randint(0, 80), rng.randint(0, 80))
+        for _ in range(200)
+    ]
+    grid = SpatialHash(cell_size=cell_size)
+    for ii, rect in enumerate(rects):
+        grid.insert(ii, rect)
+
+    for _ in range(50):
+        query = Rect(rng.randint(-500, 500), rng.randint(-500, 500), 60, 100)
+        expected = [ii for ii, rect in enumerate(rects) if rect.colliderect(query)]
+        assert grid.collide(query) == expected
+
+
+def test_spatial_hash_forgets_cached_queries_on_insert():
+    grid = SpatialHash(cell_size=10)
+    grid.insert("a", Rect(0, 0, 5, 5))
+    assert grid.collide(Rect(0, 0, 10, 10)) == ["a"]
+    grid.insert("b", Rect(5, 5, 5, 5))
+    assert grid.collide(Rect(0, 0, 10, 10)) == ["a", "b"]
+    grid.clear()
+    assert grid.collide(Rect(0, 0, 10, 10)) == []
+
+
+def test_level_colliding_platforms_matches_spritecollide():
+    import pygame
+
+    from src.levels import Battlefield
+    from src.platforms import Platform
+
+    rng = random.Random(0)
+    level = Battlefield(seed=0)
+    for _ in range(60):
+        level.add_platform(Platform(rng.randint(0, 1800), rng.randint(0, 900), 80, 10))
+    sprite = pygame.sprite.Sprite()
+    for _ in range(200):
+        sprite.rect = Rect(rng.randint(-100, 1900), rng.randint(-100, 1000), 50, 100)
+        expected = pygame.sprite.spritecollide(sprite, level.platforms, dokill=False)
+        assert level.colliding_platforms(sprite.rect) == expected
+
+
+def test_level_colliding_platforms_forgets_removed_platforms():
+    from src.levels import Battlefield
+    from src.platforms import Platform
+
+    level = Battlefield(seed=0)
+    platform = Platform(100, 100, 80, 10)
+    other = Platform(100, 120, 80, 10)
+    level.add_platform(platform, other)
+    rect = Rect(60, 90, 100, 50)
+    assert level.colliding_platforms(rect) == [platform, other]
+
+    platform.kill()
+    assert level.colliding_platforms(rect) == [other]
+    level.platforms.remove(other)
+    assert level.colliding_platforms(rect) == []
+    level.add_platform(platform)
+    assert level.colliding_platforms(rect) == [platform]
+
+
+def test_spatial_hash_move():
+    rng = random.Random(0)
+    rects = [Rect(rng.randint(0, 500), rng.randint(0, 500), 40, 10) for _ in range(50)]
+    grid = SpatialHash(cell_size=32)
+    for ii, rect in enumerate(rects):
+        grid.insert(ii, rect)
+
+    for _ in range(200):
+        ii = rng.randrange(len(rects))
+        rects[ii] = rects[ii].move(rng.randint(-50, 50), rng.randint(-50, 50))
+        grid.move(ii, rects[ii])
+        query = Rect(rng.randint(0, 500), rng.randint(0, 500), 60, 100)
+        # same results, and in the original order, as if the index had been rebuilt
+        expected = [ii for ii, rect in enumerate(rects) if rect.colliderect(query)]
+        assert grid.collide(query) == expected
+
+
+def test_spatial_hash_move_in_place():
+    """Items can share their rects with the index, like the level's platforms do"""
+    rng = random.Random(0)
+    rects = [Rect(rng.randint(0, 500), rng.randint(0, 500), 40, 10) for _ in range(50)]
+    grid = SpatialHash(cell_size=32)
+    for ii, rect in enumerate(rects):
+        grid.insert(ii, rect)
+
+    for _ in range(200):
+        ii = rng.randrange(len(rects))
+        rects[ii].move_ip(rng.randint(-50, 50), rng.randint(-50, 50))
+        grid.move(ii, rects[ii])
+        query = Rect(rng.randint(0, 500), rng.randint(0, 500), 60, 100)
+        expected = [ii for ii, rect in enumerate(rects) if rect.colliderect(query)]
+        assert grid.collide(query) == expected
+
+
+def segment_distance(a: Capsule, b: Capsule) -> float:
+    """Closest approach of the capsules' segments, by sampling them finely"""
+    steps = numpy.linspace(-1, 1, 401)
+    points_a = numpy.stack([a.x + steps * a.dx, a.y + steps * a.dy], axis=1)
+    points_b = numpy.stack([b.x + steps * b.dx, b.y + steps * b.dy], axis=1)
+    gaps = points_a[:, None, :] - points_b[None, :, :]
+    return numpy.sqrt((gaps**2).sum(axis=2)).min()
+
+
+def test_capsules_overlap():
+    rng = random.Random(0)
+    pairs = []
+    for _ in range(500):
+        a, b = (
+            Capsule.fit(
+                rng.choice([1, 10, 20, 60]),
+                rng.choice([1, 10, 20, 60]),
+                rng.choice([0, 45, 90, rng.uniform(0, 360)]),
+                x=rng.uniform(0, 80),
+                y=rng.uniform(0, 80),
+            )
+            for _ in range(2)
+        )
+        pairs.append((a, b))
+    overlapping = capsules_overlap(
+        numpy.array([a for a, _ in pairs]), numpy.array([b for _, b in pairs])
+    )
+    for (a, b), overlaps in zip(pairs, overlapping):
+        gap = segment_distance(a, b) - (a.radius + b.radius)
+        if abs(gap) > 0.5:  # sampling the segments isn't exact
+            assert overlaps == (gap < 0), (a, b)
+
+
+def test_capsule_fit():
+    # a circle
+    assert Capsule.fit(10, 10, x=3, y=4) == (3, 4, 0, 0, 5)
+    # wide boxes lie along x, and tall ones along y
+    assert Capsule.fit(30, 10) == pytest.approx((0, 0, 10, 0, 5))
+    assert Capsule.fit(10, 30) == pytest.approx((0, 0, 0, -10, 5))
+    # rotation is anticlockwise on screen
+    assert Capsule.fit(30, 10, rotation=90) == pytest.approx((0, 0, 0, -10, 5))
+    diagonal = Capsule.fit(30, 10, rotation=45)
+    assert diagonal.dx == pytest.approx(10 / math.sqrt(2))
+    assert diagonal.dy == pytest.approx(-10 / math.sqrt(2))
+
+    rect = Rect(100, 200, 50, 100)
+    assert Capsule.from_rect(rect).bounding_rect() == rect
+    # rotated shapes are bounded by a bigger rect
+    assert diagonal.bounding_rect() == Rect(-13, -13, 26, 26)
+
+
+def test_swept_capsules_overlap():
+    """A swept capsule overlaps whatever the capsule overlaps somewhere along the way"""
+    rng = random.Random(0)
+    moves = numpy.linspace(-1, 0, 201)
+    for _ in range(200):
+        a, b = (
+            Capsule.fit(
+                rng.choice([1, 10, 40]),
+                rng.choice([1, 10, 40]),
+                rng.uniform(0, 360),
+                x=rng.uniform(0, 100),
+                y=rng.uniform(0, 100),
+            )
+            for _ in range(2)
+        )
+        sweep = (rng.uniform(-80, 80), rng.uniform(-80, 80))
+        swept = capsules_overlap(numpy.array([a]), numpy.array([b]), numpy.array([sweep]))[0]
+        path = numpy.array(
+            [a.moved_to(a.x + move * sweep[0], a.y + move * sweep[1]) for move in moves]
+        )
+        targets = numpy.array([b] * len(moves))
+        if capsules_overlap(path, targets).any():
+            assert swept
+        # sampling the path misses a little in between samples
+        targets[:, 4] += 1
+        if swept:
+            assert capsules_overlap(path, targets).any()
+    # not moving is the same as not being swept
+    a = numpy.array([Capsule.fit(10, 10)])
+    b = numpy.array([Capsule.fit(10, 10, x=20)])
+    assert not capsules_overlap(a, b, numpy.array([(0, 0)]))[0]
+    assert capsules_overlap(a, b, numpy.array([(-40, 0)]))[0]
@@ -0,0 +1,48 @@
+import pygame
+from pygame import Surface
+
+from src import conf
+from src.game import PixelPuncher
+from src.inputs import ScriptedInput
+
+
+def test_dirty_rects_update_only_what_changed(monkeypatch):
+    monkeypatch.setattr(conf, "DIRTY_RECTS", True)
+    monkeypatch.setattr("src.game.GamecubeController", lambda controller_id: ScriptedInput())
+    updates = []
+    monkeypatch.setattr(pygame.display, "update", lambda *args: updates.append(args))
+    game = PixelPuncher()
+    game.fps = 0
+    screen = game.window.get_rect()
+    for _ in range(30):
+        game._update()
+        game._draw(game.window)
+
+    (first,) = updates[0]
+    assert screen in first  # the first frame is drawn in full
+    for (rects,) in updates[1:]:
+        assert sum(rect.width * rect.height for rect in rects) < screen.width * screen.height / 5
+    expected = Surface(screen.size)
+    game.draw(expected)
+    assert pygame.image.tobytes(game.window, "RGB") == pygame.image.tobytes(expected, "RGB")
+
+
+def test_netplay_option(monkeypatch):
+    from src.netcode import loopback_pair
+    from src.scenes import NetplayMatch
+
+    monkeypatch.setattr("src.game.GamecubeController", lambda controller_id: ScriptedInput())
+    transport, peer = loopback_pair()
+    game = PixelPuncher(netplay=dict(transport=transport, local_player=0))
+    game.fps = 0
+    (scene,) = game.scenes
+    assert isinstance(scene, NetplayMatch)
+    for _ in range(5):
+        game._update()
+        game._draw(game.window)
+    # the game's first controller is the local player
+    assert scene.input is game.controller0
+    assert scene.session.tick == 5
+    assert len(peer.receive()) == 5
+    scene.kill()
+    peer.close()
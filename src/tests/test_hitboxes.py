@@ -1,3 +1,4 @@
+from copy import copy
 from unittest.mock import patch, MagicMock
 
 import pygame
@@ -5,8 +6,10 @@ import pytest
 from pygame.rect import Rect
 
 from robingame.objects import Group, PhysicalEntity
-from src.characters import Character
-from src.hitboxes import Hitbox, HitHandler
+from src.characters import Character, Hawko, table_hitboxes
+from src.hitboxes import ActiveHitbox, Hitbox, HitHandler, HitRegistry
+from src.levels import Level
+from src.projectiles.hawko_laser import HawkoLaser
 
 pygame.display.init()
 window = pygame.display.set_mode((50, 50))
@@ -20,9 +23,7 @@ class MockPhysicalEntity(PhysicalEntity):
 
 
 def test_siblings_set_at_init():
-    owner = PhysicalEntity()
-    owner.rect = Rect(0, 0, 0, 0)
-    kwargs = dict(width=10, height=10, rotation=0, owner=owner)
+    kwargs = dict(width=10, height=10, rotation=0)
     h3 = Hitbox(**kwargs)
     h2 = Hitbox(**kwargs, lower_priority_sibling=h3)
     h1 = Hitbox(**kwargs, lower_priority_sibling=h2)
@@ -69,9 +70,7 @@ def test_siblings_set_at_init():
 
 
 def test_setting_siblings_properties():
-    owner = PhysicalEntity()
-    owner.rect = Rect(0, 0, 0, 0)
-    kwargs = dict(width=10, height=10, rotation=0, owner=owner)
+    kwargs = dict(width=10, height=10, rotation=0)
 
     # no siblings expected output
     h1 = Hitbox(**kwargs)
@@ -118,29 +117,25 @@ def test_setting_siblings_properties():
 def test_owner_position_inheritance():
     owner = PhysicalEntity()
     owner.rect = Rect(6, 9, 0, 0)
-    kwargs = dict(width=10, height=10, rotation=0, owner=owner)
 
     # hitbox should take its position from owner
-    h1 = Hitbox(**kwargs)
-    assert h1.x == 6
-    assert h1.y == 9
+    h1 = ActiveHitbox(Hitbox(width=10, height=10, rotation=0), owner=owner)
+    assert h1.rect.center == (6, 9)
 
     # update owner position; this should be reflected in hitbox
     owner.x = 10
     owner.y = 20
     assert owner.x == 10
     assert owner.y == 20
-    assert h1.x == 10
-    assert h1.y == 20
+    assert h1.rect.center == (10, 20)
 
     # update hitbox offset; this should be reflected in relative position
     h1.x_offset = 5
     h1.y_offset = 10
-    assert h1.x == 15
-    assert h1.y == 30
+    assert h1.rect.center == (15, 30)
 
 
-@patch("src.hitboxes.Hitbox.handle_hit")
+@patch("src.hitboxes.ActiveHitbox.handle_hit")
 def test_handle_hits(mock):
     entity = MockPhysicalEntity()
     entity.rect = Rect(0, 0, 10, 10)
@@ -150,16 +145,61 @@ def test_handle_hits(mock):
     owner.rect = Rect(0, 0, 0, 0)
     hit_handler = HitHandler()
 
-    h1 = Hitbox(width=10, height=10, owner=owner)
-    hitboxes = Group(h1)
+    h1 = ActiveHitbox(Hitbox(width=10, height=10), owner=owner)
+    hitboxes = [h1]
 
-    collisions = pygame.sprite.spritecollide(entity, hitboxes, dokill=False)
-    assert len(collisions) == 1
+    assert h1.rect.colliderect(entity.rect)
     hit_handler.handle_hits(hitboxes, [entity])
     mock.assert_called_with(entity)
     assert mock.call_count == 1
 
 
+@patch("src.hitboxes.ActiveHitbox.handle_hit")
+def test_handle_hits_rotated_hitbox(mock):
+    """Rotated hitboxes hit what their shape covers, not everything in their bounding rect"""
+    owner = PhysicalEntity()
+    owner.rect = Rect(0, 0, 0, 0)
+    # a long thin hitbox pointing up and to the right
+    hitbox = ActiveHitbox(Hitbox(width=100, height=10, rotation=45), owner=owner)
+    in_corner = MockPhysicalEntity()
+    in_corner.rect = Rect(-35, -35, 10, 10)  # top left: inside the bounding rect only
+    on_diagonal = MockPhysicalEntity()
+    on_diagonal.rect = Rect(25, -35, 10, 10)  # top right
+    assert hitbox.rect.colliderect(in_corner.rect)
+
+    HitHandler().handle_hits([hitbox], [in_corner, on_diagonal])
+    mock.assert_called_once_with(on_diagonal)
+
+
+@pytest.mark.parametrize("swept", [False, True])
+@patch("src.hitboxes.ActiveHitbox.handle_hit")
+def test_handle_hits_swept_hitbox(mock, swept):
+    """Swept hitboxes can't skip past a target between ticks"""
+    target = MockPhysicalEntity()
+    target.rect = Rect(45, -5, 10, 10)
+    owner = PhysicalEntity()
+    owner.rect = Rect(0, 0, 0, 0)
+    hitbox = ActiveHitbox(Hitbox(width=20, height=20, swept=swept), owner=owner)
+    handler = HitHandler()
+    handler.handle_hits([hitbox], [target])
+    snapshot = handler.snapshot()
+    owner.x = 100  # straight past the target
+    handler.handle_hits([hitbox], [target])
+    assert mock.called == swept
+
+    # rolling back restores where the hitbox was, so replaying the tick does the same
+    mock.reset_mock()
+    handler.restore(snapshot)
+    handler.handle_hits([hitbox], [target])
+    assert mock.called == swept
+    # a hitbox isn't swept from where it was before it went away
+    mock.reset_mock()
+    handler.handle_hits([], [target])
+    owner.x = 0
+    handler.handle_hits([hitbox], [target])
+    assert not mock.called
+
+
 @pytest.mark.parametrize(
     "hitbox_names",
     [
@@ -172,7 +212,7 @@ def test_handle_hits(mock):
         ("h1", "h2", "h3"),
     ],
 )
-@patch("src.hitboxes.Hitbox.handle_hit")
+@patch("src.hitboxes.ActiveHitbox.handle_hit")
 def test_handle_hits_sibling_hitboxes_simultaneous(mock, hitbox_names):
     entity = MockPhysicalEntity()
     entity.rect = Rect(0, 0, 10, 10)
@@ -182,16 +222,15 @@ def test_handle_hits_sibling_hitboxes_simultaneous(mock, hitbox_names):
     owner = PhysicalEntity()
     owner.rect = Rect(0, 0, 0, 0)
 
-    h1 = Hitbox(width=10, height=10, owner=owner, damage=1)
-    h2 = Hitbox(width=10, height=10, owner=owner, higher_priority_sibling=h1, damage=3)
-    h3 = Hitbox(width=10, height=10, owner=owner, higher_priority_sibling=h2, damage=7)
+    h1 = Hitbox(width=10, height=10, damage=1)
+    h2 = Hitbox(width=10, height=10, higher_priority_sibling=h1, damage=3)
+    h3 = Hitbox(width=10, height=10, higher_priority_sibling=h2, damage=7)
+    h1, h2, h3 = (ActiveHitbox(hitbox, owner=owner) for hitbox in (h1, h2, h3))
     _hitbox_lookup = {"h1": h1, "h2": h2, "h3": h3}
-    hitboxes = Group([_hitbox_lookup[name] for name in hitbox_names])
+    hitboxes = [_hitbox_lookup[name] for name in hitbox_names]
 
     hit_handler = HitHandler()
-    collisions = pygame.sprite.spritecollide(entity, hitboxes, dokill=False)
-
-    assert len(collisions) == len(hitboxes)
+    assert all(hitbox.rect.colliderect(entity.rect) for hitbox in hitboxes)
     hit_handler.handle_hits(hitboxes, [entity])
     # h1, the higher priority hitbox, should always take priority
     assert entity.damage == 1
@@ -202,7 +241,7 @@ def test_handle_hits_sibling_hitboxes_simultaneous(mock, hitbox_names):
     assert (h3, entity) in hit_handler.handled
 
 
-@patch("src.hitboxes.Hitbox.handle_hit")
+@patch("src.hitboxes.ActiveHitbox.handle_hit")
 def test_handle_hits_sibling_hitboxes_later(mock):
     entity = MockPhysicalEntity()
     entity.rect = Rect(0, 0, 10, 10)
@@ -213,14 +252,13 @@ def test_handle_hits_sibling_hitboxes_later(mock):
     hit_handler = HitHandler()
 
     # h1 and h2 are related; h3 is standalone
-    h1 = Hitbox(width=10, height=10, owner=owner)
-    h2 = Hitbox(width=10, height=10, owner=owner, lower_priority_sibling=h1)
-    h3 = Hitbox(width=10, height=10, owner=owner)
+    h1 = Hitbox(width=10, height=10)
+    h2 = Hitbox(width=10, height=10, lower_priority_sibling=h1)
+    h3 = Hitbox(width=10, height=10)
+    h1, h2, h3 = (ActiveHitbox(hitbox, owner=owner) for hitbox in (h1, h2, h3))
 
     # the first hitbox collides with the target
-    hitboxes = Group(h1)
-    collisions = pygame.sprite.spritecollide(entity, hitboxes, dokill=False)
-    assert len(collisions) == 1
+    hitboxes = [h1]
     hit_handler.handle_hits(hitboxes, [entity])
     mock.assert_called_with(entity)
     assert mock.call_count == 1
@@ -230,16 +268,12 @@ def test_handle_hits_sibling_hitboxes_later(mock):
 
     # the next tick, another hitbox collides with the target. It is linked to h1 so should be
     # ignored.
-    hitboxes = Group(h1, h2)
-    collisions = pygame.sprite.spritecollide(entity, hitboxes, dokill=False)
-    assert len(collisions) == 2
+    hitboxes = [h1, h2]
     hit_handler.handle_hits(hitboxes, [entity])
     assert mock.call_count == 1
 
     # the next tick, hitbox 3 is added. It has no siblings so it should connect
-    hitboxes.add(h3)
-    collisions = pygame.sprite.spritecollide(entity, hitboxes, dokill=False)
-    assert len(collisions) == 3
+    hitboxes.append(h3)
     hit_handler.handle_hits(hitboxes, [entity])
     assert mock.call_count == 2
     assert (h1, entity) in hit_handler.handled
@@ -250,7 +284,6 @@ def test_handle_hits_sibling_hitboxes_later(mock):
 def test_handle_hitbox_collision_fixed_knockback():
 
     hitbox = Hitbox(
-        owner=MagicMock(),
         width=1,
         height=1,
         fixed_knockback=10,
@@ -301,7 +334,6 @@ def test_handle_hitbox_collision_fixed_knockback():
 def test_handle_hitbox_collision_base_knockback():
 
     hitbox = Hitbox(
-        owner=MagicMock(),
         width=1,
         height=1,
         base_knockback=10,
@@ -353,7 +385,6 @@ def test_handle_hitbox_collision_base_knockback():
 def test_handle_hitbox_collision_knockback_growth():
 
     hitbox = Hitbox(
-        owner=MagicMock(),
         width=1,
         height=1,
         knockback_growth=100,
@@ -399,3 +430,266 @@ def test_handle_hitbox_collision_knockback_growth():
     assert abs(second_bowser_kb) < abs(second_dk_kb)
     assert abs(first_dk_kb) < abs(second_dk_kb)
     assert abs(first_bowser_kb) < abs(second_bowser_kb)
+
+
+def test_hit_registry_release():
+    owner = MockPhysicalEntity()
+    owner.rect = Rect(0, 0, 0, 0)
+    target1 = MockPhysicalEntity()
+    target2 = MockPhysicalEntity()
+    h1 = ActiveHitbox(Hitbox(width=10, height=10), owner=owner)
+    h2 = ActiveHitbox(Hitbox(width=10, height=10), owner=owner)
+    registry = HitRegistry()
+
+    registry.add(h1, target1)
+    registry.add(h1, target2)
+    registry.add(h2, target1)
+    registry.add(h2, target1)  # adding twice does nothing
+    assert len(registry) == 3
+    assert (h1, target1) in registry
+    assert (h2, target2) not in registry
+
+    # retiring a hitbox forgets everything it hit
+    registry.release_hitboxes(h1)
+    assert len(registry) == 1
+    assert (h1, target1) not in registry
+    assert (h2, target1) in registry
+
+    # releasing a target forgets the hits it received
+    registry.add(h1, target2)
+    registry.release(target1)
+    assert len(registry) == 1
+    assert (h1, target2) in registry
+
+    # releasing an owner forgets all the hits of its hitboxes
+    registry.add(h2, target1)
+    registry.release(owner)
+    assert len(registry) == 0
+    assert not registry.targets
+    assert not registry.groups
+
+
+def test_hit_registry_release_dead():
+    owner = MockPhysicalEntity()
+    owner.rect = Rect(0, 0, 0, 0)
+    target = MockPhysicalEntity()
+    group = Group(owner, target)
+    h1 = ActiveHitbox(Hitbox(width=10, height=10), owner=owner)
+    registry = HitRegistry()
+    registry.add(h1, target)
+
+    registry.release_dead()
+    assert (h1, target) in registry
+
+    owner.kill()
+    registry.release_dead()
+    assert len(registry) == 0
+    assert not registry.groups
+    assert target in group
+
+
+def test_hit_registry_expiry():
+    owner = MockPhysicalEntity()
+    owner.rect = Rect(0, 0, 0, 0)
+    target = MockPhysicalEntity()
+    h1 = ActiveHitbox(Hitbox(width=10, height=10), owner=owner)
+    h2 = ActiveHitbox(Hitbox(width=10, height=10), owner=owner)
+    registry = HitRegistry()
+    registry.expiry = 10
+
+    registry.add(h1, target)
+    for _ in range(5):
+        registry.advance()
+    registry.add(h2, target)
+    for _ in range(6):
+        registry.advance()
+    assert (h1, target) not in registry
+    assert (h2, target) in registry
+    for _ in range(5):
+        registry.advance()
+    assert len(registry) == 0
+
+
+def test_hit_registry_does_not_evict_on_busy_frames():
+    owner = MockPhysicalEntity()
+    owner.rect = Rect(0, 0, 0, 0)
+    hitbox = ActiveHitbox(Hitbox(width=10, height=10), owner=owner)
+    targets = [MockPhysicalEntity() for _ in range(500)]
+    registry = HitRegistry()
+    for target in targets:
+        registry.add(hitbox, target)
+    assert all((hitbox, target) in registry for target in targets)
+
+
+def test_priority_group():
+    kwargs = dict(width=10, height=10, rotation=0)
+    h1 = Hitbox(**kwargs)
+    h2 = Hitbox(**kwargs, higher_priority_sibling=h1)
+    h3 = Hitbox(**kwargs, higher_priority_sibling=h2)
+    loner = Hitbox(**kwargs)
+
+    assert h1.priority_group is h2.priority_group is h3.priority_group
+    assert h1.priority_group.members == (h1, h2, h3)
+    assert (h1.priority, h2.priority, h3.priority) == (0, 1, 2)
+    assert loner.priority_group.members == (loner,)
+    assert loner.priority == 0
+
+    # a copy is a separate hitbox, and mustn't change the original's group
+    h2_copy = copy(h2)
+    assert h2_copy.priority_group is not h2.priority_group
+    assert h2_copy.priority_group.members == (h1, h2_copy, h3)
+    assert h2_copy.priority == 1
+    assert h1.priority_group.members == (h1, h2, h3)
+
+
+@patch("src.hitboxes.ActiveHitbox.handle_hit")
+def test_handle_hits_copied_hitbox(mock):
+    entity = MockPhysicalEntity()
+    entity.rect = Rect(0, 0, 10, 10)
+    owner = PhysicalEntity()
+    owner.rect = Rect(0, 0, 0, 0)
+    hit_handler = HitHandler()
+
+    h1 = Hitbox(width=10, height=10, damage=1)
+    h1_copy = copy(h1)
+    hit_handler.handle_hits([ActiveHitbox(h1, owner)], [entity])
+    hit_handler.handle_hits([ActiveHitbox(h1_copy, owner)], [entity])
+    assert entity.damage == 2
+    assert mock.call_count == 2
+
+
+def test_mirrored():
+    h1 = Hitbox(width=10, height=10, x_offset=5, rotation=30, knockback_angle=45)
+    h2 = Hitbox(width=10, height=10, higher_priority_sibling=h1)
+    h2_copy = copy(h2)
+
+    # mirroring one hitbox mirrors its whole group, once
+    m2 = h2_copy.mirrored
+    m1 = h1.mirrored
+    assert h1.mirrored is m1
+    assert m1.mirrored is h1
+    assert (m1.x_offset, m1.rotation, m1.knockback_angle) == (-5, 150, 135)
+    assert (h1.x_offset, h1.rotation, h1.knockback_angle) == (5, 30, 45)
+    assert m1.lower_priority_sibling is h2.mirrored
+    assert m1.priority_group.members == (m1, h2.mirrored)
+    assert m2.priority_group.members == (m1, m2)
+    assert h1.priority_group.members == (h1, h2)
+
+
+def test_active_hitboxes_share_hitbox():
+    owner1 = PhysicalEntity()
+    owner1.rect = Rect(0, 0, 0, 0)
+    owner2 = PhysicalEntity()
+    owner2.rect = Rect(100, 100, 0, 0)
+    hitbox = Hitbox(width=10, height=10, x_offset=5, damage=3)
+    a1 = ActiveHitbox(hitbox, owner1)
+    a2 = ActiveHitbox(hitbox, owner2, x_offset=-5)
+    assert a1.rect.center == (5, 0)
+    assert a2.rect.center == (95, 100)
+    assert a1.damage == a2.damage == 3
+    assert a1.priority_group is a2.priority_group
+    with pytest.raises(AttributeError):
+        a1.damage = 4  # only the hitbox has that
+
+    # but they are tracked separately, per owner
+    target = MockPhysicalEntity()
+    registry = HitRegistry()
+    registry.add(a1, target)
+    assert (a1, target) in registry
+    assert (a2, target) not in registry
+
+
+@patch("src.hitboxes.ActiveHitbox.handle_hit")
+def test_move_frame_tables(mock):
+    level = Level(seed=0)
+    hawko = Hawko(x=100, y=100, facing_right=False)
+    other_hawko = Hawko(x=500, y=100)
+    level.add_character(hawko, other_hawko)
+
+    # compiled once per character class and facing, and mirrored for facing left
+    left = Hawko.ForwardTilt.compile(Hawko, facing_right=False)
+    right = Hawko.ForwardTilt.compile(Hawko, facing_right=True)
+    assert Hawko.ForwardTilt.compile(Hawko, facing_right=False) is left
+    (sweet_spot_left, _), (sweet_spot_right, _) = table_hitboxes(left), table_hitboxes(right)
+    assert sweet_spot_left is sweet_spot_right.mirrored
+    assert left[1].image is Hawko.sprites["ftilt_left"].images[1]
+
+    # each character binds the table once, and reuses it every time it does the move
+    hawko.do_move(Hawko.ForwardTilt)
+    move = hawko.state
+    assert all(hitbox.owner is hawko for hitbox in move.hitboxes)
+    assert move.hitboxes[0].hitbox is sweet_spot_left
+    hawko.state = hawko.state_stand
+    hawko.do_move(Hawko.ForwardTilt)
+    assert hawko.state is move
+    other_hawko.do_move(Hawko.ForwardTilt)
+    assert other_hawko.state is not move
+
+    # but every activation can hit the same target again
+    target = MockPhysicalEntity()
+    target.rect = Rect(hawko.rect)
+    handler = level.hit_handler
+    handler.handle_hits([move.hitboxes[0]], [target])
+    assert (move.hitboxes[0], target) in handler.handled
+    hawko.do_move(Hawko.ForwardTilt)
+    assert (move.hitboxes[0], target) not in handler.handled
+
+
+def test_debug_images_are_lazy_and_shared():
+    from src import hitboxes
+
+    shape = dict(width=17, height=23, rotation=12)
+    h1 = Hitbox(**shape)
+    h2 = Hitbox(**shape, damage=5)
+    mirrored = h1.mirrored
+    # nothing is drawn until a hitbox is drawn in debug mode
+    assert not [key for key in hitboxes._debug_images if key[:2] == (17, 23)]
+
+    owner = PhysicalEntity()
+    owner.rect = Rect(20, 20, 0, 0)
+    surface = pygame.Surface((50, 50))
+    ActiveHitbox(h1, owner).draw(surface, debug=False)
+    assert not [key for key in hitboxes._debug_images if key[:2] == (17, 23)]
+    ActiveHitbox(h1, owner).draw(surface, debug=True)
+    assert h1.image is h2.image
+    assert mirrored.image is not h1.image
+    assert mirrored.image is Hitbox(width=17, height=23, rotation=168).image
+
+
+@pytest.mark.parametrize("swept", [False, True])
+def test_swing_is_swept_across_frames(monkeypatch, swept):
+    """A swept swing covers the way from one frame's hitbox to the next frame's sibling"""
+    level = Level(seed=0)
+    hawko = Hawko(x=100, y=100)
+    level.add_character(hawko)
+    hawko.do_move(Hawko.UpTilt)
+    move = hawko.state
+    (low,), (high,) = (frame.hitboxes for frame in move.frame_mapping[1:3])
+    assert low.priority_group is high.priority_group
+    for hitbox in (low, high):
+        assert hitbox.swept
+        monkeypatch.setattr(hitbox.hitbox, "swept", swept)
+    # halfway between where `low` was and where `high` is, out of reach of either
+    target = MockPhysicalEntity()
+    target.rect = Rect(185, 90, 10, 10)
+
+    handler = level.hit_handler
+    handler.handle_hits(move.frame_mapping[1].hitboxes, [target])
+    assert not target.damage
+    hawko.x += 200
+    with patch("src.hitboxes.ActiveHitbox.handle_hit"):
+        handler.handle_hits(move.frame_mapping[2].hitboxes, [target])
+    assert target.damage == (high.damage if swept else 0)
+
+
+@pytest.mark.parametrize("facing_right", [True, False])
+@patch("src.hitboxes.ActiveHitbox.handle_hit")
+def test_each_laser_segment_hits(mock, facing_right):
+    """A laser's segments are separate attacks, so a target they all overlap is hit by each"""
+    owner = MockPhysicalEntity()
+    owner.rect = Rect(0, 0, 10, 10)
+    laser = HawkoLaser(x=500, y=500, facing_right=facing_right, owner=owner)
+    target = MockPhysicalEntity()
+    target.rect = Rect(laser.rect)
+    HitHandler().handle_hits(laser.active_hitboxes, [target])
+    assert target.damage == 3 * 3
@@ -0,0 +1,87 @@
+import pytest
+
+from src.benchmarks import SCENARIOS
+from src.inputs import ScriptedInput
+from src.integrator import BatchIntegrator
+from src.projectiles.hawko_laser import HawkoLaser
+
+
+class Grenade(HawkoLaser):
+    """A laser that arcs downwards and slows down"""
+
+    gravity = 0.7
+    air_resistance = 0.15
+    fall_speed = 12
+
+
+def grenade_storm(seed: int, batched: bool):
+    simulation, lasers = SCENARIOS["projectile_storm"](seed)
+    if batched:
+        simulation.level.integrator = BatchIntegrator()
+
+    def every_tick(simulation):
+        lasers(simulation)
+        if simulation.tick % 7 == 0:
+            owner = simulation.players[1].character
+            grenade = Grenade(x=1700, y=150, facing_right=False, owner=owner)
+            grenade.v = -3.5
+            simulation.level.add_projectile(grenade)
+
+    return simulation, every_tick
+
+
+def run(simulation, every_tick, ticks):
+    for _ in range(ticks):
+        every_tick(simulation)
+        simulation.step()
+
+
+@pytest.mark.parametrize("seed", [0])
+def test_batch_integrator_matches_one_at_a_time(seed):
+    simulations = [grenade_storm(seed, batched) for batched in (False, True)]
+    for simulation, _ in simulations:
+        simulation.record_hashes = True
+    plain, batched = (simulation for simulation, _ in simulations)
+    # run until there are plenty of projectiles, with a grenade in flight among them
+    for _ in range(1000):
+        for simulation, every_tick in simulations:
+            run(simulation, every_tick, 1)
+        projectiles = batched.level.projectiles
+        if len(projectiles) > 100 and any(isinstance(p, Grenade) for p in projectiles):
+            break
+    assert len(batched.level.projectiles) > 100
+    assert any(isinstance(projectile, Grenade) for projectile in batched.level.projectiles)
+    assert batched.hashes == plain.hashes
+    assert [
+        (projectile.rect.center, projectile.u, projectile.v)
+        for projectile in batched.level.projectiles
+    ] == [
+        (projectile.rect.center, pytest.approx(projectile.u), pytest.approx(projectile.v))
+        for projectile in plain.level.projectiles
+    ]
+
+
+def test_batch_integrator_after_restore():
+    simulation, every_tick = grenade_storm(2, batched=True)
+    simulation.record_hashes = True
+    # the random bots' own RNGs aren't part of the snapshot, so keep the characters still
+    for player in simulation.players:
+        player.input = player.character.input = ScriptedInput()
+    run(simulation, every_tick, 200)
+    snapshot = simulation.snapshot()
+    run(simulation, every_tick, 20)
+    expected = simulation.hashes[200:]
+
+    simulation.restore(snapshot)
+    run(simulation, every_tick, 20)
+    assert simulation.hashes[200:] == expected
+
+
+def test_batch_integrator_picks_up_changed_velocities():
+    simulation, every_tick = grenade_storm(0, batched=True)
+    run(simulation, every_tick, 30)
+    projectile = next(iter(simulation.level.projectiles))
+    projectile.u = -projectile.u  # e.g. reflected; nothing tells the integrator
+    x = projectile.rect.centerx
+    simulation.step()
+    assert projectile.rect.centerx == round(x + projectile.u)
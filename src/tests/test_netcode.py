@@ -0,0 +1,105 @@
+import pytest
+
+from src.inputs import NEUTRAL, RandomInput, pack_input, quantize_input, unpack_input
+from src.netcode import RollbackSession, loopback_pair, netplay_match
+from src.scenes import NetplayMatch
+from src.sounds import Sound
+
+
+def test_pack_input():
+    bot = RandomInput(seed=1)
+    for _ in range(100):
+        values = quantize_input(bot.get_new_values())
+        assert unpack_input(pack_input(values)) == values
+    assert unpack_input(pack_input(NEUTRAL)) == NEUTRAL
+
+
+@pytest.mark.parametrize("latency, packet_loss", [(0, 0), (0.1, 0.2)])
+def test_rollback_peers_agree(latency, packet_loss):
+    ticks = [0]
+    transports = loopback_pair(
+        latency=latency, packet_loss=packet_loss, seed=2, clock=lambda: ticks[0] / 60
+    )
+    sessions = []
+    bots = []
+    for player, transport in enumerate(transports):
+        simulation = netplay_match(seed=2, record_hashes=True)
+        sessions.append(RollbackSession(simulation, player, transport))
+        bots.append(RandomInput(seed=20 + player))
+
+    local_values = [bot.get_new_values() for bot in bots]
+    for ticks[0] in range(600):
+        for player, (session, bot) in enumerate(zip(sessions, bots)):
+            if session.advance(local_values[player]):
+                local_values[player] = bot.get_new_values()
+    for transport in transports:
+        transport.close()
+
+    first, second = sessions
+    if latency:
+        assert first.rollbacks and second.rollbacks
+        assert max(first.tick, second.tick) - min(first.tick, second.tick) <= first.max_rollback
+    # ticks simulated with every input confirmed must be identical on both machines
+    confirmed = min(first.confirmed_tick, second.confirmed_tick) + 1
+    for session in sessions:
+        if session.rollback_tick is not None:
+            confirmed = min(confirmed, session.rollback_tick)
+    assert confirmed > 400
+    assert first.simulation.hashes[:confirmed] == second.simulation.hashes[:confirmed]
+
+
+def test_rollback_resimulates_identically():
+    """Rewinding max_rollback ticks and re-simulating them with the same inputs must land on
+    exactly the same states. How long that takes is measured by the "rollback" benchmark."""
+    simulation = netplay_match(seed=4, record_hashes=True)
+    bots = [RandomInput(seed=40), RandomInput(seed=41)]
+    inputs = [[bot.get_new_values() for bot in bots] for _ in range(300)]
+
+    def simulate(tick):
+        for player, values in zip(simulation.players, inputs[tick]):
+            player.input.set_values(values)
+        simulation.step()
+
+    snapshots = []
+    for tick in range(300):
+        snapshots.append(simulation.snapshot())
+        simulate(tick)
+    hashes = list(simulation.hashes)
+
+    depth = RollbackSession.max_rollback
+    # latest first, because restoring forgets the hashes of the later ticks
+    for end_tick in range(300, depth, -37):
+        simulation.restore(snapshots[end_tick - depth])
+        assert len(simulation.hashes) == end_tick - depth
+        for tick in range(end_tick - depth, end_tick):
+            simulate(tick)
+        assert simulation.tick == end_tick
+        assert simulation.hashes == hashes[:end_tick]
+
+
+def test_netplay_scenes_agree():
+    """Two copies of the game's netplay scene, driven like the game loop drives them"""
+    muted = Sound.muted
+    scenes = []
+    bots = []
+    for player, transport in enumerate(loopback_pair()):
+        bot = RandomInput(seed=30 + player)
+        scenes.append(NetplayMatch(transport, local_player=player, seed=3, input=bot))
+        bots.append(bot)
+    assert Sound.muted == muted
+    for scene in scenes:
+        scene.session.simulation.record_hashes = True
+    for _ in range(300):
+        for scene, bot in zip(scenes, bots):
+            bot.read_new_inputs()
+            scene.update()
+    for scene in scenes:
+        scene.kill()
+
+    first, second = (scene.session for scene in scenes)
+    confirmed = min(first.confirmed_tick, second.confirmed_tick) + 1
+    for session in (first, second):
+        if session.rollback_tick is not None:
+            confirmed = min(confirmed, session.rollback_tick)
+    assert confirmed > 250
+    assert first.simulation.hashes[:confirmed] == second.simulation.hashes[:confirmed]
@@ -1,6 +1,11 @@
+import pytest
+from pygame.rect import Rect
 from pygame.sprite import Sprite
 
-from src.platforms import Platform
+from src.characters import Hawko
+from src.inputs import NEUTRAL, ScriptedInput
+from src.levels import BlastZone, Level
+from src.platforms import MovingPlatform, Platform
 
 
 def test_platform_properties():
@@ -20,3 +25,198 @@ def test_platform_properties():
 
     assert plat.rect.width == 30
     assert plat.rect.height == 40
+
+
+def test_character_contact():
+    level = Level(seed=0)
+    floor = Platform(x=500, y=600, width=400, height=100)
+    wall = Platform(x=750, y=400, width=100, height=300)
+    level.add_platform(floor, wall)
+    hawko = Hawko(500, 0, input=None)
+    level.add_character(hawko)
+
+    hawko.rect.bottom = floor.rect.top
+    hawko.rect.centerx = 400
+    assert not hawko.airborne
+    assert hawko.contact.floors == [floor]
+    assert hawko.contact.walls == []
+    contact = hawko.contact
+    assert hawko.contact is contact  # cached while nothing moves
+
+    hawko.v = -5  # jumping through the platform
+    assert hawko.airborne
+    hawko.v = 0
+
+    hawko.rect.right = wall.rect.left
+    assert hawko.contact.floors == [floor]
+    assert hawko.contact.walls == [wall]
+
+    hawko.rect.bottom -= 10
+    assert hawko.airborne
+    assert hawko.contact.walls == [wall]
+
+    # the cache notices new platforms
+    ledge = Platform(x=hawko.rect.centerx, y=0, width=50, height=40)
+    ledge.rect.top = hawko.rect.bottom
+    level.add_platform(ledge)
+    assert hawko.contact.floors == [ledge]
+
+
+@pytest.fixture
+def level():
+    return Level(seed=0)
+
+
+@pytest.fixture
+def hawko(level):
+    """Hawko falling in an empty level, with an input that the test can set"""
+    input = ScriptedInput()
+    input.read_new_inputs()
+    hawko = Hawko(0, 0, input=input)
+    level.add_character(hawko)
+    hawko.state = hawko.state_fall
+    return hawko
+
+
+def test_fast_fall_does_not_tunnel_through_thin_platform(level, hawko):
+    platform = Platform(x=500, y=500, width=400, height=20, droppable=True)
+    level.add_platform(platform)
+    hawko.rect.centerx = 500
+    hawko.rect.bottom = platform.rect.top - 30
+    hawko.v = 200  # far enough to end up below the platform in one step
+    hawko.fall_physics()
+    assert hawko.rect.bottom == platform.rect.top
+    assert hawko.v == 0
+    assert hawko.state == hawko.state_stand
+
+
+def test_discrete_fall_tunnels_through_thin_platform(level, hawko):
+    """The old discrete step goes straight through"""
+    platform = Platform(x=500, y=500, width=400, height=20, droppable=True)
+    level.add_platform(platform)
+    hawko.swept_collision = False
+    hawko.rect.centerx = 500
+    hawko.rect.bottom = platform.rect.top - 30
+    hawko.v = 200
+    hawko.fall_physics()
+    assert hawko.rect.top > platform.rect.bottom
+
+
+def test_fast_fall_drops_through_droppable_platform_while_holding_down(level, hawko):
+    platform = Platform(x=500, y=500, width=400, height=20, droppable=True)
+    level.add_platform(platform)
+    values = list(NEUTRAL)
+    values[hawko.input.DOWN.id] = 1
+    hawko.input.set_values(values)
+    hawko.input.read_new_inputs()
+    hawko.rect.centerx = 500
+    hawko.rect.bottom = platform.rect.top - 30
+    hawko.v = 200
+    hawko.fall_physics()
+    # the sweep doesn't stop it, and nor does the platform
+    assert hawko.rect.bottom == platform.rect.top - 30 + 200
+    assert hawko.state == hawko.state_fall
+
+
+def test_fast_horizontal_move_does_not_tunnel_through_wall(level, hawko):
+    wall = Platform(x=500, y=500, width=10, height=400)
+    level.add_platform(wall)
+    hawko.rect.centery = 500
+    hawko.rect.right = wall.rect.left - 5
+    hawko.u = 100
+    hawko.fall_physics()
+    assert hawko.rect.right == wall.rect.left
+    assert hawko.u == 0
+
+
+def test_moving_up_passes_through_droppable_platform(level, hawko):
+    platform = Platform(x=500, y=500, width=400, height=20, droppable=True)
+    level.add_platform(platform)
+    hawko.rect.centerx = 500
+    hawko.rect.top = platform.rect.bottom + 5
+    hawko.v = -200
+    hawko.fall_physics()
+    assert hawko.rect.bottom < platform.rect.top
+
+
+def test_moving_platform_carries_standing_character(level, hawko):
+    level.blast_zone = BlastZone(500, 500, 5000, 5000)
+    # drops 300 pixels in 10 ticks, much faster than hawko can fall, then comes back up
+    lift = MovingPlatform(500, 500, 200, 20, path=[(600, 800, 10), (500, 500, 10)])
+    level.add_platform(lift)
+    hawko.rect.centerx = 500
+    hawko.rect.bottom = lift.rect.top
+    hawko.state = hawko.state_stand
+
+    for _ in range(40):
+        level.update()
+        assert hawko.rect.bottom == lift.rect.top
+        assert hawko.state == hawko.state_stand
+    assert lift.rect.center == (500, 500)
+    assert hawko.rect.centerx == 500
+
+    # the platform's new position is used for collisions
+    assert level.colliding_platforms(lift.rect) == [lift]
+    assert level.colliding_platforms(Rect(lift.rect).move(100, 300)) == []
+
+
+def test_moving_platform_restore(level, hawko):
+    level.blast_zone = BlastZone(500, 500, 5000, 5000)
+    lift = MovingPlatform(500, 500, 200, 20, path=[(500, 300, 30), (500, 500, 30)])
+    level.add_platform(lift)
+    hawko.rect.midbottom = lift.rect.midtop
+    hawko.state = hawko.state_stand
+    snapshot = level.snapshot()
+    for _ in range(15):
+        level.update()
+    assert lift.rect.centery == 400
+
+    level.restore(snapshot)
+    assert lift.rect.centery == 500
+    assert hawko.rect.bottom == lift.rect.top
+    assert level.colliding_platforms(Rect(450, 490, 10, 10)) == [lift]
+
+
+def test_moving_platform_only_forgets_nearby_contacts(level, hawko):
+    ground = Platform(x=500, y=500, width=400, height=20)
+    level.add_platform(ground)
+    hawko.rect.midbottom = ground.rect.midtop
+    bystander = Hawko(0, 0, input=hawko.input)
+    level.add_character(bystander)
+    bystander.rect.midbottom = (2000, 0)  # far away, in the air
+    lift = MovingPlatform(1000, 500, 200, 20, path=[(1000, 300, 10), (1000, 500, 10)])
+    level.add_platform(lift)
+    contact, far_contact = hawko.contact, bystander.contact
+
+    lift.move_to(1200, 500)
+    assert hawko.contact is contact
+    assert bystander.contact is far_contact
+    # moving next to the character changes its contacts
+    lift.move_to(hawko.rect.right + 100, hawko.rect.centery)
+    assert bystander.contact is far_contact
+    assert hawko.contact is not contact
+    assert hawko.contact.walls == [lift]
+
+
+def test_moving_platform_does_not_carry_character_into_wall(level, hawko):
+    wall = Platform(x=800, y=200, width=100, height=400)
+    level.add_platform(wall)
+    lift = MovingPlatform(650, 500, 200, 20, path=[(850, 500, 20), (650, 500, 20)])
+    level.add_platform(lift)
+    hawko.rect.midbottom = lift.rect.midtop
+    hawko.rect.right = wall.rect.left - 5
+
+    lift.move_to(lift.rect.centerx + 20, lift.rect.centery)
+    assert hawko.rect.right == wall.rect.left
+    assert hawko.rect.bottom == lift.rect.top
+
+
+def test_rising_platform_pushes_character_up(level, hawko):
+    lift = MovingPlatform(500, 500, 200, 20, path=[(500, 300, 10), (500, 500, 10)])
+    level.add_platform(lift)
+    hawko.rect.midbottom = (500, lift.rect.top - 5)  # in the air, not riding it
+    assert lift not in hawko.contact.floors
+
+    lift.move_to(500, 480)
+    assert hawko.rect.bottom == lift.rect.top
+    assert hawko.contact.floors == [lift]
@@ -0,0 +1,60 @@
+import json
+
+import pygame
+from pygame import Surface
+from robingame.objects import Group
+
+from src.characters import Character
+from src.hitboxes import HitHandler
+from src.levels import Level
+from src.profiling import Profiler
+from src.simulation import bot_match
+
+
+def class_attributes():
+    return {cls: dict(vars(cls)) for cls in (Level, HitHandler, Character, Group)}
+
+
+def test_profiler(tmp_path):
+    before = class_attributes()
+    simulation = bot_match(seed=7)
+    surface = Surface((200, 200))
+    profiler = Profiler()
+    profiler.enable()
+    try:
+        for _ in range(30):
+            simulation.step()
+            simulation.level.draw(surface)
+            profiler.end_frame()
+    finally:
+        profiler.disable()
+    assert class_attributes() == before
+
+    averages = profiler.averages()
+    for section in [
+        "Level.main",
+        "handle_hits",
+        "Hawko.state",
+        "MonkeyKing.state",
+        "physics",
+        "Level.draw",
+        "Battlefield.characters.update",
+        "Battlefield.characters.draw",
+    ]:
+        assert averages[section] > 0
+    assert list(averages.values()) == sorted(averages.values(), reverse=True)
+
+    profiler.export_chrome_trace(tmp_path / "trace.json")
+    with open(tmp_path / "trace.json") as file:
+        events = json.load(file)["traceEvents"]
+    assert {event["name"] for event in events} == set(averages)
+    assert all(event["dur"] >= 0 for event in events)
+
+    # nothing is recorded while disabled
+    count = len(profiler.events)
+    simulation.step()
+    profiler.end_frame()
+    assert len(profiler.events) == count
+
+    pygame.font.init()
+    profiler.draw(surface, pygame.font.Font(None, 20))
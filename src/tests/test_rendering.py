@@ -0,0 +1,33 @@
+import pygame
+from pygame import Surface
+
+from src.particles import Plume
+from src.platforms import MovingPlatform
+from src.rendering import DirtyRectRenderer
+from src.simulation import bot_match
+
+
+def test_dirty_rect_renderer_matches_full_redraw():
+    simulation = bot_match(seed=3)
+    level = simulation.level
+    level.add_platform(MovingPlatform(300, 300, 100, 20, path=[(500, 300, 40), (300, 300, 40)]))
+    renderer = DirtyRectRenderer()
+    screen = Surface((1800, 900))
+    expected = Surface((1800, 900))
+    for tick in range(150):
+        simulation.step()
+        if tick == 60:
+            level.add_particle_effect(Plume(900, 450, 90, rng=level.rng))
+        if tick == 100:
+            level.screen_shake = 3
+        shaking = level.screen_shake
+        rects = renderer.draw(level, screen)
+        if shaking:
+            assert rects == [screen.get_rect()]
+            continue  # the shake's offsets are random, so there's nothing to compare with
+        level.draw(expected)
+        assert pygame.image.tobytes(screen, "RGB") == pygame.image.tobytes(expected, "RGB")
+        if 0 < tick < 60:
+            # just the characters and the moving platform, where they were and where they are
+            assert len(rects) == 6
+            assert sum(rect.width * rect.height for rect in rects) < 1800 * 900 / 10
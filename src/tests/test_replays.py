@@ -0,0 +1,58 @@
+import pytest
+
+from src.replays import Replay, ReplayPlayer, ReplayRecorder, decode_inputs, encode_inputs
+from src.simulation import bot_match
+
+
+@pytest.fixture(scope="module")
+def recording():
+    recorder = ReplayRecorder(bot_match(seed=6, record_hashes=True))
+    recorder.run(1200)
+    return recorder
+
+
+def test_encode_inputs():
+    inputs = [b"a" * 12] * 3 + [b"b" * 12] + [b"a" * 12] * 70000
+    assert decode_inputs(encode_inputs(inputs)) == inputs
+    assert decode_inputs(encode_inputs([])) == []
+
+
+def test_replay_round_trip(recording):
+    replay = Replay.from_bytes(bytes(recording.replay))
+    assert replay.ticks == 1200
+    assert replay.level == "Battlefield"
+    assert replay.seed == 6
+    assert replay.inputs == recording.inputs
+    assert replay.checkpoints == recording.checkpoints
+    assert len(bytes(replay)) < 2000
+
+    with pytest.raises(ValueError):
+        Replay.from_bytes(b"nope" + bytes(replay)[4:])
+
+
+def test_replay_reproduces_match(recording):
+    player = ReplayPlayer(Replay.from_bytes(bytes(recording.replay)))
+    player.simulation.record_hashes = True
+    assert player.verify() is None
+    assert player.finished
+    assert player.simulation.hashes == recording.simulation.hashes
+
+
+def test_replay_seek(recording):
+    expected = recording.simulation.hashes
+    player = ReplayPlayer(recording.replay)
+    player.simulation.record_hashes = True
+    for tick in [1000, 350, 0, 700, 701, 1200, 5000]:
+        player.seek(tick)
+        assert player.tick == min(tick, 1200)
+        if player.tick:
+            assert player.simulation.level.state_hash() == expected[player.tick - 1]
+    # seeking backwards restores the nearest keyframe instead of starting over
+    assert set(player.keyframes) == {0, 300, 600, 900}
+
+
+def test_replay_detects_desync(recording):
+    replay = recording.replay
+    replay.checkpoints[900] = "0" * 32
+    # the checkpoints before the tampered one still match
+    assert ReplayPlayer(replay).verify() == 900
@@ -0,0 +1,142 @@
+import json
+
+import pygame
+import pytest
+from pygame import Color
+from pygame.rect import Rect
+
+from src import stages
+from src.levels import Battlefield
+from src.platforms import MovingPlatform
+
+
+@pytest.fixture
+def stage_file(tmp_path, monkeypatch):
+    """A copy of the towers stage, with an extra image layer"""
+    monkeypatch.setattr(stages, "_baked", {})
+    image = pygame.Surface((10, 10))
+    image.fill(Color("red"))
+    pygame.image.save(image, str(tmp_path / "red.png"))
+    data = json.loads((stages.STAGE_DIR / "towers.json").read_text())
+    data["background"].append({"image": "red.png", "x": 20, "y": 30})
+    path = tmp_path / "towers.json"
+    path.write_text(json.dumps(data))
+    return path
+
+
+def test_load_stage(stage_file, tmp_path):
+    stage = stages.load_stage(stage_file, cache_dir=tmp_path / "cache")
+    level = stage.level(seed=0)
+    assert stage.name == "Towers"
+    assert len(level.platforms) == 4
+    assert sum(isinstance(platform, MovingPlatform) for platform in level.platforms) == 2
+    assert level.blast_zone.rect == Rect(-200, -150, 2200, 1100)
+    assert level.spawn_points[0] == (450, 300, True)
+    assert len(level.ledges) == 4
+    [scenery] = level.background
+    assert scenery.image.get_at((25, 35)) == Color("red")
+    assert scenery.image.get_at((0, 0)) == Color(40, 44, 80)
+    assert scenery.image.get_at((200, 800)) == Color(90, 80, 130)
+
+    # the baked index gives the same answers as one built from the platforms
+    sprite = pygame.sprite.Sprite()
+    for x in range(0, 1800, 50):
+        for y in range(0, 900, 50):
+            sprite.rect = Rect(x, y, 50, 100)
+            expected = pygame.sprite.spritecollide(sprite, level.platforms, dokill=False)
+            assert level.colliding_platforms(sprite.rect) == expected
+
+
+def test_baked_stage_is_cached_on_disk(stage_file, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    stage = stages.load_stage(stage_file, cache_dir=cache_dir)
+    [cache_file] = cache_dir.iterdir()
+
+    def bake(*args):
+        raise AssertionError("should have used the cache")
+
+    monkeypatch.setattr(stages, "_baked", {})
+    monkeypatch.setattr(stages, "bake", bake)
+    cached = stages.load_stage(stage_file, cache_dir=cache_dir)
+    assert cached.data == stage.data
+    assert cached.platform_index == stage.platform_index
+    assert cached.background.get_at((25, 35)) == Color("red")
+
+    # editing the stage (or its images) bakes it again
+    monkeypatch.undo()
+    monkeypatch.setattr(stages, "_baked", {})
+    image = pygame.Surface((10, 10))
+    image.fill(Color("blue"))
+    pygame.image.save(image, str(stage_file.parent / "red.png"))
+    stage = stages.load_stage(stage_file, cache_dir=cache_dir)
+    assert stage.background.get_at((25, 35)) == Color("blue")
+    # the old bake is deleted
+    [new_cache_file] = cache_dir.iterdir()
+    assert new_cache_file != cache_file
+    # the background is compressed
+    assert new_cache_file.stat().st_size < 1800 * 900 * 3 / 10
+
+
+def test_default_cache_dir_is_redirected_in_tests(tmp_path):
+    assert stages.default_cache_dir() == tmp_path / "cache" / "stages"
+
+
+def test_battlefield_from_stage_file():
+    level = Battlefield(seed=0)
+    assert [(platform.rect, platform.droppable) for platform in level.platforms] == [
+        (Rect(500, 600, 800, 1000), False),
+        (Rect(650, 490, 100, 20), True),
+        (Rect(1050, 490, 100, 20), True),
+        (Rect(850, 390, 100, 20), True),
+    ]
+    assert level.blast_zone.rect == Rect(0, 0, 1800, 900)
+    assert not level.background
+
+
+def test_screen_shake(monkeypatch):
+    level = Battlefield(seed=0)
+    still = pygame.Surface((1800, 900))
+    level.draw(still)
+
+    level.screen_shake = 10
+    rng = level.shake_rng
+    dx, dy = rng.randrange(-10, 10), rng.randrange(-10, 10)
+    rng.seed(level.seed)  # so that the level shakes by the same amount
+    # shaking doesn't make a new screen-sized surface every frame
+    monkeypatch.setattr(pygame, "Surface", None)
+    monkeypatch.setattr("src.levels.Surface", None)
+    shaken = still.copy()
+    shaken.fill((0, 0, 0))
+    level.draw(shaken)
+    assert shaken.get_at((900 + dx, 600 + dy)) == still.get_at((900, 600))
+    assert shaken.get_at((900 + dx, 599 + dy)) == still.get_at((900, 599))
+    # the strips that the shake uncovers are cleared
+    for x, y in [(0, 0), (1799, 0), (0, 899), (1799, 899)]:
+        assert shaken.get_at((x, y)) == (150, 150, 150)
+
+
+def test_static_layer():
+    level = Battlefield(seed=0)
+    level.add_platform(MovingPlatform(300, 300, 100, 20, path=[(500, 300, 40), (300, 300, 40)]))
+    screen = pygame.Surface((1800, 900), depth=16)
+    level.draw(screen)
+    layer = level.static_layer(screen)
+    assert layer.get_bitsize() == 16  # same format as the screen, so blitting it is a copy
+    for _ in range(10):
+        level.update()
+        level.draw(screen)
+    assert level.static_layer(screen) is layer  # not rendered again until the stage changes
+
+    # the same picture as drawing everything, from scratch
+    expected = pygame.Surface((1800, 900), depth=16)
+    expected.fill((150, 150, 150))
+    for group in level.child_groups:
+        group.draw(expected)
+    assert pygame.image.tobytes(screen, "RGB") == pygame.image.tobytes(expected, "RGB")
+    # the moving platform isn't part of the layer
+    assert layer.get_at((300, 300)) == layer.unmap_rgb(layer.map_rgb((150, 150, 150)))
+
+    level.add_platform(MovingPlatform(0, 0, 10, 10, path=[(0, 0, 1)]))
+    assert level.static_layer(screen) is layer
+    level.platforms.sprites()[0].kill()
+    assert level.static_layer(screen) is not layer
@@ -0,0 +1,88 @@
+import pytest
+
+from src.characters import Hawko, MonkeyKing
+from src.hitboxes import Hitbox
+from src.inputs import ScriptedInput
+from src.levels import BlastZone, Level
+from src.trajectory import Trajectory, knockback_table, ko_percent
+
+
+def launch(character_class, character_damage, **hitbox_kwargs):
+    """Hit a character floating in the middle of an empty level, and wait out the hitpause."""
+    level = Level(seed=0)
+    level.blast_zone = BlastZone(900, 450, 1800, 900)
+    input = ScriptedInput()
+    input.read_new_inputs()
+    character = character_class(900, 450, input=input)
+    level.add_character(character)
+    character.damage = character_damage
+    hitbox = Hitbox(width=10, height=10, **hitbox_kwargs)
+    character.handle_get_hit(hitbox)
+    while character.state != character.state_hit_aerial:
+        level.update()
+    trajectory = Trajectory(
+        character.u,
+        character.v,
+        character.gravity,
+        character.fall_speed,
+        character.air_resistance,
+    )
+    return level, character, trajectory, hitbox
+
+
+@pytest.mark.parametrize("character_class", [Hawko, MonkeyKing])
+@pytest.mark.parametrize("angle, expected_side", [(10, "right"), (80, "top"), (170, "left")])
+def test_trajectory_matches_hit_physics(character_class, angle, expected_side):
+    level, character, trajectory, _ = launch(
+        character_class, 150, base_knockback=200, knockback_growth=20, knockback_angle=angle
+    )
+    x, y = character.x, character.y
+    tick, side = trajectory.blast_zone_crossing(character.rect, level.blast_zone.rect)
+    assert side == expected_side
+
+    for n in range(1, tick + 1):
+        level.update()
+        predicted_x, predicted_y = trajectory.position(x, y, n)
+        assert character.x == predicted_x
+        assert character.y == pytest.approx(predicted_y, abs=2)
+        assert character.alive()
+    level.update()
+    assert not character.alive()
+
+
+def test_trajectory_peak():
+    level, character, trajectory, _ = launch(Hawko, 0, base_knockback=150, knockback_angle=90)
+    y = character.y
+    highest = y
+    for _ in range(trajectory.peak_tick + 10):
+        level.update()
+        highest = min(highest, character.y)
+    assert y - highest == pytest.approx(trajectory.rise, abs=2)
+    assert trajectory.blast_zone_crossing(character.rect, level.blast_zone.rect)[1] == "bottom"
+
+
+@pytest.mark.parametrize("character_class", [Hawko, MonkeyKing])
+def test_knockback_table_matches_trajectory(character_class):
+    table = knockback_table(character_class)
+    assert knockback_table(character_class) is table
+    for angle in range(0, 360, 7):
+        for knockback in [0, 0.5, 3, 12.5, 30, 59.5, 150]:
+            trajectory = Trajectory.launched(character_class, knockback, angle)
+            assert table.lookup(angle, knockback) == (trajectory.rise, trajectory.reach)
+
+
+def test_ko_percent():
+    hitbox_kwargs = dict(base_knockback=50, knockback_growth=20, knockback_angle=30, damage=10)
+    level, character, _, hitbox = launch(Hawko, 0, **hitbox_kwargs)
+    percent = ko_percent(Hawko, hitbox, character.rect, level.blast_zone.rect)
+    assert percent is not None
+
+    for damage, kos_off_the_side in [(percent, True), (percent - 1, False)]:
+        level, character, trajectory, _ = launch(Hawko, damage, **hitbox_kwargs)
+        while character.alive():
+            previous_rect = character.rect.copy()
+            level.update()
+        blast_zone = level.blast_zone.rect
+        off_the_side = previous_rect.left >= blast_zone.right
+        off_the_bottom = previous_rect.top >= blast_zone.bottom
+        assert (off_the_side and not off_the_bottom) == kos_off_the_side
@@ -0,0 +1,286 @@
+"""
+Knockback trajectories in closed form. Where a launched character goes, how high it gets and
+when it crosses the blast zone can be worked out directly from its gravity, fall speed and air
+resistance, instead of by running hit_physics tick by tick. For AI, KO percent calculators and
+training mode overlays.
+
+The trajectories are for a character flying freely: nothing in the way, and no input (no drift,
+fast fall or jumps), starting from the first tick after hitpause. Horizontal positions match the
+physics exactly; vertical ones can be a pixel or two out, because the physics rounds positions
+to whole pixels every tick.
+"""
+
+import math
+
+import numpy
+from pygame.rect import Rect
+
+
+def knockback(hitbox, damage: float, mass: float) -> float:
+    """
+    How hard a hitbox launches a character.
+    :param damage: the character's damage, including the damage of this hit
+    """
+    # fixed knockback is affected by nothing
+    fixed_knockback_term = hitbox.fixed_knockback
+    # base knockback and growing knockback are both affected by target mass
+    base_knockback_term = hitbox.base_knockback / mass
+    knockback_growth_term = hitbox.knockback_growth * damage / mass / 10
+    return fixed_knockback_term + base_knockback_term + knockback_growth_term
+
+
+def launch_velocity(knockback: float, angle: float) -> (int, int):
+    """Knockback and angle (degrees anticlockwise from the right) -> u, v"""
+    radians = math.radians(angle)
+    return round(knockback * math.cos(radians)), round(-knockback * math.sin(radians))
+
+
+class Trajectory:
+    """
+    The flight of a character launched with velocity (u, v) (whole pixels per tick, as
+    launch_velocity gives). Each tick, like hit_physics:
+    - u loses `air_resistance` of speed, until it's 0
+    - v gains `gravity`, until it reaches `fall_speed` (if it started faster, it stays that fast)
+    - the character moves by (u, v)
+
+    So the displacement after n ticks is a sum of arithmetic series, up to the tick where the
+    velocity stops changing, and a straight line after that.
+    """
+
+    def __init__(self, u: float, v: float, gravity: float, fall_speed: float, air_resistance=0):
+        self.u = u
+        self.v = v
+        self.gravity = gravity
+        self.fall_speed = fall_speed
+        self.air_resistance = air_resistance
+
+        if air_resistance > 0:
+            self.drift_ticks = self._ticks_at_speed(1)  # ticks before the character stops
+        else:
+            self.drift_ticks = math.inf if round(u) else 0
+        if v < fall_speed and gravity > 0:
+            # ticks of full acceleration. The next one tops v up to the fall speed.
+            self.accelerating_ticks = math.floor((fall_speed - v) / gravity)
+            self.terminal_v = fall_speed
+        else:
+            self.accelerating_ticks = 0
+            self.terminal_v = v
+        if v < 0 and gravity > 0:
+            self.peak_tick = math.ceil(-v / gravity) - 1  # the last tick spent going up
+        else:
+            self.peak_tick = 0
+
+    @classmethod
+    def launched(cls, character_class: type, knockback: float, angle: float) -> "Trajectory":
+        u, v = launch_velocity(knockback, angle)
+        return cls(
+            u,
+            v,
+            character_class.gravity,
+            character_class.fall_speed,
+            character_class.air_resistance,
+        )
+
+    def dx(self, tick: int) -> float:
+        """Horizontal distance travelled in the first `tick` ticks"""
+        speed = round(abs(self.u))
+        if self.air_resistance <= 0:
+            return math.copysign(tick * speed, self.u)
+        # Positions are rounded to whole pixels every tick, so the character moves a whole
+        # number of pixels per tick. Air resistance is weak enough that it takes dozens of ticks
+        # to take one pixel per tick off that, so (unlike gravity) ignoring the rounding would
+        # add up to several pixels. So this adds up the ticks spent at each whole-pixel speed.
+        distance = sum(min(tick, self._ticks_at_speed(level)) for level in range(1, speed + 1))
+        return math.copysign(distance, self.u)
+
+    def _ticks_at_speed(self, level: int) -> int:
+        """Ticks for which the character moves at least `level` pixels per tick sideways"""
+        return max(math.floor((abs(self.u) + 0.5 - level) / self.air_resistance), 0)
+
+    def dy(self, tick: int) -> float:
+        """Vertical distance travelled in the first `tick` ticks (positive is down)"""
+        accelerating_ticks = min(tick, self.accelerating_ticks)
+        distance = accelerating_ticks * self.v
+        distance += self.gravity * accelerating_ticks * (accelerating_ticks + 1) / 2
+        return distance + (tick - accelerating_ticks) * self.terminal_v
+
+    def position(self, x: float, y: float, tick: int) -> (float, float):
+        return x + self.dx(tick), y + self.dy(tick)
+
+    def arc(self, x: float, y: float, ticks: int) -> [(float, float)]:
+        """The positions over the next few ticks, e.g. for drawing the launch arc"""
+        return [self.position(x, y, tick) for tick in range(ticks + 1)]
+
+    @property
+    def rise(self) -> float:
+        """How far above the launch point the character gets"""
+        return -self.dy(self.peak_tick)
+
+    @property
+    def reach(self) -> float:
+        """Horizontal distance travelled by the time air resistance stops the character. Signed
+        like u, and infinite if there's no air resistance."""
+        if self.drift_ticks == math.inf:
+            return math.copysign(math.inf, self.u)
+        return self.dx(self.drift_ticks)
+
+    def blast_zone_crossing(self, rect: Rect, blast_zone: Rect) -> tuple | None:
+        """
+        When the character will be entirely outside the blast zone. Level.main then KOs it at
+        the start of the following tick.
+        :param rect: the character's rect at launch
+        :return: (ticks after launch, "left"/"right"/"top"/"bottom"), or None if it never is
+        """
+        crossings = [
+            (self.ticks_to_travel_up(rect.bottom - blast_zone.top), "top"),
+            (self.ticks_to_travel_down(blast_zone.bottom - rect.top), "bottom"),
+        ]
+        if self.u > 0:
+            crossings.append((self.ticks_to_travel_sideways(blast_zone.right - rect.left), "right"))
+        elif self.u < 0:
+            crossings.append((self.ticks_to_travel_sideways(rect.right - blast_zone.left), "left"))
+        return min((crossing for crossing in crossings if crossing[0] is not None), default=None)
+
+    def ticks_to_travel_sideways(self, distance: float) -> int | None:
+        """Ticks until the character has gone `distance` in the direction of u"""
+        if distance <= 0:
+            return 0
+        speed = abs(self.u)
+        resistance = self.air_resistance
+        if not speed or distance > abs(self.reach):
+            return None
+        if resistance <= 0:
+            return math.ceil(distance / speed)
+        # n * speed - resistance * n * (n + 1) / 2 >= distance
+        b = speed - resistance / 2
+        estimate = (b - math.sqrt(max(b * b - 2 * resistance * distance, 0))) / resistance
+        return _settle(math.ceil(estimate), lambda n: abs(self.dx(n)) >= distance)
+
+    def ticks_to_travel_up(self, distance: float) -> int | None:
+        """Ticks until the character has risen `distance` above the launch point"""
+        if distance <= 0:
+            return 0
+        if distance > self.rise:
+            return None
+        # -(n * v + gravity * n * (n + 1) / 2) >= distance
+        gravity = self.gravity
+        b = -(self.v + gravity / 2)
+        estimate = (b - math.sqrt(max(b * b - 2 * gravity * distance, 0))) / gravity
+        return _settle(math.ceil(estimate), lambda n: -self.dy(n) >= distance)
+
+    def ticks_to_travel_down(self, distance: float) -> int | None:
+        """Ticks until the character is `distance` below the launch point"""
+        if distance <= 0:
+            return 0
+        accelerating_ticks = self.accelerating_ticks
+        if accelerating_ticks and self.dy(accelerating_ticks) >= distance:
+            # n * v + gravity * n * (n + 1) / 2 >= distance
+            gravity = self.gravity
+            b = self.v + gravity / 2
+            estimate = (-b + math.sqrt(b * b + 2 * gravity * distance)) / gravity
+        elif self.terminal_v > 0:
+            remaining = distance - self.dy(accelerating_ticks)
+            estimate = accelerating_ticks + remaining / self.terminal_v
+        else:
+            return None
+        return _settle(math.ceil(estimate), lambda n: self.dy(n) >= distance)
+
+
+def _settle(tick: int, reached: callable) -> int:
+    """Correct a tick worked out with floats (which can be one out either way) to the first
+    tick where reached() is true."""
+    tick = max(tick, 0)
+    while tick > 0 and reached(tick - 1):
+        tick -= 1
+    while not reached(tick):
+        tick += 1
+    return tick
+
+
+class KnockbackTable:
+    """
+    One character class's peak rise and horizontal reach, precomputed for every launch
+    velocity. Launch velocities are whole pixels per tick, so every knockback and angle lands
+    exactly on an entry. Rise only depends on v, and reach only on u, so each is a row.
+
+    Whether a hit KOs from some position can be ruled out with two lookups for most launches.
+    The rest get their exact blast zone crossing from a Trajectory.
+    """
+
+    max_speed = 100  # pixels per tick. Faster launches are worked out directly.
+
+    def __init__(self, character_class: type):
+        self.character_class = character_class
+        gravity = character_class.gravity
+        air_resistance = character_class.air_resistance
+        # the same sums as Trajectory.rise and .reach, for all the velocities at once
+        velocities = numpy.arange(-self.max_speed, self.max_speed + 1)
+        v = velocities
+        peak_tick = numpy.where(v < 0, numpy.ceil(-v / gravity) - 1, 0)
+        self.rise = -(peak_tick * v + gravity * peak_tick * (peak_tick + 1) / 2)
+        speed = numpy.abs(velocities)
+        if air_resistance > 0:
+            # a character launched at `speed` spends floor((j + 0.5) / air_resistance) ticks
+            # going faster than j pixels per tick, for each j below `speed`
+            ticks = numpy.floor((numpy.arange(self.max_speed) + 0.5) / air_resistance)
+            distance = numpy.concatenate([[0], numpy.cumsum(ticks)])
+            self.reach = numpy.sign(velocities) * distance[speed]
+        else:
+            self.reach = numpy.sign(velocities) * numpy.where(speed > 0, math.inf, 0)
+
+    def trajectory(self, angle: float, knockback: float) -> Trajectory:
+        return Trajectory.launched(self.character_class, knockback, angle)
+
+    def lookup(self, angle: float, knockback: float) -> (float, float):
+        """(rise, reach) of a launch"""
+        u, v = launch_velocity(knockback, angle)
+        max_speed = self.max_speed
+        if abs(u) > max_speed or abs(v) > max_speed:
+            trajectory = self.trajectory(angle, knockback)
+            return trajectory.rise, trajectory.reach
+        return self.rise[v + max_speed], self.reach[u + max_speed]
+
+    def kills(self, angle: float, knockback: float, rect: Rect, blast_zone: Rect) -> bool:
+        """
+        Whether the launch carries the character out of the top or sides of the blast zone,
+        before it falls out of the bottom. Only falling out of the bottom doesn't count: on a
+        stage, whether the character falls that far depends on the platforms, and on whether
+        it recovers.
+        :param rect: the character's rect at launch
+        """
+        rise, reach = self.lookup(angle, knockback)
+        if (
+            reach < blast_zone.right - rect.left
+            and -reach < rect.right - blast_zone.left
+            and rise < rect.bottom - blast_zone.top
+        ):
+            return False  # never gets far enough, whenever it falls
+        crossing = self.trajectory(angle, knockback).blast_zone_crossing(rect, blast_zone)
+        return crossing is not None and crossing[1] != "bottom"
+
+
+_tables = {}  # character class -> KnockbackTable
+
+
+def knockback_table(character_class: type) -> KnockbackTable:
+    """The class's KnockbackTable, built the first time it's asked for"""
+    table = _tables.get(character_class)
+    if table is None:
+        table = _tables[character_class] = KnockbackTable(character_class)
+    return table
+
+
+def ko_percent(
+    character_class: type, hitbox, rect: Rect, blast_zone: Rect, max_damage: int = 300
+) -> int | None:
+    """
+    The lowest damage at which the hit KOs a character at `rect` (see KnockbackTable.kills),
+    or None if it doesn't KO up to `max_damage`.
+    """
+    table = knockback_table(character_class)
+    mass = character_class.mass
+    for damage in range(max_damage + 1):
+        launch = knockback(hitbox, damage + hitbox.damage, mass)
+        if table.kills(hitbox.knockback_angle, launch, rect, blast_zone):
+            return damage
+    return None